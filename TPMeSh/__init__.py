@@ -24,12 +24,38 @@ from _tpms import (
     fischer_koch_s_gradient,
     schoen_frd_gradient,
     PMY_gradient,
+    double_schoen_gyroid_gradient,
+    double_swartz_diamond_gradient,
+    double_schwarz_primitive_gradient,
+    lipnoid_gradient,
+    tubular_G_AB_gradient,
+    tubular_G_C_gradient,
+    BCC_gradient,
+
+    schoen_gyroid_value_and_gradient,
+    schwarz_diamond_value_and_gradient,
+    schwarz_primitive_value_and_gradient,
+    schoen_iwp_value_and_gradient,
+    neovius_value_and_gradient,
+    fischer_koch_s_value_and_gradient,
+    schoen_frd_value_and_gradient,
+    PMY_value_and_gradient,
+    double_schoen_gyroid_value_and_gradient,
+    double_swartz_diamond_value_and_gradient,
+    double_schwarz_primitive_value_and_gradient,
+    lipnoid_value_and_gradient,
+    tubular_G_AB_value_and_gradient,
+    tubular_G_C_value_and_gradient,
+    BCC_value_and_gradient,
 
     Implicit,
     ImplicitShell,
+    GradedTPMSShell,
+    ImplicitDomain,
     InterpolatedTPMS,
     SpatiallyVaryingTPMS,
     FourierTPMS,
+    PrimitiveTPMS,
 )
 
 # from .main import ()
@@ -0,0 +1,233 @@
+import numpy as np
+
+import _tpms
+from _tpms import Implicit, PrimitiveTPMS
+
+
+class Dual:
+    """
+    Values of an expression of (x, y, z) with their gradients, propagated
+    by forward-mode automatic differentiation.
+
+    Duals support arithmetic and the NumPy functions in UNARY and BINARY
+    (e.g., np.sin, np.sqrt, np.maximum), and can be passed to the
+    primitives returned by primitive, so an expression written for NumPy
+    arrays computes its gradient in the same pass.
+
+    Parameters:
+    - value: (...) values
+    - grad: (..., 3) gradients (broadcastable against the values)
+    """
+
+    # Make NumPy defer to Dual in mixed operations (e.g., array * Dual)
+    __array_priority__ = 1000
+
+    def __init__(self, value, grad):
+        self.value = np.asarray(value, dtype=float)
+        self.grad = np.asarray(grad, dtype=float)
+
+    @staticmethod
+    def constant(a):
+        return a if isinstance(a, Dual) else Dual(a, np.zeros(3))
+
+    def gradient(self):
+        """(..., 3) gradients with the shape of the values."""
+        return np.broadcast_to(self.grad, self.value.shape + (3,))
+
+    def __repr__(self):
+        return f"Dual(value={self.value!r}, grad={self.gradient()!r})"
+
+    def __neg__(self):
+        return Dual(-self.value, -self.grad)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return np.absolute(self)
+
+    def __add__(self, other):
+        other = Dual.constant(other)
+        return Dual(self.value + other.value, self.grad + other.grad)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        other = Dual.constant(other)
+        return Dual(self.value - other.value, self.grad - other.grad)
+
+    def __rsub__(self, other):
+        return Dual.constant(other) - self
+
+    def __mul__(self, other):
+        other = Dual.constant(other)
+        return Dual(
+            self.value * other.value,
+            self.grad * other.value[..., None] + self.value[..., None] * other.grad)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        other = Dual.constant(other)
+        value = self.value / other.value
+        return Dual(
+            value, (self.grad - value[..., None] * other.grad) / other.value[..., None])
+
+    def __rtruediv__(self, other):
+        return Dual.constant(other) / self
+
+    def __pow__(self, other):
+        if not isinstance(other, Dual):
+            # d(a^n) = n a^(n-1) da (avoids log(a) for negative a)
+            n = np.asarray(other, dtype=float)
+            return Dual(
+                self.value ** n, (n * self.value ** (n - 1))[..., None] * self.grad)
+        return np.exp(other * np.log(self))
+
+    def __rpow__(self, other):
+        return np.exp(self * np.log(Dual.constant(other).value))
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != "__call__" or kwargs:
+            return NotImplemented
+        if ufunc in UNARY:
+            (a,) = inputs
+            f, df = UNARY[ufunc]
+            return Dual(f(a.value), df(a.value)[..., None] * a.grad)
+        if ufunc in BINARY:
+            return BINARY[ufunc](*inputs)
+        return NotImplemented
+
+
+def _select(condition, a, b):
+    a, b = Dual.constant(a), Dual.constant(b)
+    return Dual(
+        np.where(condition, a.value, b.value),
+        np.where(condition[..., None], a.grad, b.grad))
+
+
+# Functions of one argument with their derivatives
+UNARY = {
+    np.negative: (np.negative, lambda v: -np.ones_like(v)),
+    np.absolute: (np.absolute, np.sign),
+    np.square: (np.square, lambda v: 2 * v),
+    np.sqrt: (np.sqrt, lambda v: 0.5 / np.sqrt(v)),
+    np.exp: (np.exp, np.exp),
+    np.log: (np.log, lambda v: 1 / v),
+    np.sin: (np.sin, np.cos),
+    np.cos: (np.cos, lambda v: -np.sin(v)),
+    np.tan: (np.tan, lambda v: 1 / np.cos(v) ** 2),
+    np.arctan: (np.arctan, lambda v: 1 / (1 + v * v)),
+    np.tanh: (np.tanh, lambda v: 1 - np.tanh(v) ** 2),
+}
+
+# Functions of two arguments (at least one of which is a Dual)
+BINARY = {
+    np.add: lambda a, b: Dual.constant(a) + b,
+    np.subtract: lambda a, b: Dual.constant(a) - b,
+    np.multiply: lambda a, b: Dual.constant(a) * b,
+    np.true_divide: lambda a, b: Dual.constant(a) / b,
+    np.power: lambda a, b: Dual.constant(a) ** b,
+    np.maximum: lambda a, b: _select(
+        Dual.constant(a).value >= Dual.constant(b).value, a, b),
+    np.minimum: lambda a, b: _select(
+        Dual.constant(a).value <= Dual.constant(b).value, a, b),
+}
+
+
+def variables(x, y, z):
+    """The coordinates as Duals with unit gradients."""
+    x, y, z = np.broadcast_arrays(*[np.asarray(v, dtype=float) for v in (x, y, z)])
+    return tuple(Dual(v, np.eye(3)[i]) for i, v in enumerate((x, y, z)))
+
+
+def primitive(name):
+    """
+    TPMS primitive (see PrimitiveTPMS.NAMES) that accepts Duals.
+
+    On Duals, the value and gradient of the primitive are evaluated by the
+    compiled batch kernels and combined with the gradients of the arguments
+    by the chain rule. Otherwise, the compiled function is called directly.
+
+    Parameters:
+    - name: name of the primitive (e.g., "lipnoid")
+
+    Returns:
+    - function of (x, y, z)
+    """
+    if name not in PrimitiveTPMS.NAMES:
+        raise ValueError(f"Unknown TPMS primitive: {name}")
+    f = getattr(_tpms, name)
+    df = getattr(_tpms, f"{name}_gradient")
+
+    def evaluate(x, y, z):
+        if not any(isinstance(v, Dual) for v in (x, y, z)):
+            if all(np.ndim(v) == 0 for v in (x, y, z)):
+                return f(float(x), float(y), float(z))
+            shape, X = _contiguous(x, y, z)
+            return np.reshape(f(*X), shape)
+
+        x, y, z = map(Dual.constant, (x, y, z))
+        shape, X = _contiguous(x.value, y.value, z.value)
+        value = np.reshape(f(*X), shape)
+        grad = np.reshape(df(*X), shape + (3,))
+        return Dual(
+            value,
+            grad[..., 0:1] * x.grad + grad[..., 1:2] * y.grad
+            + grad[..., 2:3] * z.grad)
+
+    evaluate.__name__ = name
+    return evaluate
+
+
+def _contiguous(*arrays):
+    """Broadcast shape and flat float64 arrays for the batch kernels."""
+    arrays = np.broadcast_arrays(*arrays)
+    return arrays[0].shape, [
+        np.ascontiguousarray(a, dtype=float).ravel() for a in arrays]
+
+
+def value_and_gradient(f, x, y, z):
+    """
+    Evaluate an expression and its gradient in one forward pass.
+
+    Parameters:
+    - f: function of (x, y, z) written with arithmetic, the NumPy functions
+      supported by Dual, and primitives (see primitive)
+    - x, y, z: coordinates (scalars or broadcastable arrays)
+
+    Returns:
+    - values (...) and (..., 3) gradients
+    """
+    result = f(*variables(x, y, z))
+    if not isinstance(result, Dual):  # Constant expression
+        result = Dual(result, np.zeros(3))
+    shape = np.broadcast_shapes(np.shape(x), np.shape(y), np.shape(z))
+    value = np.broadcast_to(result.value, shape)
+    return value, np.broadcast_to(result.grad, shape + (3,))
+
+
+def implicit(f, domain):
+    """
+    Implicit of an expression f(x, y, z) with gradients by automatic
+    differentiation, e.g., to wrap in an ImplicitShell.
+
+    Unlike the compiled implicits (e.g., PrimitiveTPMS), f is called from
+    C++ for every point, so prefer those when f is a single primitive.
+
+    Parameters:
+    - f: function of (x, y, z) (see value_and_gradient)
+    - domain: (3,) extent of a period of f
+
+    Returns:
+    - Implicit
+    """
+    def fdf(x, y, z):
+        value, grad = value_and_gradient(f, x, y, z)
+        return float(value), np.array(grad)
+
+    return Implicit(
+        lambda x, y, z: float(f(x, y, z)),
+        lambda x, y, z: fdf(x, y, z)[1],
+        np.broadcast_to(np.asarray(domain, dtype=float), 3).copy(),
+        fdf)
@@ -3,7 +3,8 @@ import igl
 import pygalmesh
 
 from .mesh_implicit_surface import res3D
-from .utils import remove_small_components, tet_volume, scale_to_unit_cube, scale_to_domain, lerp
+from .profiling import MeshingStats
+from .utils import remove_small_components, tet_volumes, tet_quality, scale_to_unit_cube, scale_to_domain, native_domain, OracleCache, cache_counts
 
 
 CUBE_VERTICES = np.array([
@@ -16,31 +17,79 @@ CUBE_EDGES = np.array([
 ])
 
 
-class Intersection(pygalmesh.DomainBase):
-    """Re-implement this in Python because the C++ version has a wrong get_features() implementation."""
+def bbox_feature_edges(f, extent, res):
+    """
+    Extract the parts of the bounding box edges inside an implicit function.
 
-    def __init__(self, domains):
-        pygalmesh.DomainBase.__init__(self)
-        self.domains = domains
+    All 12 edges are sampled and evaluated in a single batched call, and
+    sign changes between consecutive samples are found with NumPy.
 
-    def eval(self, x):
-        return max(domain.eval(x) for domain in self.domains)
+    Parameters:
+    - f: vectorized implicit function
+    - extent: size of the box (with one corner at the origin)
+    - res: number of segments along each axis
 
-    def get_bounding_sphere_squared_radius(self):
-        return min(domain.get_bounding_sphere_squared_radius() for domain in self.domains)
+    Returns:
+    - (N, 2, 3) array of segments where f <= 0 (clipped to the zero level set)
+    """
+    A, B = np.moveaxis(extent * CUBE_VERTICES[CUBE_EDGES], 1, 0)
+    # NOTE: edges are axis-aligned
+    n = np.asarray(res)[np.argmax(np.abs(B - A), axis=1)]
 
-    def get_features(self):
-        # NOTE: Hardcoded to return the features of the first domain
-        return self.domains[0].get_features()
+    edge = np.repeat(np.arange(len(CUBE_EDGES)), n + 1)
+    ts = np.concatenate([np.linspace(0, 1, ni + 1) for ni in n])
+    P = A[edge] + (B - A)[edge] * ts[:, None]
+    S = f(P[:, 0], P[:, 1], P[:, 2])
+
+    # Segments connect consecutive samples along the same edge
+    i = np.flatnonzero(edge[:-1] == edge[1:])
+    c, d, sc, sd = P[i], P[i + 1], S[i], S[i + 1]
+
+    inside = (sc <= 0) | (sd <= 0)
+    c, d, sc, sd = c[inside], d[inside], sc[inside], sd[inside]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossing = c + (d - c) * (sc / (sc - sd))[:, None]
+
+    return np.stack([
+        np.where((sc <= 0)[:, None], c, crossing),
+        np.where((sd <= 0)[:, None], d, crossing),
+    ], axis=1)
 
 
 class PyGALImplicit(pygalmesh.DomainBase):
-    def __init__(self, f, repeats, feature_edge_res):
+    """
+    Implicit domain (optionally intersected with bbox) for pygalmesh.
+
+    Compiled implicits are evaluated by an ImplicitDomain, so CGAL's oracle
+    queries never enter Python. Other callables fall back to eval below.
+    Either way, the oracle queries are counted (see evaluations), and the
+    values of f can be memoized in a bounded LRU cache (see cache_size).
+    """
+
+    def __init__(self, f, repeats, feature_edge_res, bbox=None, cache_size=0,
+                 cache_quantum=0):
         from .mesh_implicit_surface import mesh_implicit_surface
 
         pygalmesh.DomainBase.__init__(self)
         self.f = f
         self.repeats = repeats
+        self.bbox = bbox
+        self.python_evaluations = 0
+        self.python_cache = None
+
+        self.native = native_domain(
+            f, scale_to_domain(1, repeats * f.domain), box=bbox,
+            cache_size=cache_size, cache_quantum=cache_quantum)
+        if self.native is not None:
+            # Shadow eval so pygalmesh calls straight into C++
+            self.eval = self.native.eval
+        else:
+            if bbox is not None:
+                self.box = pygalmesh.Cuboid(*bbox)
+            if cache_size > 0:
+                self.python_cache = OracleCache(
+                    self.value, cache_size, cache_quantum)
 
         eps = 1e-14  # Add a small epsilon to the domain to avoid numerical clipping
         domain = np.vstack([[0, 0, 0], (repeats * f.domain).reshape(1, 3)])
@@ -58,35 +107,30 @@ class PyGALImplicit(pygalmesh.DomainBase):
         BE, *_ = igl.boundary_facets(F)
 
         # Add extra edges to capture the bbox edges
-        extra_edges = []
-        res = res3D(domain=domain, res_y=feature_edge_res)
-        for a, b in (ptp * CUBE_VERTICES[CUBE_EDGES]):
-            n = res[np.argmax(np.abs(b - a))]  # NOTE: edges are axis-aligned
-            ts = np.linspace(0, 1, n + 1)
-            for i in range(len(ts) - 1):
-                c = lerp(a, b, ts[i])
-                d = lerp(a, b, ts[i+1])
-
-                sc = f(*c)
-                sd = f(*d)
-
-                if sc <= 0 or sd <= 0:
-                    extra_edges.append([
-                        c if sc <= 0 else lerp(c, d, sc / (sc - sd)),
-                        d if sd <= 0 else lerp(c, d, sc / (sc - sd))
-                    ])
-        extra_edges = np.array(extra_edges)
-        for edge in extra_edges:
-            edge[:] = scale_to_unit_cube(edge, repeats * f.domain)
+        extra_edges = bbox_feature_edges(
+            f, ptp, res3D(domain=domain, res_y=feature_edge_res))
+        extra_edges = scale_to_unit_cube(extra_edges, repeats * f.domain)
 
         # Combine feature edges and extra edges
         self.feature_edges = V[BE]
         if len(extra_edges) > 0:
             self.feature_edges = np.vstack([self.feature_edges, extra_edges])
 
+    def value(self, X):
+        """Value of f at the normalized point X (without the bbox)."""
+        return self.f(
+            *scale_to_domain(np.array(X), self.repeats * self.f.domain))
+
     def eval(self, X):
         assert len(X) == 3
-        return self.f(*scale_to_domain(np.array(X), self.repeats * self.f.domain))
+        self.python_evaluations += 1
+        if self.python_cache is not None:
+            value = self.python_cache(X)
+        else:
+            value = self.value(X)
+        if self.bbox is not None:
+            value = max(value, self.box.eval(X))
+        return value
 
     def get_bounding_sphere_squared_radius(self):
         raise RuntimeError("Not implemented")
@@ -94,6 +138,20 @@ class PyGALImplicit(pygalmesh.DomainBase):
     def get_features(self):
         return self.feature_edges.tolist()
 
+    @property
+    def evaluations(self):
+        """Number of oracle queries (eval calls) so far."""
+        if self.native is not None:
+            return self.native.evaluations
+        return self.python_evaluations
+
+    @property
+    def cache(self):
+        """Cache of the values of f (None if disabled)."""
+        if self.native is not None:
+            return self.native.cache
+        return self.python_cache
+
     @property
     def min_edge_size_at_feature_edges(self):
         if len(self.feature_edges) == 0:
@@ -117,7 +175,11 @@ def mesh_implicit(
     exude=None,
     odt=False,
     lloyd=False,
-    verbose=False
+    verbose=False,
+    min_radius_ratio=None,
+    oracle_cache_size=0,
+    oracle_cache_quantum=0,
+    stats=None
 ):
     """
     Generate a mesh of an implicit function using pygalmesh.
@@ -129,6 +191,15 @@ def mesh_implicit(
     - repeats: number of repeats in each direction
     - return_feature_edges: return feature edges of the mesh
     - verbose: print debug information
+    - min_radius_ratio: if given, remove tetrahedra with a lower radius ratio
+      (see utils.tet_quality)
+    - oracle_cache_size: maximum number of values of f memoized for CGAL's
+      oracle queries (0 disables the cache)
+    - oracle_cache_quantum: spacing of the grid (in the unit cube the mesh
+      is generated in) that the cache keys are snapped to; 0 caches exact
+      points only
+    - stats: optional profiling.MeshingStats in which to record the time,
+      memory and counts of each stage
 
     Returns:
     - V: vertices of the mesh
@@ -137,6 +208,8 @@ def mesh_implicit(
     """
     if exude is None:
         exude = elements_in_thickness > 1
+    if stats is None:
+        stats = MeshingStats()
 
     thickness = f.thickness if hasattr(f, "thickness") else f.domain.max()
     res = scale_to_unit_cube(
@@ -144,12 +217,6 @@ def mesh_implicit(
     if verbose:
         print("Mesh resolution:", res)
 
-    implicit = PyGALImplicit(f, repeats, feature_edge_res=feature_edge_res)
-    if verbose:
-        print("Min/max edge size at feature edges:",
-              implicit.min_edge_size_at_feature_edges,
-              implicit.max_edge_size_at_feature_edges)
-
     # Normalize to unit cube
     bbox = np.array([
         [0, 0, 0], scale_to_unit_cube(repeats * f.domain, repeats * f.domain)
@@ -157,22 +224,37 @@ def mesh_implicit(
     if verbose:
         print("PyGAL bounding box:", bbox.tolist())
 
-    mesh = pygalmesh.generate_mesh(
-        Intersection([
+    with stats.stage("feature_edges") as counts:
+        implicit = PyGALImplicit(
+            f, repeats, feature_edge_res=feature_edge_res, bbox=bbox,
+            cache_size=oracle_cache_size, cache_quantum=oracle_cache_quantum)
+        counts["feature_edges"] = len(implicit.feature_edges)
+    if verbose:
+        print("Min/max edge size at feature edges:",
+              implicit.min_edge_size_at_feature_edges,
+              implicit.max_edge_size_at_feature_edges)
+        print("Native oracle:", implicit.native is not None)
+
+    with stats.stage("generation") as counts:
+        oracle_calls = implicit.evaluations
+        mesh = pygalmesh.generate_mesh(
             implicit,
-            pygalmesh.Cuboid(*bbox)
-        ]),
-        bounding_cuboid=bbox.flatten(order="C"),
-        max_cell_circumradius=res,
-        max_radius_surface_delaunay_ball=res,
-        max_facet_distance=0.1 * res,
-        min_edge_size_at_feature_edges=res,
-        odt=odt,
-        lloyd=lloyd,
-        perturb=perturb,
-        exude=exude,
-        verbose=verbose,
-    )
+            bounding_cuboid=bbox.flatten(order="C"),
+            max_cell_circumradius=res,
+            max_radius_surface_delaunay_ball=res,
+            max_facet_distance=0.1 * res,
+            min_edge_size_at_feature_edges=res,
+            odt=odt,
+            lloyd=lloyd,
+            perturb=perturb,
+            exude=exude,
+            verbose=verbose,
+        )
+        counts["oracle_calls"] = implicit.evaluations - oracle_calls
+        counts["native_oracle"] = implicit.native is not None
+        counts.update(cache_counts(implicit.cache))
+    if verbose and implicit.cache is not None:
+        print(f"Oracle cache hit rate: {counts['cache_hit_rate']:.1%}")
 
     if verbose:
         print("Meshing done")
@@ -183,25 +265,44 @@ def mesh_implicit(
     T = mesh.cells_dict["tetra"]
     assert T.size > 0
 
-    volumes = np.array([tet_volume(tet) for tet in V[T]])
-    if np.any(volumes < 1e-12):
-        # Hopefully these elements are slivers with points close to each other
+    with stats.stage("remove_duplicates") as counts:
+        volumes = tet_volumes(V, T)
         nV = V.shape[0]
-        V, *_, T = igl.remove_duplicate_vertices(V, T, 1e-12)
-        print(f"Removed {nV - V.shape[0]:d} duplicate vertices!")
-        volumes = np.array([tet_volume(tet) for tet in V[T]])
-    T = T[volumes > 1e-12]
-
-    V, T, *_ = igl.remove_unreferenced(V, T)
-
-    assert all(tet_volume(tet) > 0 for tet in V[T])
+        if np.any(volumes < 1e-12):
+            # Hopefully these elements are slivers with points close to each other
+            V, *_, T = igl.remove_duplicate_vertices(V, T, 1e-12)
+            print(f"Removed {nV - V.shape[0]:d} duplicate vertices!")
+            volumes = tet_volumes(V, T)
+        counts["removed_vertices"] = nV - V.shape[0]
+
+    with stats.stage("filter_slivers") as counts:
+        keep = volumes > 1e-12
+
+        if min_radius_ratio is not None:
+            quality = tet_quality(V, T)
+            low_quality = keep & (quality["radius_ratio"] < min_radius_ratio)
+            if verbose:
+                print(f"Removing {np.count_nonzero(low_quality):d} tetrahedra "
+                      f"with radius ratio < {min_radius_ratio:g}")
+            keep &= ~low_quality
+        counts["removed_elements"] = len(T) - np.count_nonzero(keep)
+        T = T[keep]
+
+        V, T, *_ = igl.remove_unreferenced(V, T)
+
+        assert (tet_volumes(V, T) > 0).all()
 
     if verbose:
         print("Removing small components...")
-    V, T = remove_small_components(V, T)
+    with stats.stage("remove_small_components") as counts:
+        nT = len(T)
+        V, T = remove_small_components(V, T)
+        counts["removed_elements"] = nT - len(T)
 
     # Translate to origin and scale to domain
-    V = scale_to_domain(V - V.min(axis=0), repeats * f.domain)
+    with stats.stage("scale") as counts:
+        V = scale_to_domain(V - V.min(axis=0), repeats * f.domain)
+        counts["vertices"], counts["elements"] = len(V), len(T)
     if verbose:
         print("Mesh bbox: ", V.min(axis=0), V.max(axis=0))
 
@@ -227,7 +328,10 @@ def _mesh_implicit_surface(
     feature_edge_res=100,
     repeats=np.ones(3),
     return_feature_edges=False,
-    verbose=False
+    verbose=False,
+    oracle_cache_size=0,
+    oracle_cache_quantum=0,
+    stats=None
 ):
     """
     Generate a mesh of an implicit function using pygalmesh.
@@ -238,24 +342,28 @@ def _mesh_implicit_surface(
     - repeats: number of repeats in each direction
     - return_feature_edges: return feature edges of the mesh
     - verbose: print debug information
+    - oracle_cache_size: maximum number of values of f memoized for CGAL's
+      oracle queries (0 disables the cache)
+    - oracle_cache_quantum: spacing of the grid (in the unit cube the mesh
+      is generated in) that the cache keys are snapped to; 0 caches exact
+      points only
+    - stats: optional profiling.MeshingStats in which to record the time,
+      memory and counts of each stage
 
     Returns:
     - V: vertices of the mesh
     - F: triangles of the mesh
     - feature_edges: (if return_feature_edges is True) feature edges of the mesh
     """
+    if stats is None:
+        stats = MeshingStats()
+
     thickness = f.thickness if hasattr(f, "thickness") else f.domain.max()
     res = scale_to_unit_cube(
         thickness / elements_in_thickness, repeats * f.domain)
     if verbose:
         print("Mesh resolution:", res)
 
-    implicit = PyGALImplicit(f, repeats, feature_edge_res=feature_edge_res)
-    if verbose:
-        print("Min/max edge size at feature edges:",
-              implicit.min_edge_size_at_feature_edges,
-              implicit.max_edge_size_at_feature_edges)
-
     # Normalize to unit cube
     bbox = np.array([
         [0, 0, 0], scale_to_unit_cube(repeats * f.domain, repeats * f.domain)
@@ -264,16 +372,31 @@ def _mesh_implicit_surface(
     if verbose:
         print("PyGAL bounding box:", bbox.tolist())
 
-    mesh = pygalmesh.generate_surface_mesh(
-        Intersection([
+    with stats.stage("feature_edges") as counts:
+        implicit = PyGALImplicit(
+            f, repeats, feature_edge_res=feature_edge_res, bbox=bbox,
+            cache_size=oracle_cache_size, cache_quantum=oracle_cache_quantum)
+        counts["feature_edges"] = len(implicit.feature_edges)
+    if verbose:
+        print("Min/max edge size at feature edges:",
+              implicit.min_edge_size_at_feature_edges,
+              implicit.max_edge_size_at_feature_edges)
+        print("Native oracle:", implicit.native is not None)
+
+    with stats.stage("generation") as counts:
+        oracle_calls = implicit.evaluations
+        mesh = pygalmesh.generate_surface_mesh(
             implicit,
-            pygalmesh.Cuboid(*bbox)
-        ]),
-        bounding_sphere_radius=1.01 * np.linalg.norm(bbox[1]),
-        max_radius_surface_delaunay_ball=res,
-        max_facet_distance=0.1 * res,
-        verbose=verbose,
-    )
+            bounding_sphere_radius=1.01 * np.linalg.norm(bbox[1]),
+            max_radius_surface_delaunay_ball=res,
+            max_facet_distance=0.1 * res,
+            verbose=verbose,
+        )
+        counts["oracle_calls"] = implicit.evaluations - oracle_calls
+        counts["native_oracle"] = implicit.native is not None
+        counts.update(cache_counts(implicit.cache))
+    if verbose and implicit.cache is not None:
+        print(f"Oracle cache hit rate: {counts['cache_hit_rate']:.1%}")
 
     if verbose:
         print("Meshing done")
@@ -289,7 +412,9 @@ def _mesh_implicit_surface(
     # V, F = remove_small_components(V, F)
 
     # Translate to origin and scale to domain
-    V = scale_to_domain(V - V.min(axis=0), repeats * f.domain)
+    with stats.stage("scale") as counts:
+        V = scale_to_domain(V - V.min(axis=0), repeats * f.domain)
+        counts["vertices"], counts["elements"] = len(V), len(F)
     if verbose:
         print("Mesh bbox: ", V.min(axis=0), V.max(axis=0))
 
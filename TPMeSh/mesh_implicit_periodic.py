@@ -2,15 +2,50 @@ import numpy as np
 import igl  # type: ignore
 import pygalmesh  # type: ignore
 
+from .mesh_implicit_surface import _match_points
+from .profiling import MeshingStats
+from .utils import native_domain, OracleCache, cache_counts
+
 
 class PyGalImplicit(pygalmesh.DomainBase):
-    def __init__(self, f):
+    def __init__(self, f, cache_size=0, cache_quantum=0):
         super().__init__()
         self.f = f
+        self.python_evaluations = 0
+        self.python_cache = None
+
+        self.native = native_domain(
+            f, f.domain, cache_size=cache_size, cache_quantum=cache_quantum)
+        if self.native is not None:
+            # Shadow eval so pygalmesh calls straight into C++
+            self.eval = self.native.eval
+        elif cache_size > 0:
+            self.python_cache = OracleCache(
+                self.value, cache_size, cache_quantum)
+
+    def value(self, X):
+        return self.f(*(self.f.domain * np.asarray(X)))
 
     def eval(self, X):
         assert (len(X) == 3)
-        return self.f(*(self.f.domain * X))
+        self.python_evaluations += 1
+        if self.python_cache is not None:
+            return self.python_cache(X)
+        return self.value(X)
+
+    @property
+    def evaluations(self):
+        """Number of oracle queries (eval calls) so far."""
+        if self.native is not None:
+            return self.native.evaluations
+        return self.python_evaluations
+
+    @property
+    def cache(self):
+        """Cache of the values of f (None if disabled)."""
+        if self.native is not None:
+            return self.native.cache
+        return self.python_cache
 
 
 def mesh_implicit_periodic(
@@ -20,7 +55,11 @@ def mesh_implicit_periodic(
         exude=True,
         odt=False,
         lloyd=False,
-        verbose=False):
+        verbose=False,
+        return_periodic_pairs=False,
+        oracle_cache_size=0,
+        oracle_cache_quantum=0,
+        stats=None):
     """
     Generate a periodic mesh of an implicit function using pygalmesh.
 
@@ -28,32 +67,51 @@ def mesh_implicit_periodic(
     - f: implicit function
     - elements_in_thickness: number of elements in the thickness
     - verbose: print verbose output
+    - return_periodic_pairs: also return the periodic boundary vertex pairs
+    - oracle_cache_size: maximum number of values of f memoized for CGAL's
+      oracle queries (0 disables the cache)
+    - oracle_cache_quantum: spacing of the grid (in the unit cube the mesh
+      is generated in) that the cache keys are snapped to; 0 caches exact
+      points only
+    - stats: optional profiling.MeshingStats in which to record the time,
+      memory and counts of each stage
 
     Returns:
     - V: vertices of the mesh
     - T: tetrahedra of the mesh
     - boundary_faces: boundary faces of the mesh
+    - pairs: (if return_periodic_pairs is True) vertex pairs across the
+      periodic boundary (see periodic_vertex_pairs)
     """
+    if stats is None:
+        stats = MeshingStats()
 
     if hasattr(f, "thickness"):
         res = f.thickness / elements_in_thickness / f.domain.max()
     else:
         res = 0.025
 
-    mesh = pygalmesh.generate_periodic_mesh(
-        PyGalImplicit(f),
-        [0, 0, 0, 1, 1, 1],  # unit cube
-        manifold=True,
-        max_cell_circumradius=res,
-        max_radius_surface_delaunay_ball=res,
-        max_facet_distance=min(0.1 * res, 0.000625),
-        number_of_copies_in_output=1,
-        perturb=perturb,
-        exude=exude,
-        odt=odt,
-        lloyd=lloyd,
-        verbose=verbose,
-    )
+    with stats.stage("generation") as counts:
+        implicit = PyGalImplicit(f, oracle_cache_size, oracle_cache_quantum)
+        mesh = pygalmesh.generate_periodic_mesh(
+            implicit,
+            [0, 0, 0, 1, 1, 1],  # unit cube
+            manifold=True,
+            max_cell_circumradius=res,
+            max_radius_surface_delaunay_ball=res,
+            max_facet_distance=min(0.1 * res, 0.000625),
+            number_of_copies_in_output=1,
+            perturb=perturb,
+            exude=exude,
+            odt=odt,
+            lloyd=lloyd,
+            verbose=verbose,
+        )
+        counts["oracle_calls"] = implicit.evaluations
+        counts["native_oracle"] = implicit.native is not None
+        counts.update(cache_counts(implicit.cache))
+    if verbose and implicit.cache is not None:
+        print(f"Oracle cache hit rate: {counts['cache_hit_rate']:.1%}")
 
     V = mesh.points.copy()  # Vertices of the mesh
     T = mesh.cells_dict["tetra"].copy()  # Tetrahedra of the mesh
@@ -62,65 +120,155 @@ def mesh_implicit_periodic(
 
     assert V.size > 0
 
-    V, T, I, J = igl.remove_unreferenced(V, T)
+    with stats.stage("remove_unreferenced") as counts:
+        nV = len(V)
+        V, T, I, J = igl.remove_unreferenced(V, T)
+        counts["removed_vertices"] = nV - len(V)
 
-    # The boundary_faces contains extra faces from accross the periodic boundary.
-    # Filter these out by checking if the vertices are in the new vertex indices.
-    boundary_faces = I[boundary_faces]
-    boundary_faces = boundary_faces[np.all(boundary_faces >= 0, axis=1)]
+    with stats.stage("boundary_faces") as counts:
+        # The boundary_faces contains extra faces from accross the periodic boundary.
+        # Filter these out by checking if the vertices are in the new vertex indices.
+        boundary_faces = I[boundary_faces]
+        boundary_faces = boundary_faces[np.all(boundary_faces >= 0, axis=1)]
 
-    # Use the faces of T to determine the boundary faces with correct orientation
-    mixed_faces, *_ = igl.boundary_facets(T)
-    clean_boundary_faces = []
-    for face in mixed_faces:
-        if np.isin(face, boundary_faces).all():
-            clean_boundary_faces.append(face)
-    boundary_faces = np.array(clean_boundary_faces)
+        # Use the faces of T to determine the boundary faces with correct
+        # orientation. The remaining faces of T lie on the periodic boundary.
+        mixed_faces, *_ = igl.boundary_facets(T)
+        _, key = np.unique(
+            np.sort(np.vstack([mixed_faces, boundary_faces]), axis=1),
+            axis=0, return_inverse=True)
+        key = key.ravel()
+        is_boundary = np.isin(key[:len(mixed_faces)], key[len(mixed_faces):])
+        periodic_faces = mixed_faces[~is_boundary]
+        boundary_faces = mixed_faces[is_boundary]
+        counts["boundary_faces"] = len(boundary_faces)
+        counts["periodic_faces"] = len(periodic_faces)
 
-    # Determine which vertices are on the periodic boundary
-    # mixed_faces, *_ = igl.boundary_facets(T)
-    # interal_faces = mixed_faces[np.logical_not(
-    #     np.isin(mixed_faces, boundary_faces).all(axis=1))]
-    # periodic_vertices = np.unique(interal_faces)
+    with stats.stage("scale") as counts:
+        V *= f.domain  # Scale to domain
+        counts["vertices"], counts["elements"] = len(V), len(T)
 
-    V *= f.domain  # Scale to domain
+    if return_periodic_pairs:
+        # Determine which vertices are on the periodic boundary
+        periodic_vertices = np.unique(periodic_faces)
+        pairs = periodic_vertex_pairs(
+            V[periodic_vertices], (np.zeros(3), f.domain))
+        pairs = [periodic_vertices[P] for P in pairs]
+        return V, T, boundary_faces, pairs
 
     return V, T, boundary_faces
 
 
-def tile_mesh(V, T, domain, repeats):
-    """Tile a mesh in 3D."""
+def periodic_vertex_pairs(V, bounds=None, tol=1e-8):
+    """
+    Find the vertices identified with each other across the periodic boundary.
+
+    Parameters:
+    - V: vertices of the periodic cell mesh
+    - bounds: (min, max) corners of the periodic cell (default: bbox of V)
+    - tol: matching tolerance relative to the cell size
+
+    Returns:
+    - list of three (N, 2) arrays, one per axis, with rows (i, j) such that
+      V[i] is on the lower face and V[j] = V[i] + (max - min)[axis] on the
+      upper face
+    """
+    if bounds is None:
+        bounds = V.min(axis=0), V.max(axis=0)
+    lower, upper = np.asarray(bounds[0], float), np.asarray(bounds[1], float)
+    tol *= (upper - lower).max()
+
+    pairs = []
+    for axis in range(3):
+        i = np.flatnonzero(np.abs(V[:, axis] - lower[axis]) <= tol)
+        j = np.flatnonzero(np.abs(V[:, axis] - upper[axis]) <= tol)
+        in_face = np.delete(np.arange(3), axis)
+        match = _match_points(V[j][:, in_face], V[i][:, in_face], tol)
+        pairs.append(np.column_stack([i[match >= 0], j[match[match >= 0]]]))
+    return pairs
+
+
+def tile_mesh(V, T, domain, repeats, pairs=None):
+    """
+    Tile a periodic mesh in 3D.
+
+    Copies of a vertex on the lower face of a cell are merged into the
+    matching vertex of the previous cell along that axis, using the periodic
+    boundary vertex pairs. The merged indices are computed directly and the
+    outputs are allocated once, so time and memory are linear in the size of
+    the tiled mesh.
+
+    Parameters:
+    - V: vertices of the periodic cell mesh
+    - T: elements (tetrahedra or triangles) of the cell mesh
+    - domain: size of the periodic cell
+    - repeats: number of copies in each direction
+    - pairs: periodic boundary vertex pairs (see periodic_vertex_pairs);
+      computed from V if None
+
+    Returns:
+    - V: vertices of the tiled mesh
+    - T: elements of the tiled mesh
+    """
+    domain = np.broadcast_to(np.asarray(domain, dtype=float), 3)
+    repeats = np.asarray(repeats, dtype=int)
+    if pairs is None:
+        origin = V.min(axis=0)
+        pairs = periodic_vertex_pairs(V, (origin, origin + domain))
+
     nV = len(V)
+    n_cells = np.prod(repeats)
+
+    # For each vertex on a lower face, its copy on the upper face
+    partner = np.full((3, nV), -1, dtype=np.int64)
+    for axis, P in enumerate(pairs):
+        partner[axis, P[:, 0]] = P[:, 1]
+
+    # Find the cell and vertex owning each vertex copy by stepping back
+    # across every lower face shared with a previous cell.
+    cell = np.repeat(np.indices(repeats).reshape(3, -1).T, nV, axis=0)
+    vertex = np.tile(np.arange(nV, dtype=np.int64), n_cells)
+    for axis in range(3):
+        move = (cell[:, axis] > 0) & (partner[axis, vertex] >= 0)
+        vertex[move] = partner[axis, vertex[move]]
+        cell[move, axis] -= 1
+    owner = np.ravel_multi_index(cell.T, repeats) * nV + vertex
+    del vertex
+
+    is_owner = owner == np.arange(len(owner))
+    index = np.cumsum(is_owner) - 1
 
-    for i, repeat in enumerate(repeats):
-        offset = np.zeros(3)
-        offset[i] = domain[i]
-        V = np.vstack([
-            V + r * offset for r in range(repeat)
-        ])
-    T = np.vstack([
-        T + r * nV for r in range(np.prod(repeats))
-    ])
+    tiled_V = V[owner[is_owner] % nV] + cell[is_owner] * domain
+    del cell
 
-    V, *_, T = igl.remove_duplicate_vertices(V, T, 1e-2)
+    tiled_T = index[owner][
+        (np.arange(n_cells) * nV)[:, None, None] + T[None]
+    ].reshape(-1, T.shape[1])
 
-    return V, T
+    return tiled_V, tiled_T
 
 
 def periodic_components(V, F, bounds=None):
-    A = igl.adjacency_matrix(F).tolil()
+    """
+    Label the connected components of a periodic mesh.
 
-    # Add periodic adjacencies
-    if bounds is None:
-        bounds = V.min(axis=0), V.max(axis=0)
-    for i in range(3):
-        for vi, v in enumerate(V):
-            periodic_copy = v.copy()
-            periodic_copy[i] += bounds[1][i] - bounds[0][i]
+    Vertices identified across the periodic boundary (see
+    periodic_vertex_pairs) are treated as connected.
+
+    Parameters:
+    - V: vertices of the mesh
+    - F: elements of the mesh
+    - bounds: (min, max) corners of the periodic cell (default: bbox of V)
 
-            vj = np.argmin(np.linalg.norm(V - periodic_copy, axis=1))
+    Returns:
+    - component label of each vertex
+    """
+    import scipy.sparse
 
-            if np.linalg.norm(V[vj] - periodic_copy) < 1e-10:
-                A[vi, vj] = A[vj, vi] = 1
+    edges = np.vstack(periodic_vertex_pairs(V, bounds))
+    P = scipy.sparse.coo_matrix(
+        (np.ones(len(edges)), (edges[:, 0], edges[:, 1])),
+        shape=(len(V), len(V)))
+    A = igl.adjacency_matrix(F) + P + P.T
 
     return igl.vertex_components_from_adjacency_matrix(A.tocsc())[0]
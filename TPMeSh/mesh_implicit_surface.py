@@ -13,6 +13,23 @@ class Cuboid:
             (Z - self.x0[2]) * (Z - self.x1[2])
         ], axis=0)
 
+    def eval_grid(self, xs, ys, zs, out=None):
+        # Separable: the max of one term per axis
+        return np.maximum(np.maximum(
+            ((xs - self.x0[0]) * (xs - self.x1[0]))[:, None, None],
+            ((ys - self.x0[1]) * (ys - self.x1[1]))[None, :, None]),
+            ((zs - self.x0[2]) * (zs - self.x1[2]))[None, None, :], out=out)
+
+    def bounds(self, lo, hi):
+        """Lower and upper bounds of the values in the boxes [lo, hi] (N, 3)."""
+        def q(X):
+            return (X - self.x0) * (X - self.x1)
+        # Each term is a parabola: its maximum is at an end, minimum at the
+        # vertex (clamped to the box)
+        lower = q(np.clip((self.x0 + self.x1) / 2, lo, hi)).max(axis=1)
+        upper = np.maximum(q(lo), q(hi)).max(axis=1)
+        return lower, upper
+
 
 class Intersection:
     def __init__(self, domains):
@@ -21,46 +38,674 @@ class Intersection:
     def __call__(self, X, Y, Z):
         return np.max([domain(X, Y, Z) for domain in self.domains], axis=0)
 
+    def eval_grid(self, xs, ys, zs, out=None):
+        S = eval_grid(self.domains[0], xs, ys, zs, out=out)
+        # Combine the other domains one x-plane at a time to limit memory
+        for domain in self.domains[1:]:
+            for i in range(len(xs)):
+                np.maximum(
+                    S[i], eval_grid(domain, xs[i:i+1], ys, zs)[0], out=S[i])
+        return S
+
+
+def eval_grid(f, xs, ys, zs, out=None, dtype=np.float64):
+    """
+    Evaluate f on the grid xs × ys × zs.
+
+    Uses f.eval_grid if available (e.g., the compiled implicits, which only
+    evaluate the trig functions along each axis). Otherwise, f is evaluated
+    one x-plane at a time. In both cases the values are written directly
+    into the output array without building coordinate arrays.
+
+    Parameters:
+    - f: vectorized implicit function
+    - xs, ys, zs: coordinates of the grid along each axis
+    - out: optional C-contiguous (len(xs), len(ys), len(zs)) array to write
+      into (e.g., reused across calls)
+    - dtype: type of the new output array if out is None (np.float32 halves
+      the memory of the field; values are still computed in float64)
+
+    Returns:
+    - (len(xs), len(ys), len(zs)) array of values (out if given)
+    """
+    xs, ys, zs = (np.ascontiguousarray(v, dtype=float) for v in (xs, ys, zs))
+    shape = (len(xs), len(ys), len(zs))
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    elif out.shape != shape:
+        raise ValueError(f"out has shape {out.shape}, expected {shape}")
+
+    if hasattr(f, "eval_grid"):
+        return f.eval_grid(xs, ys, zs, out=out)
+
+    Y, Z = (A.ravel() for A in np.meshgrid(ys, zs, indexing="ij"))
+    for i, x in enumerate(xs):
+        out[i] = f(np.full(len(Y), x), Y, Z).reshape(shape[1:])
+    return out
+
 
 def res3D(domain, res_y):
     x, y, z = np.hsplit(domain, 3)
     res_x = res_y * (x[1] - x[0]) / (y[1] - y[0])
     res_z = res_y * (z[1] - z[0]) / (y[1] - y[0])
-    return int(res_x), int(res_y), int(res_z)
+    # Round, since e.g. res_y * 2π / 2π may be 29.999...
+    return round(res_x.item()), int(res_y), round(res_z.item())
 
 
-def _eval_implicit(f, domain, res_y):
+def _grid_axes(domain, res_y, z_range=None):
+    """Coordinates of the grid along each axis (only z layers [k0, k1))."""
     x, y, z = np.hsplit(domain, 3)
 
     res_x, res_y, res_z = res3D(domain, res_y)
+    k0, k1 = (0, res_z + 1) if z_range is None else z_range
+
+    return (
+        x[0] + (x[1] - x[0]) * np.arange(res_x + 1) / res_x,
+        y[0] + (y[1] - y[0]) * np.arange(res_y + 1) / res_y,
+        z[0] + (z[1] - z[0]) * np.arange(k0, k1) / res_z,
+    )
+
+
+def _eval_implicit(f, domain, res_y, z_range=None, out=None, dtype=np.float64):
+    """
+    Evaluate f on the grid, optionally only on the z layers [k0, k1).
+
+    See eval_grid for out and dtype.
+    """
+    return eval_grid(
+        f, *_grid_axes(domain, res_y, z_range), out=out, dtype=dtype)
 
-    X, Y, Z = np.mgrid[0:res_x+1, 0:res_y+1, 0:res_z+1]
-    X = x[0] + (x[1] - x[0]) * X / res_x
-    Y = y[0] + (y[1] - y[0]) * Y / res_y
-    Z = z[0] + (z[1] - z[0]) * Z / res_z
 
-    return f(X.flatten(), Y.flatten(), Z.flatten()).reshape((res_x+1, res_y+1, res_z+1))
+def _with_occurrence(keys):
+    """Append to each row of keys the number of identical rows before it."""
+    _, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    counts = np.bincount(inverse)
+    order = np.argsort(inverse, kind="stable")
+    rank = np.empty(len(keys), dtype=np.int64)
+    rank[order] = np.arange(len(keys)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.column_stack([keys, rank])
 
 
-def mesh_implicit_surface(f, domain, res_y=100, intersect_with_box=False):
+def _edge_keys(P):
+    """Key of the grid edge (or node) on which each grid point of P lies."""
+    base = np.floor(P)
+    on_line = P == base
+    # Index of the interpolated coordinate, or P.shape[1] for grid nodes
+    kind = np.where(on_line.all(axis=1), P.shape[1], np.argmin(on_line, axis=1))
+    return np.column_stack([kind, base])
+
+
+def _match_points(A, B, tol=1e-8, grid_points=False):
+    """
+    For each row of B, the index of the matching row of A (or -1).
+
+    Points are hashed on a grid of size tol, and the ones left unmatched on
+    the grids shifted by half a cell along each subset of the axes (2^d grids
+    in d dimensions). Every pair closer than tol/2 along each axis falls in
+    the same cell of one of them, so it is found unless one of its points
+    was already matched. Points with the same hash are paired one-to-one.
+
+    With grid_points, A and B are the in-plane grid coordinates of marching
+    cubes vertices on a shared grid plane. The same vertex can differ in the
+    last bits depending on which cube created it, while distinct vertices
+    can be arbitrarily close next to (near) zero samples, so they are first
+    matched by the grid edge they lie on.
+    """
+    shifts = np.array(list(np.ndindex(*[2] * A.shape[1]))) / 2
+    keys = [lambda P, shift=shift: np.floor(P / tol + shift) for shift in shifts]
+    if grid_points:
+        keys.insert(0, _edge_keys)
+
+    match = np.full(len(B), -1, dtype=np.int64)
+    free_A, free_B = np.arange(len(A)), np.arange(len(B))
+    for key_of in keys:
+        if len(free_A) == 0 or len(free_B) == 0:
+            break
+        _, key = np.unique(np.vstack([
+            _with_occurrence(key_of(A[free_A])),
+            _with_occurrence(key_of(B[free_B])),
+        ]), axis=0, return_inverse=True)
+        key = key.ravel()
+        key_to_index = np.full(key.max() + 1, -1, dtype=np.int64)
+        key_to_index[key[:len(free_A)]] = free_A
+        match[free_B] = key_to_index[key[len(free_A):]]
+
+        free_A = np.setdiff1d(free_A, match[free_B])
+        free_B = free_B[match[free_B] < 0]
+    return match
+
+
+def marching_cubes_slabs(f, domain, res_y=100, slab_size=64, dtype=np.float64):
+    """
+    Run marching cubes on f one z-slab at a time.
+
+    Each slab spans slab_size cells and shares its first layer of samples with
+    the previous slab. Vertices on the shared layer are welded to the ones
+    already emitted by matching their in-layer grid coordinates, so only
+    O(slab) samples are held in memory at once, in a single buffer reused by
+    all slabs.
+
+    Parameters:
+    - f: vectorized implicit function
+    - domain: (2, 3) bounds of the grid
+    - res_y: grid resolution along y
+    - slab_size: number of cells along z per slab
+    - dtype: type of the sampled field (see eval_grid)
+
+    Yields:
+    - V: vertices first emitted by this slab (in grid index coordinates)
+    - F: triangles of this slab indexing the concatenation of all yielded V
+    """
     import mcubes  # marching cubes
 
+    res_x, _, res_z = res3D(domain, res_y)
+    buffer = np.empty((res_x + 1) * (res_y + 1) * (slab_size + 1), dtype=dtype)
+
+    n_vertices = 0
+    top = None  # (indices, xy) of the vertices on the previous slab's top layer
+    for k0 in range(0, res_z, slab_size):
+        k1 = min(k0 + slab_size, res_z)
+
+        shape = (res_x + 1, res_y + 1, k1 - k0 + 1)
+        S = buffer[:np.prod(shape)].reshape(shape)
+        V, F = mcubes.marching_cubes(
+            _eval_implicit(f, domain, res_y, z_range=(k0, k1 + 1), out=S), 0)
+
+        index = np.full(len(V), -1, dtype=np.int64)
+        if top is not None:
+            bottom = np.flatnonzero(V[:, 2] == 0)
+            match = _match_points(top[1], V[bottom, :2], grid_points=True)
+            index[bottom[match >= 0]] = top[0][match[match >= 0]]
+
+        new = index < 0
+        index[new] = n_vertices + np.arange(np.count_nonzero(new))
+        n_vertices += np.count_nonzero(new)
+
+        is_top = V[:, 2] == k1 - k0
+        top = index[is_top], V[is_top, :2]
+
+        V[:, 2] += k0
+        yield V[new], index[F.astype(np.int64)]
+
+
+def _concatenate_chunks(chunks):
+    """
+    Concatenate the (V, F) chunks of marching_cubes_slabs.
+
+    The result arrays are grown in place (by doubling, then trimmed), so
+    the chunks are never all held next to their concatenation.
+    """
+    V = np.empty((0, 3))
+    F = np.empty((0, 3), dtype=np.int64)
+    n_V = n_F = 0
+    for V_chunk, F_chunk in chunks:
+        for A, n, chunk in ((V, n_V, V_chunk), (F, n_F, F_chunk)):
+            if n + len(chunk) > len(A):
+                A.resize((max(2 * len(A), n + len(chunk)), 3), refcheck=False)
+            A[n:n + len(chunk)] = chunk
+        n_V += len(V_chunk)
+        n_F += len(F_chunk)
+    V.resize((n_V, 3), refcheck=False)
+    F.resize((n_F, 3), refcheck=False)
+    return V, F
+
+
+_CUBE_CORNERS = np.array(list(np.ndindex(2, 2, 2)), dtype=np.int64)
+
+
+def _cell_corners(P):
+    """Point values P (nx, ny, nz) at the 8 corners (N, 8) of each cell."""
+    n = np.array(P.shape) - 1
+    return np.stack([
+        P[i:i + n[0], j:j + n[1], k:k + n[2]] for i, j, k in _CUBE_CORNERS
+    ], axis=-1).reshape(-1, 8)
+
+
+_MC_BLOCK_SIZE = 8  # Cells along each axis of the polygonized sub-blocks
+
+
+class _OctreeParts:
+    """
+    Parts of an implicit function (the domains of an Intersection, or the
+    function itself) with their sign tests on boxes of the grid.
+
+    A part has a definite sign in a box if:
+    - its bounds are definite, if it has bounds(lo, hi) (e.g., Cuboid),
+    - otherwise, its values at the corners of the box are beyond the error
+      of trilinear interpolation, sum_i Δ_i² M_i / 8, where M_i (given by
+      gradient_lipschitz) bounds |∂²f/∂x_i²|.
+    """
+
+    def __init__(self, f, axes, coarse, gradient_lipschitz):
+        self.axes = axes
+        self.coarse = coarse  # Indices of the coarse lattice along each axis
+        if isinstance(f, Intersection):
+            self.parts = list(f.domains)
+            Ms = gradient_lipschitz
+            if Ms is None:
+                Ms = [None] * len(self.parts)
+        else:
+            self.parts, Ms = [f], [gradient_lipschitz]
+        self.M = []
+        for part, M in zip(self.parts, Ms):
+            if hasattr(part, "bounds"):
+                M = None
+            elif M is None:
+                raise ValueError(
+                    "gradient_lipschitz must bound |∂²f/∂x_i²| of every "
+                    "function without bounds")
+            else:
+                M = np.broadcast_to(np.asarray(M, dtype=float), 3)
+            self.M.append(M)
+
+        coords = [v[I] for v, I in zip(axes, coarse)]
+        self.coarse_values = [eval_grid(part, *coords) for part in self.parts]
+        self.evaluations = sum(
+            V.size for V, M in zip(self.coarse_values, self.M) if M is not None)
+
+    def points(self, I):
+        """Coordinates of the grid points I (N, 3)."""
+        return np.column_stack([v[I[:, i]] for i, v in enumerate(self.axes)])
+
+    def evaluate(self, I):
+        """Values of the parts at the grid points I (N, 3)."""
+        X = self.points(I).T
+        values = []
+        for part, M in zip(self.parts, self.M):
+            values.append(np.asarray(part(*X), dtype=float))
+            if M is not None:
+                self.evaluations += len(I)
+        return values
+
+    def definite_sign(self, corner_values, lo, hi):
+        """
+        Whether f > 0 and whether f < 0 in the boxes [lo, hi] (N, 3) of the
+        grid.
+
+        Parameters:
+        - corner_values: values of each part at the 8 corners (N, 8) of the
+          boxes (in _CUBE_CORNERS order)
+        - lo, hi: corners of the boxes (grid indices)
+        """
+        P_lo, P_hi = self.points(lo), self.points(hi)
+        positive = np.zeros(len(lo), dtype=bool)
+        negative = np.ones(len(lo), dtype=bool)
+        for part, M, S in zip(self.parts, self.M, corner_values):
+            if M is None:
+                lower, upper = part.bounds(P_lo, P_hi)
+            else:
+                error = ((P_hi - P_lo)**2 * M).sum(axis=1) / 8
+                lower, upper = S.min(axis=1) - error, S.max(axis=1) + error
+            positive |= lower > 0
+            negative &= upper < 0
+        return positive, negative
+
+
+def marching_cubes_octree(
+    f, domain, res_y=100, block_size=64, coarse_size=4, gradient_lipschitz=None
+):
+    """
+    Run marching cubes on f only near its zero level set.
+
+    f is evaluated on a coarse lattice (one sample every coarse_size grid
+    cells) with a single eval_grid call. Coarse cells in which f has a
+    definite sign (see _OctreeParts) are pruned. The other cells are split
+    into octants level by level, evaluating the new lattice points of all
+    remaining cells of a block in one batched call per level, and pruning
+    the octants with a definite sign, down to cells of 2³ grid cells whose
+    samples are all evaluated. The samples of the pruned cells are only
+    needed by marching cubes for their sign.
+
+    The sign test is conservative: gradient_lipschitz must bound the second
+    derivatives of f (e.g., analytically, or from the second differences of
+    f on a finer grid with a margin), as a sampled estimate could prune a
+    feature thinner than the coarse lattice.
+
+    Only the sub-blocks of 8³ cells containing remaining cells are
+    polygonized (the cost of marching cubes grows with the volume, not the
+    surface), and their vertices are welded by the grid edge they lie on,
+    so the mesh is crack-free and, if no cell crossed by the surface was
+    pruned, equal to the one of the uniform grid. This pays off for
+    expensive functions or high resolutions: below ~200³ cells, evaluating
+    a compiled function on the full grid is usually faster.
+
+    Parameters:
+    - f: vectorized implicit function (or Intersection of them)
+    - domain: (2, 3) bounds of the grid
+    - res_y: grid resolution along y
+    - block_size: number of cells along each axis of the blocks refined
+      together (a multiple of coarse_size)
+    - coarse_size: number of cells along each axis of the coarse cells (a
+      power of two)
+    - gradient_lipschitz: bounds on |∂²f/∂x_i²| (scalar or per axis, or a
+      list with one per domain of an Intersection, None for the domains
+      with bounds, e.g., Cuboid); required
+
+    Returns:
+    - V: vertices of the mesh (in grid index coordinates)
+    - F: triangles of the mesh
+    - evaluations: number of points at which f was evaluated (excluding
+      the domains of an Intersection that have bounds, e.g., Cuboid)
+    """
+    import mcubes  # marching cubes
+
+    if coarse_size < 2 or coarse_size & (coarse_size - 1):
+        raise ValueError("coarse_size must be a power of two")
+    if block_size % coarse_size:
+        raise ValueError("block_size must be a multiple of coarse_size")
+
+    axes = _grid_axes(domain, res_y)
+    n_cells = np.array([len(v) - 1 for v in axes])
+    coarse = [np.unique(np.minimum(np.arange(0, n + coarse_size, coarse_size), n))
+              for n in n_cells]
+    parts = _OctreeParts(f, axes, coarse, gradient_lipschitz)
+
+    # Classify the coarse cells
+    coarse_cells = np.stack(np.meshgrid(
+        *[np.arange(len(I) - 1) for I in coarse], indexing="ij"), axis=-1
+    ).reshape(-1, 3)
+    positive, negative = parts.definite_sign(
+        [_cell_corners(V) for V in parts.coarse_values],
+        np.column_stack([I[c] for I, c in zip(coarse, coarse_cells.T)]),
+        np.column_stack([I[c + 1] for I, c in zip(coarse, coarse_cells.T)]))
+    coarse_sign = np.zeros(len(coarse_cells), dtype=np.int8)
+    coarse_sign[positive], coarse_sign[negative] = 1, -1
+    coarse_sign = coarse_sign.reshape([len(I) - 1 for I in coarse])
+
+    per_block = block_size // coarse_size
+    Vs, Fs = [], []
+    n_vertices = 0
+    for block in np.ndindex(*(-(-n_cells // block_size))):
+        origin = np.array(block) * block_size
+        size = np.minimum(origin + block_size, n_cells) - origin  # Cells
+        signs = coarse_sign[tuple(
+            slice(b * per_block, (b + 1) * per_block) for b in block)]
+        if signs.all():
+            continue  # No surface in the block
+
+        # Values of the parts at the block's samples (NaN if not evaluated)
+        values = [np.full(size + 1, np.nan) for _ in parts.parts]
+        evaluated = np.zeros(size + 1, dtype=bool)
+        local = [
+            I[(I >= o) & (I <= o + n)] - o for I, o, n in zip(coarse, origin, size)]
+        for S, V in zip(values, parts.coarse_values):
+            S[np.ix_(*local)] = V[np.ix_(*[
+                np.searchsorted(I, l + o) for I, l, o in zip(coarse, local, origin)])]
+        evaluated[np.ix_(*local)] = True
+
+        # Refine the remaining cells level by level. pruned holds the signs
+        # of the pruned cells at the current level (0 if not pruned).
+        pruned = signs
+        cells, s = np.argwhere(signs == 0), coarse_size
+        while s > 1:
+            h = s // 2
+            n = -(-size // h)  # Cells at the next level
+            if len(cells):
+                # Evaluate the lattice points of spacing h in the cells: the
+                # octant corners 2c + {0, 1, 2} of the cells c, clamped to n
+                active = np.zeros(-(-size // s), dtype=bool)
+                active[tuple(cells.T)] = True
+                K = np.zeros(2 * np.array(active.shape) + 1, dtype=bool)
+                K[:-1, :-1, :-1] = active.repeat(2, 0).repeat(2, 1).repeat(2, 2)
+                for axis in range(3):
+                    K = np.moveaxis(K, axis, 0)
+                    K[1:] |= K[:-1].copy()
+                    K[n[axis]] |= K[n[axis] + 1:].any(axis=0)
+                    K = np.moveaxis(K[:n[axis] + 1], 0, axis)
+                J = np.minimum(np.argwhere(K) * h, size)
+                J = J[~evaluated[tuple(J.T)]]
+                for S, v in zip(values, parts.evaluate(J + origin)):
+                    S[tuple(J.T)] = v
+                evaluated[tuple(J.T)] = True
+
+            pruned = pruned.repeat(2, 0).repeat(2, 1).repeat(2, 2)[:n[0], :n[1], :n[2]]
+            if h == 1 or len(cells) == 0:
+                leaves, s = s * cells, h
+                continue
+
+            # Split the cells into octants and prune those with a definite sign
+            octants = (2 * cells[:, None] + _CUBE_CORNERS).reshape(-1, 3)
+            octants = octants[(octants < n).all(axis=1)]
+            lo = octants * h
+            hi = np.minimum(lo + h, size)
+            C = np.where(_CUBE_CORNERS, hi[:, None], lo[:, None]).reshape(-1, 3)
+            positive, negative = parts.definite_sign(
+                [S[tuple(C.T)].reshape(-1, 8) for S in values],
+                lo + origin, hi + origin)
+            pruned[tuple(octants[positive].T)] = 1
+            pruned[tuple(octants[negative].T)] = -1
+            cells, s = octants[~(positive | negative)], h
+
+        # Fill in the signs of the pruned cells (each covering the samples
+        # of its lower corner), then of the last samples along each axis
+        # from their lower neighbors in the same pruned cell
+        S = np.max(values, axis=0) if len(values) > 1 else values[0]
+        np.copyto(S[:-1, :-1, :-1], pruned, where=~evaluated[:-1, :-1, :-1])
+        for axis in range(3):
+            face = np.moveaxis(S, axis, 0)
+            np.copyto(face[-1], np.sign(face[-2]), where=np.isnan(face[-1]))
+        assert not np.isnan(S).any()
+
+        # Polygonize the sub-blocks with remaining (fully evaluated) cells
+        subs = np.zeros(-(-size // _MC_BLOCK_SIZE), dtype=bool)
+        subs[tuple((leaves // _MC_BLOCK_SIZE).T)] = True
+        for sub in np.argwhere(subs).tolist():
+            x, y, z = (_MC_BLOCK_SIZE * i for i in sub)
+            V, F = mcubes.marching_cubes(np.ascontiguousarray(S[
+                x:x + _MC_BLOCK_SIZE + 1, y:y + _MC_BLOCK_SIZE + 1,
+                z:z + _MC_BLOCK_SIZE + 1]), 0)
+            if len(F):
+                Vs.append(V + (origin + (x, y, z)))
+                Fs.append(F + n_vertices)
+                n_vertices += len(V)
+
+    if n_vertices == 0:
+        return np.empty((0, 3)), np.empty((0, 3), dtype=np.int64), parts.evaluations
+
+    # Weld the vertices shared by neighboring sub-blocks by their grid edge.
+    # Marching cubes creates one vertex per edge of a sub-block, except at zero
+    # samples, where the coincident vertices of a block are kept apart by
+    # their rank.
+    V = np.vstack(Vs)
+    block_ids = np.repeat(np.arange(len(Vs)), [len(v) for v in Vs])
+    edges = _edge_keys(V).astype(np.int64)
+    keys = np.ravel_multi_index(edges.T, (4, *(n_cells + 1)))
+    node = edges[:, 0] == 3
+    if node.any():
+        rank = _with_occurrence(np.column_stack(
+            [block_ids[node], keys[node]]))[:, -1]
+        keys[node] = 4 * np.prod(n_cells + 1) + keys[node] * (rank.max() + 1) + rank
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    return V[first], inverse.ravel()[np.vstack(Fs).astype(np.int64)], parts.evaluations
+
+
+def mesh_implicit_surface(
+    f, domain, res_y=100, intersect_with_box=False, slab_size=None,
+    dtype=np.float64, adaptive=False, gradient_lipschitz=None
+):
+    """
+    Generate a surface mesh of an implicit function using marching cubes.
+
+    Parameters:
+    - f: vectorized implicit function
+    - domain: (2, 3) bounds of the grid
+    - res_y: grid resolution along y
+    - intersect_with_box: clip the surface to (slightly inside) the domain
+    - slab_size: if given, stream the grid in z-slabs of this many cells
+      (see marching_cubes_slabs) instead of evaluating it all at once
+    - dtype: type of the sampled field (np.float32 halves its memory)
+    - adaptive: only sample the grid near the surface using an octree (see
+      marching_cubes_octree), with fewer evaluations of f (incompatible
+      with slab_size and dtype)
+    - gradient_lipschitz: bounds on |∂²f/∂x_i²| (required if adaptive)
+
+    Returns:
+    - V: vertices of the mesh
+    - F: triangles of the mesh
+    """
+    import mcubes  # marching cubes
+
+    if adaptive and (slab_size is not None or np.dtype(dtype) != np.float64):
+        raise ValueError("adaptive cannot be combined with slab_size or dtype")
+
     # Add a small epsilon to the domain to avoid numerical clipping
     eps = np.ptp(domain) * 1e-6
 
-    S = _eval_implicit(
-        Intersection([f, Cuboid(domain[0]+eps, domain[1]-eps)]
-                     ) if intersect_with_box else f,
-        domain, res_y)
-    print(S.min(), S.max())
-    assert S.min() < 0 and S.max() > 0
+    if intersect_with_box:
+        f = Intersection([f, Cuboid(domain[0]+eps, domain[1]-eps)])
+
+    if adaptive:
+        if intersect_with_box:
+            gradient_lipschitz = [gradient_lipschitz, None]
+        V, F, _ = marching_cubes_octree(
+            f, domain, res_y, gradient_lipschitz=gradient_lipschitz)
+    elif slab_size is None:
+        S = _eval_implicit(f, domain, res_y, dtype=dtype)
+        print(S.min(), S.max())
+        assert S.min() < 0 and S.max() > 0
 
-    V, F = mcubes.marching_cubes(S, 0)
+        V, F = mcubes.marching_cubes(S, 0)
+        del S
+    else:
+        V, F = _concatenate_chunks(
+            marching_cubes_slabs(f, domain, res_y, slab_size, dtype))
     assert len(V) > 0
     assert len(F) > 0
 
     F = F.astype(np.int64)
 
+    return _grid_to_domain(V, domain), F
+
+
+def mesh_periodic_implicit_surface(f, repeats, res_y=100, intersect_with_box=False, dtype=np.float64):
+    """
+    Generate a surface mesh of a periodic implicit function tiled in 3D.
+
+    Only one periodic cell (of size f.domain) is evaluated. Its samples on
+    opposite faces are made identical, so the marching cubes meshes of
+    neighboring cells share their face vertices exactly and are welded by
+    index mapping. The box clipping (intersect_with_box) only changes the
+    cells on the outer boundary, which are polygonized once per distinct
+    boundary configuration.
+
+    Parameters:
+    - f: vectorized implicit function with period f.domain
+    - repeats: number of cells in each direction
+    - res_y: grid resolution of one cell along y
+    - intersect_with_box: clip the surface to (slightly inside) the domain
+    - dtype: type of the sampled field (np.float32 halves its memory)
+
+    Returns:
+    - V: vertices of the mesh in the domain [0, repeats * f.domain]
+    - F: triangles of the mesh
+    """
+    import mcubes  # marching cubes
+
+    repeats = np.asarray(repeats, dtype=int)
+    period = np.asarray(f.domain, dtype=float)
+    domain = np.vstack([np.zeros(3), repeats * period])
+
+    cell_domain = np.vstack([np.zeros(3), period])
+    res = np.array(res3D(cell_domain, res_y))
+
+    # Make opposite faces identical so the cells match exactly
+    S0 = _eval_implicit(f, cell_domain, res_y, dtype=dtype)
+    S0[-1, :, :] = S0[0, :, :]
+    S0[:, -1, :] = S0[:, 0, :]
+    S0[:, :, -1] = S0[:, :, 0]
+
+    # Add a small epsilon to the domain to avoid numerical clipping
+    eps = np.ptp(domain) * 1e-6
+    x0, x1 = domain[0] + eps, domain[1] - eps
+
+    def cell_type(cell):
+        """Which faces of the cell lie on the outer boundary."""
+        if not intersect_with_box:
+            return None
+        return tuple((i == 0, i == r - 1) for i, r in zip(cell, repeats))
+
+    meshes = {}
+
+    def cell_mesh(cell):
+        t = cell_type(cell)
+        if t not in meshes:
+            S = S0
+            if t is not None:
+                S = S0.copy()
+                for axis, (lower, upper) in enumerate(t):
+                    if not (lower or upper):
+                        continue
+                    # Same clipping as Cuboid, restricted to outer faces
+                    X = period[axis] * (
+                        cell[axis] + np.arange(res[axis] + 1) / res[axis])
+                    clip = (X - x0[axis]) * (X - x1[axis])
+                    if not lower:
+                        clip[0] = -np.inf
+                    if not upper:
+                        clip[-1] = -np.inf
+                    shape = np.ones(3, dtype=int)
+                    shape[axis] = -1
+                    np.maximum(S, clip.reshape(shape), out=S)
+            V, F = mcubes.marching_cubes(S, 0)
+            meshes[t] = V, F.astype(np.int64)
+        return meshes[t]
+
+    matches = {}
+
+    def face_match(prev_cell, cell, axis):
+        """Pairs of vertices on the face shared by prev_cell and cell."""
+        key = cell_type(prev_cell), cell_type(cell), axis
+        if key not in matches:
+            prev_V, cur_V = cell_mesh(prev_cell)[0], cell_mesh(cell)[0]
+            in_face = np.delete(np.arange(3), axis)
+            prev = np.flatnonzero(prev_V[:, axis] == res[axis])
+            cur = np.flatnonzero(cur_V[:, axis] == 0)
+            match = _match_points(
+                prev_V[prev][:, in_face], cur_V[cur][:, in_face],
+                grid_points=True)
+            matches[key] = cur[match >= 0], prev[match[match >= 0]]
+        return matches[key]
+
+    Vs, Fs = [], []
+    n_vertices = 0
+    indices = {}  # global vertex indices of the cells still needed
+    for cell in np.ndindex(*repeats):
+        V, F = cell_mesh(cell)
+
+        index = np.full(len(V), -1, dtype=np.int64)
+        for axis in range(3):
+            if cell[axis] == 0:
+                continue
+            prev_cell = list(cell)
+            prev_cell[axis] -= 1
+            prev_cell = tuple(prev_cell)
+            cur, prev = face_match(prev_cell, cell, axis)
+            unset = index[cur] < 0
+            index[cur[unset]] = indices[prev_cell][prev[unset]]
+
+        new = index < 0
+        index[new] = n_vertices + np.arange(np.count_nonzero(new))
+        n_vertices += np.count_nonzero(new)
+
+        Vs.append(V[new] + res * np.array(cell))
+        Fs.append(index[F])
+
+        indices[cell] = index
+        # Cells are visited in lexicographic order, so the previous cell
+        # along x is no longer a neighbor of any remaining cell.
+        indices.pop((cell[0] - 1, *cell[1:]), None)
+
+    V = np.vstack(Vs)
+    F = np.vstack(Fs)
+    assert len(V) > 0
+    assert len(F) > 0
+
+    return _grid_to_domain(V, domain), F
+
+
+def _grid_to_domain(V, domain):
+    """Map marching cubes vertices (in grid coordinates) to the domain."""
     # Scale to [0, 1]
     V = (V - V.min(axis=0)) / (V.max(axis=0) - V.min(axis=0))
     # Scale to domain
@@ -69,4 +714,4 @@ def mesh_implicit_surface(f, domain, res_y=100, intersect_with_box=False):
     if np.isnan(V).any():
         raise ValueError("NaNs in mesh")
 
-    return V, F
+    return V
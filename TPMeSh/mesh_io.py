@@ -0,0 +1,220 @@
+import contextlib
+import pathlib
+import tempfile
+
+import numpy as np
+
+BLOCK_ROWS = 2**20  # Rows converted and written at a time
+
+
+def _blocks(A, rows=None):
+    """Consecutive blocks of at most rows (default: BLOCK_ROWS) rows of A."""
+    rows = BLOCK_ROWS if rows is None else rows
+    for start in range(0, len(A), rows):
+        yield A[start:start + rows]
+
+
+class _Spool:
+    """Rows appended to a temporary file, read back as a memory map."""
+
+    def __init__(self, directory, dtype, width):
+        self.file = tempfile.TemporaryFile(dir=directory)
+        self.dtype = np.dtype(dtype)
+        self.width = width
+        self.rows = 0
+
+    def append(self, A):
+        A = np.asarray(A, dtype=self.dtype).reshape(-1, self.width)
+        A.tofile(self.file)
+        self.rows += len(A)
+
+    def array(self):
+        if self.rows == 0:
+            return np.empty((0, self.width), dtype=self.dtype)
+        self.file.flush()
+        return np.memmap(
+            self.file, dtype=self.dtype, mode="r", shape=(self.rows, self.width))
+
+    def close(self):
+        self.file.close()
+
+
+@contextlib.contextmanager
+def _mesh_arrays(V, F, directory):
+    """
+    V and F as arrays. Chunked input (V an iterable of (V, F) pairs and F
+    None) is spooled to temporary files in directory as it is consumed.
+    """
+    if F is not None:
+        yield np.asarray(V), np.asarray(F)
+        return
+
+    vertices = faces = None
+    try:
+        for V_chunk, F_chunk in V:
+            V_chunk, F_chunk = np.asarray(V_chunk), np.asarray(F_chunk)
+            if vertices is None:
+                vertices = _Spool(directory, V_chunk.dtype, 3)
+                faces = _Spool(directory, np.int64, F_chunk.shape[1])
+            vertices.append(V_chunk)
+            faces.append(F_chunk)
+        if vertices is None:
+            raise ValueError("No chunks to write")
+        yield vertices.array(), faces.array()
+    finally:
+        for spool in (vertices, faces):
+            if spool is not None:
+                spool.close()
+
+
+def write_ply(path, V, F=None):
+    """
+    Write a binary (little-endian) PLY file.
+
+    Parameters:
+    - path: output file
+    - V: (N, 3) vertices (float32 or float64), or an iterable of (V, F)
+      chunks (e.g., from marching_cubes_slabs) where each F indexes the
+      concatenation of all V so far
+    - F: (M, k) faces (None if V is chunked)
+    """
+    path = pathlib.Path(path)
+    with _mesh_arrays(V, F, path.parent) as (V, F), open(path, "wb") as file:
+        vertex_dtype = np.dtype("<f4" if V.dtype == np.float32 else "<f8")
+        index_type, index_dtype = (
+            ("int", "<i4") if len(V) < 2**31 else ("uint", "<u4"))
+        file.write((
+            "ply\n"
+            "format binary_little_endian 1.0\n"
+            "comment Generated by TPMeSh\n"
+            f"element vertex {len(V):d}\n"
+            + "".join(
+                f"property {'float' if vertex_dtype.itemsize == 4 else 'double'} {c}\n"
+                for c in "xyz")
+            + f"element face {len(F):d}\n"
+            f"property list uchar {index_type} vertex_indices\n"
+            "end_header\n").encode("ascii"))
+
+        for block in _blocks(V):
+            np.asarray(block, dtype=vertex_dtype).tofile(file)
+
+        face_dtype = np.dtype(
+            [("n", "u1"), ("indices", index_dtype, (F.shape[1],))])
+        for block in _blocks(F):
+            records = np.empty(len(block), dtype=face_dtype)
+            records["n"] = F.shape[1]
+            records["indices"] = block
+            records.tofile(file)
+
+
+def write_stl(path, V, F=None):
+    """
+    Write a binary STL file of triangles.
+
+    Parameters:
+    - path: output file
+    - V: (N, 3) vertices, or an iterable of (V, F) chunks (see write_ply)
+    - F: (M, 3) triangles (None if V is chunked)
+    """
+    path = pathlib.Path(path)
+    with _mesh_arrays(V, F, path.parent) as (V, F), open(path, "wb") as file:
+        if F.shape[1] != 3:
+            raise ValueError(f"STL only stores triangles, got {F.shape[1]} vertices per face")
+        if len(F) >= 2**32:
+            raise ValueError(f"STL stores at most 2^32 - 1 triangles, got {len(F)}")
+
+        file.write(b"Generated by TPMeSh".ljust(80, b" "))
+        np.array([len(F)], dtype="<u4").tofile(file)
+
+        facet_dtype = np.dtype([
+            ("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)),
+            ("attribute", "<u2")])
+        # Smaller blocks, as each triangle expands to 9 coordinates
+        for block in _blocks(F, BLOCK_ROWS // 8):
+            triangles = np.asarray(V[block.ravel()], dtype=float).reshape(-1, 3, 3)
+            normals = np.cross(
+                triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+            norms = np.linalg.norm(normals, axis=1, keepdims=True)
+            np.divide(normals, norms, out=normals, where=norms > 0)
+
+            facets = np.zeros(len(block), dtype=facet_dtype)
+            facets["normal"] = normals
+            facets["vertices"] = triangles
+            facets.tofile(file)
+
+
+# Gmsh element type and dimension by number of vertices per element
+GMSH_ELEMENT_TYPES = {2: (1, 1), 3: (2, 2), 4: (4, 3)}
+
+
+def write_msh(path, V, F=None):
+    """
+    Write a binary Gmsh 4.1 file with one entity block of nodes and one of
+    elements (lines, triangles, or tetrahedra).
+
+    Parameters:
+    - path: output file
+    - V: (N, 3) vertices, or an iterable of (V, F) chunks (see write_ply)
+    - F: (M, k) elements (None if V is chunked)
+    """
+    path = pathlib.Path(path)
+    with _mesh_arrays(V, F, path.parent) as (V, F), open(path, "wb") as file:
+        if F.shape[1] not in GMSH_ELEMENT_TYPES:
+            raise ValueError(f"Unsupported elements with {F.shape[1]} vertices")
+        element_type, dim = GMSH_ELEMENT_TYPES[F.shape[1]]
+
+        file.write(b"$MeshFormat\n4.1 1 8\n")
+        np.array([1], dtype="<i4").tofile(file)  # Endianness check
+        file.write(b"\n$EndMeshFormat\n")
+
+        def write_section_header(n, block_header):
+            # numEntityBlocks, count, minTag, maxTag; then the block's
+            # entityDim, entityTag, type (or parametric), count
+            np.array([1, n, min(n, 1), n], dtype="<u8").tofile(file)
+            np.array(block_header, dtype="<i4").tofile(file)
+            np.array([n], dtype="<u8").tofile(file)
+
+        file.write(b"$Nodes\n")
+        write_section_header(len(V), [dim, 1, 0])
+        for start in range(0, len(V), BLOCK_ROWS):
+            np.arange(
+                start + 1, min(start + BLOCK_ROWS, len(V)) + 1,
+                dtype="<u8").tofile(file)
+        for block in _blocks(V):
+            np.asarray(block, dtype="<f8").tofile(file)
+        file.write(b"\n$EndNodes\n")
+
+        file.write(b"$Elements\n")
+        write_section_header(len(F), [dim, 1, element_type])
+        for start in range(0, len(F), BLOCK_ROWS):
+            block = F[start:start + BLOCK_ROWS]
+            records = np.empty((len(block), F.shape[1] + 1), dtype="<u8")
+            records[:, 0] = np.arange(start + 1, start + len(block) + 1)
+            records[:, 1:] = block
+            records[:, 1:] += 1  # Node tags start at 1
+            records.tofile(file)
+        file.write(b"\n$EndElements\n")
+
+
+WRITERS = {".ply": write_ply, ".stl": write_stl, ".msh": write_msh}
+
+
+def write_mesh(path, V, F=None):
+    """
+    Write a mesh with the writer of the path's suffix (.ply, .stl, or .msh).
+
+    Unlike meshio, the writers make no full copies of the mesh: arrays are
+    converted and written one block of rows at a time, and chunked input is
+    spooled to temporary files next to the output as it arrives.
+
+    Parameters:
+    - path: output file
+    - V: (N, 3) vertices, or an iterable of (V, F) chunks where each F
+      indexes the concatenation of all V so far
+    - F: elements (None if V is chunked)
+    """
+    suffix = pathlib.Path(path).suffix.lower()
+    if suffix not in WRITERS:
+        raise ValueError(
+            f"Unsupported format {suffix!r} (expected one of {', '.join(WRITERS)})")
+    WRITERS[suffix](path, V, F)
@@ -1,25 +1,207 @@
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import time
+import warnings
+import zipfile
+
 import numpy as np
 import igl
 
 from _tpms import ImplicitShell, InterpolatedTPMS
 from .mesh_implicit_periodic import mesh_implicit_periodic
 from .mesh_implicit import mesh_implicit
-from .utils import is_single_surface, tet_volume
+from .mesh_io import WRITERS, write_mesh
+from .profiling import MeshingStats
+from .utils import is_single_surface, tet_quality
 from .visualize import visualize_mesh, visualize_periodic_mesh
 
 
+def _package_version():
+    from importlib.metadata import version, PackageNotFoundError
+    try:
+        return version("TPMeSh")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+class MeshCache:
+    """
+    Content-addressed on-disk cache of meshing results.
+
+    Each entry is a compressed .npz file named by a hash of the meshing
+    parameters and the package version. Entries are written to a temporary
+    file and atomically renamed, so several processes can share a cache
+    directory. When the directory grows past max_bytes, the least recently
+    used entries are removed.
+    """
+
+    DEFAULT_DIR = pathlib.Path(os.environ.get(
+        "TPMESH_CACHE_DIR", pathlib.Path.home() / ".cache" / "TPMeSh"))
+    DEFAULT_MAX_BYTES = 2**30  # 1 GiB
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = pathlib.Path(
+            self.DEFAULT_DIR if directory is None else directory)
+        self.max_bytes = self.DEFAULT_MAX_BYTES if max_bytes is None else max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(name, x, thickness, kwargs):
+        """Hash of the function name, parameters and package version."""
+        kwargs = {
+            k: np.asarray(v).tolist() for k, v in kwargs.items()
+            if k not in ("verbose", "stats")
+        }
+        params = json.dumps({
+            "name": name,
+            "version": _package_version(),
+            "x": np.asarray(x, dtype=float).tolist(),
+            "thickness": float(thickness),
+            "kwargs": kwargs,
+        }, sort_keys=True)
+        return hashlib.sha256(params.encode()).hexdigest()
+
+    def path(self, key):
+        return self.directory / f"{key}.npz"
+
+    def get(self, key):
+        """Load the results stored under key, or None on a miss."""
+        path = self.path(key)
+        try:
+            with np.load(path) as data:
+                results = self._unpack(data)
+        except FileNotFoundError:
+            return None  # Missing or evicted
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            # Truncated, corrupt, or written by an old version: drop it so
+            # the next put replaces it
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            pass  # Evicted by another process after loading
+        return results
+
+    def put(self, key, results):
+        """
+        Store results under key and evict old entries if needed.
+
+        Entries larger than max_bytes are not stored (with a warning).
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                np.savez_compressed(file, **self._pack(results))
+            size = os.path.getsize(tmp)
+            if size > self.max_bytes:
+                pathlib.Path(tmp).unlink()
+                warnings.warn(
+                    f"Not caching a {size:d} byte result larger than the "
+                    f"cache ({self.max_bytes:d} bytes)")
+                return
+            os.replace(tmp, self.path(key))
+        except BaseException:
+            pathlib.Path(tmp).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until under max_bytes."""
+        entries = []
+        for path in self.directory.glob("*.npz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # Removed by another process
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        for path in self.directory.glob("*.npz"):
+            path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _pack(results):
+        # Results are tuples of arrays, None, or lists of arrays
+        arrays, layout = {}, []
+        for i, result in enumerate(results):
+            if result is None:
+                layout.append(None)
+            elif isinstance(result, (list, tuple)):
+                layout.append(len(result))
+                for j, item in enumerate(result):
+                    arrays[f"{i}_{j}"] = np.asarray(item)
+            else:
+                layout.append(-1)
+                arrays[f"{i}"] = np.asarray(result)
+        arrays["layout"] = np.array(json.dumps(layout))
+        return arrays
+
+    @staticmethod
+    def _unpack(data):
+        results = []
+        for i, n in enumerate(json.loads(str(data["layout"]))):
+            if n is None:
+                results.append(None)
+            elif n < 0:
+                results.append(data[f"{i}"])
+            else:
+                results.append([data[f"{i}_{j}"] for j in range(n)])
+        return tuple(results)
+
+
+def cached(function):
+    """
+    Add a cache keyword argument to a mesh_tpms_* function.
+
+    cache can be False (default), True (use MeshCache()), a directory, or a
+    MeshCache instance.
+    """
+    @functools.wraps(function)
+    def wrapper(x, thickness, cache=False, **kwargs):
+        if cache is False or cache is None:
+            return function(x, thickness, **kwargs)
+        if not isinstance(cache, MeshCache):
+            cache = MeshCache(None if cache is True else cache)
+
+        key = cache.key(function.__name__, x, thickness, kwargs)
+        results = cache.get(key)
+        if results is None:
+            results = function(x, thickness, **kwargs)
+            cache.put(key, results)
+        elif kwargs.get("verbose", False):
+            print(f"Loaded mesh from cache ({cache.path(key)})")
+        return results
+    return wrapper
+
+
+@cached
 def mesh_tpms_periodic(x, thickness, **kwargs):
     """Generate a periodic TPMS cell mesh with given design parameters."""
     return mesh_implicit_periodic(
         ImplicitShell(InterpolatedTPMS(x), thickness=thickness), **kwargs)
 
 
+@cached
 def mesh_tpms_full(x, thickness, **kwargs):
     """Generate a full TPMS mesh with given design parameters."""
     return mesh_implicit(
         ImplicitShell(InterpolatedTPMS(x), thickness=thickness), **kwargs)
 
 
+@cached
 def mesh_tpms_surface(x, thickness, **kwargs):
     """Generate a surface mesh from a TPMS volume mesh."""
     kwargs["perturb"] = False
@@ -33,9 +215,11 @@ def mesh_tpms_surface(x, thickness, **kwargs):
 
     if kwargs.get("verbose", False):
         print("Extracting surface mesh...")
-    F, *_ = igl.boundary_facets(T)
-    V, F, *_ = igl.remove_unreferenced(V, F)
-    F[:, [0, 1]] = F[:, [1, 0]]  # flip orientation
+    stats = kwargs.get("stats")
+    with stats.stage("extract_surface") if stats else contextlib.nullcontext():
+        F, *_ = igl.boundary_facets(T)
+        V, F, *_ = igl.remove_unreferenced(V, F)
+        F[:, [0, 1]] = F[:, [1, 0]]  # flip orientation
 
     if not is_single_surface(V, F):
         raise ValueError("Cavities detected")
@@ -45,6 +229,200 @@ def mesh_tpms_surface(x, thickness, **kwargs):
     return V, F
 
 
+MESH_FUNCTIONS = {
+    "full": mesh_tpms_full,
+    "periodic": mesh_tpms_periodic,
+    "surface": mesh_tpms_surface,
+}
+
+
+def read_designs(path):
+    """
+    Read design vectors from a .npy or .csv file.
+
+    Each row holds 8 design parameters, optionally followed by a thickness.
+
+    Returns:
+    - xs: (N, 8) design parameters
+    - thicknesses: (N,) thicknesses or None if not given
+    """
+    path = pathlib.Path(path)
+    if path.suffix == ".npy":
+        data = np.load(path)
+    else:
+        data = np.loadtxt(path, delimiter=",", ndmin=2)
+    data = np.atleast_2d(data)
+    if data.shape[1] not in (8, 9):
+        raise ValueError(f"Expected 8 or 9 columns in {path}, got {data.shape[1]}")
+    return data[:, :8], (data[:, 8] if data.shape[1] == 9 else None)
+
+
+def _output_transform(V, size=200):
+    """Offset and scale that fit the mesh V in a box of the given size."""
+    return V.min(axis=0), size / np.ptp(V)
+
+
+def _batch_job(mesh_type, x, thickness, path, kwargs, conn):
+    """Mesh one design in a worker process and report back through conn."""
+    try:
+        start = time.perf_counter()
+        stats = MeshingStats()
+        V, F = MESH_FUNCTIONS[mesh_type](
+            x, thickness, stats=stats, **kwargs)[:2]
+        if mesh_type != "periodic":  # Scaled as by main
+            offset, scale = _output_transform(V)
+            V = scale * (V - offset)
+        write_mesh(path, V, F)
+        conn.send(("done", time.perf_counter() - start, len(V), len(F),
+                   stats.seconds_by_stage(), ""))
+    except Exception as e:
+        conn.send(("failed", 0.0, 0, 0, {}, repr(e)))
+    finally:
+        conn.close()
+
+
+def mesh_tpms_batch(
+    xs,
+    thicknesses,
+    output_dir,
+    mesh_type="full",
+    num_workers=None,
+    timeout=None,
+    retries=1,
+    verbose=True,
+    **kwargs
+):
+    """
+    Generate TPMS meshes for many design vectors in parallel.
+
+    Each design is meshed in its own worker process (forked when possible,
+    so imports are not paid again), which is terminated if it exceeds the
+    timeout. Failed, crashed, or timed out jobs are retried.
+
+    Parameters:
+    - xs: (N, 8) design parameters
+    - thicknesses: thickness or (N,) thicknesses
+    - output_dir: directory to write the meshes to (full and surface
+      meshes are scaled to fit a 200 box, as by main)
+    - mesh_type: "full", "periodic", or "surface"
+    - num_workers: number of concurrent jobs (default: number of CPUs)
+    - timeout: maximum seconds per attempt (default: no limit)
+    - retries: number of extra attempts per design
+    - verbose: print progress and the summary table
+    - kwargs: passed to the mesh_tpms_* function
+
+    Returns:
+    - list of summary rows (dicts) with the index, status, attempts, time,
+      number of vertices and elements, slowest meshing stage and time of
+      each stage (see profiling.MeshingStats), output path and error of
+      each design
+    """
+    import multiprocessing
+    import multiprocessing.connection
+    from collections import deque
+
+    xs = np.atleast_2d(xs)
+    thicknesses = np.broadcast_to(thicknesses, len(xs))
+    output_dir = pathlib.Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    suffix = ".stl" if mesh_type == "surface" else ".msh"
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    context = multiprocessing.get_context(
+        "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+
+    summary = [{
+        "index": i, "status": "pending", "attempts": 0, "time": 0.0,
+        "vertices": 0, "elements": 0, "slowest_stage": "", "stages": "",
+        "path": str(output_dir / f"{i:05d}{suffix}"), "error": "",
+    } for i in range(len(xs))]
+
+    pending = deque(range(len(xs)))
+    running = {}  # index -> (process, connection, start time)
+
+    def finish(i, status, error=""):
+        row = summary[i]
+        row["status"], row["error"] = status, error
+        if status != "done" and row["attempts"] <= retries:
+            pending.append(i)  # Try again
+        if verbose:
+            print(f"[{i:d}] {status} (attempt {row['attempts']:d}) {error}")
+
+    while pending or running:
+        while pending and len(running) < num_workers:
+            i = pending.popleft()
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_batch_job, args=(
+                mesh_type, xs[i], thicknesses[i], summary[i]["path"], kwargs,
+                sender), daemon=True)
+            process.start()
+            sender.close()
+            summary[i]["attempts"] += 1
+            running[i] = process, receiver, time.perf_counter()
+
+        multiprocessing.connection.wait(
+            [conn for _, conn, _ in running.values()]
+            + [process.sentinel for process, _, _ in running.values()],
+            timeout=1)
+
+        for i, (process, conn, start) in list(running.items()):
+            has_result = conn.poll()
+            alive = has_result or process.is_alive()
+            if not alive:
+                # The child may have sent its result and exited after the poll
+                has_result = conn.poll()
+            if has_result:
+                try:
+                    status, elapsed, nV, nE, stages, error = conn.recv()
+                except EOFError:  # Closed without a result
+                    status, elapsed, nV, nE, stages, error = "crashed", 0.0, 0, 0, {}, None
+                process.join()
+                if error is None:
+                    error = f"exit code {process.exitcode}"
+                del running[i]
+                summary[i].update(
+                    time=elapsed, vertices=nV, elements=nE,
+                    slowest_stage=max(stages, key=stages.get, default=""),
+                    stages=json.dumps({k: round(v, 3) for k, v in stages.items()}))
+                finish(i, status, error)
+            elif not alive:
+                del running[i]
+                finish(i, "crashed", f"exit code {process.exitcode}")
+            elif timeout is not None and time.perf_counter() - start > timeout:
+                process.terminate()
+                process.join()
+                del running[i]
+                finish(i, "timeout", f"exceeded {timeout:g} s")
+
+    if verbose:
+        print(format_summary(summary))
+    if summary:
+        import csv
+        with open(output_dir / "summary.csv", "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=summary[0].keys())
+            writer.writeheader()
+            writer.writerows(summary)
+
+    return summary
+
+
+def format_summary(summary):
+    """Format batch summary rows as a text table."""
+    header = f"{'index':>6} {'status':>8} {'attempts':>8} {'time (s)':>10} {'#V':>10} {'#elements':>10} {'slowest stage':>24}"
+    lines = [header, "-" * len(header)]
+    for row in summary:
+        lines.append(
+            f"{row['index']:>6d} {row['status']:>8} {row['attempts']:>8d} "
+            f"{row['time']:>10.2f} {row['vertices']:>10d} {row['elements']:>10d} "
+            f"{row['slowest_stage']:>24}")
+    done = [row for row in summary if row["status"] == "done"]
+    lines.append(
+        f"{len(done):d}/{len(summary):d} succeeded in "
+        f"{sum(row['time'] for row in done):.2f} s of meshing time")
+    return "\n".join(lines)
+
+
 def parse_args():
     import argparse
     import pathlib
@@ -81,11 +459,38 @@ def parse_args():
         "-r", "--repeats", type=int, nargs=3, default=None,
         help="Number of repeats in each direction (default: 4 2 4 for full mesh, 1 1 1 for periodic mesh)")
 
+    parser.add_argument(
+        "--cache", nargs="?", type=pathlib.Path, const=True, default=False,
+        help="reuse meshes cached in the given directory (default: $TPMESH_CACHE_DIR or ~/.cache/TPMeSh)")
+
+    parser.add_argument(
+        "-b", "--batch", type=pathlib.Path, default=None,
+        help="mesh every design vector in a .csv/.npy file (8 parameters and an optional thickness per row) into the output directory")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None,
+        help="number of parallel batch jobs (default: number of CPUs)")
+    parser.add_argument(
+        "--timeout", type=float, default=None,
+        help="maximum seconds per batch job (default: no limit)")
+    parser.add_argument(
+        "--retries", type=int, default=1,
+        help="number of retries of a failed batch job (default: 1)")
+
     parser.add_argument(
         "-v", "--visualize", action='store_true', help="visualize the mesh")
 
     args = parser.parse_args()
 
+    if args.batch is not None:
+        if args.i is not None or args.x is not None:
+            parser.error("-i and -x cannot be used with --batch")
+        if args.output is None:
+            args.output = pathlib.Path("meshes")
+        if args.repeats is None:
+            args.repeats = [4, 2, 4] if args.surface else [1, 1, 1]
+        args.repeats = np.array(args.repeats)
+        return args
+
     if args.i is None and args.x is None:
         parser.error("Either -i or -x must be specified")
     if (args.i is not None) and (args.x is not None):
@@ -113,35 +518,53 @@ def main():
 
     args = parse_args()
 
+    if args.batch is not None:
+        xs, thicknesses = read_designs(args.batch)
+        mesh_type = "surface" if args.surface else (
+            "periodic" if args.periodic else "full")
+        kwargs = dict(elements_in_thickness=args.elements_in_thickness,
+                      cache=args.cache)
+        if not args.periodic:
+            kwargs["repeats"] = args.repeats
+        mesh_tpms_batch(
+            xs, args.thickness if thicknesses is None else thicknesses,
+            args.output, mesh_type=mesh_type, num_workers=args.jobs,
+            timeout=args.timeout, retries=args.retries, **kwargs)
+        return
+
     print("Generating TPMS mesh...")
     if args.surface:
         V, F, feature_edges = mesh_tpms_surface(
             args.x, thickness=args.thickness, repeats=args.repeats, verbose=True,
-            elements_in_thickness=args.elements_in_thickness, return_feature_edges=True)
+            elements_in_thickness=args.elements_in_thickness, return_feature_edges=True,
+            cache=args.cache)
     elif args.periodic:
         # TODO: repeats=args.repeats
         V, F, _ = mesh_tpms_periodic(
             args.x, thickness=args.thickness,
-            elements_in_thickness=args.elements_in_thickness, verbose=True)
+            elements_in_thickness=args.elements_in_thickness, verbose=True,
+            cache=args.cache)
         feature_edges = []
     else:
         V, F, feature_edges = mesh_tpms_full(
             args.x, thickness=args.thickness, repeats=args.repeats, verbose=True,
-            elements_in_thickness=args.elements_in_thickness, return_feature_edges=True)
+            elements_in_thickness=args.elements_in_thickness, return_feature_edges=True,
+            cache=args.cache)
     print(f"#V: {len(V)}, #F: {len(F)}")
 
     if not args.periodic:
+        offset, scale = _output_transform(V)
         if len(feature_edges):
-            feature_edges = 200 * (feature_edges - V.min(axis=0)) / np.ptp(V)
-        V = 200 * (V - V.min(axis=0)) / np.ptp(V)
+            feature_edges = scale * (feature_edges - offset)
+        V = scale * (V - offset)
 
     # Save the mesh
     if args.output:
-        mesh = meshio.Mesh(V, {"triangle" if args.surface else "tetra": F})
-        if args.surface:
-            meshio.write(args.output, mesh, binary=True)
+        if args.output.suffix.lower() in WRITERS:
+            write_mesh(args.output, V, F)  # Binary, without copying the mesh
         else:
-            meshio.write(args.output, mesh, file_format="gmsh")
+            meshio.write(args.output, meshio.Mesh(
+                V, {"triangle" if args.surface else "tetra": F}))
         print(f"Saved mesh to {args.output}")
 
     # Visualize the mesh
@@ -154,8 +577,11 @@ def main():
             if args.surface:
                 scalar_values = None
             else:
+                quality = tet_quality(V, F)
                 scalar_values = {
-                    "volume": np.array([tet_volume(tet) for tet in V[F]])
+                    "volume": quality["volume"],
+                    "radius ratio": quality["radius_ratio"],
+                    "min dihedral angle": np.degrees(quality["min_dihedral_angle"]),
                 }
             if len(feature_edges):
                 feature_vertices = np.vstack(feature_edges)
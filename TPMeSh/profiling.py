@@ -0,0 +1,100 @@
+import contextlib
+import logging
+import sys
+import time
+
+
+def max_rss():
+    """
+    High-water mark of the resident memory of this process in bytes (None
+    if unavailable, e.g., on Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class MeshingStats:
+    """
+    Wall time, peak memory and counts of the stages of a meshing run.
+
+    Stages are recorded in order as dicts with:
+    - name: name of the stage (e.g., "generation")
+    - seconds: wall time of the stage
+    - peak_rss_bytes: high-water mark of the resident memory of the process
+      at the end of the stage
+    - rss_increase_bytes: how much the stage raised this high-water mark
+    - counts: counts recorded by the stage (e.g., oracle calls, elements)
+
+    Parameters:
+    - callback: optional function called with each finished stage, or a
+      logging.Logger to log the stages to (at the INFO level)
+    """
+
+    def __init__(self, callback=None):
+        self.stages = []
+        self.callback = callback
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time a stage. Counts can be added to the yielded dict."""
+        counts = {}
+        rss = max_rss()
+        start = time.perf_counter()
+        yield counts
+        seconds = time.perf_counter() - start
+        peak_rss = max_rss()
+        record = dict(
+            name=name,
+            seconds=seconds,
+            peak_rss_bytes=peak_rss,
+            rss_increase_bytes=None if rss is None else peak_rss - rss,
+            counts=counts,
+        )
+        self.stages.append(record)
+
+        if isinstance(self.callback, logging.Logger):
+            self.callback.info("%s", self.format_stage(record))
+        elif self.callback is not None:
+            self.callback(record)
+
+    @property
+    def total_seconds(self):
+        return sum(stage["seconds"] for stage in self.stages)
+
+    @property
+    def slowest_stage(self):
+        """Name of the stage that took the most time (None if no stages)."""
+        if not self.stages:
+            return None
+        return max(self.stages, key=lambda stage: stage["seconds"])["name"]
+
+    def seconds_by_stage(self):
+        """Total wall time of each stage name."""
+        seconds = {}
+        for stage in self.stages:
+            seconds[stage["name"]] = seconds.get(stage["name"], 0) + stage["seconds"]
+        return seconds
+
+    def as_dict(self):
+        """JSON-serializable summary."""
+        return dict(total_seconds=self.total_seconds, stages=self.stages)
+
+    @staticmethod
+    def format_stage(stage):
+        line = f"{stage['name']}: {stage['seconds']:.3f} s"
+        if stage["peak_rss_bytes"] is not None:
+            line += (
+                f", peak RSS {stage['peak_rss_bytes'] / 2**20:.1f} MiB"
+                f" (+{stage['rss_increase_bytes'] / 2**20:.1f} MiB)")
+        for key, value in stage["counts"].items():
+            line += f", {key}={value}"
+        return line
+
+    def __str__(self):
+        return "\n".join(
+            [self.format_stage(stage) for stage in self.stages]
+            + [f"total: {self.total_seconds:.3f} s"])
@@ -0,0 +1,262 @@
+import json
+
+import numpy as np
+
+from .mesh_implicit_surface import _grid_axes
+
+
+class SparseGrid:
+    """
+    Sparse block grid of samples of a scalar field (VDB-like).
+
+    The samples of a regular grid are grouped in dense bricks of
+    brick_size³ samples. Only the bricks near the zero level set (the
+    narrow band) are stored. The index maps each brick of the grid to its
+    position in bricks, or to a negative tile value for the bricks that are
+    not stored: -1 for the bricks outside (value background) and -2 for the
+    bricks inside (value -background).
+
+    Parameters:
+    - origin: (3,) position of the first sample
+    - spacing: (3,) distance between samples along each axis
+    - shape: (3,) number of samples along each axis
+    - index: (bx, by, bz) int32 brick index
+    - bricks: (n, brick_size, brick_size, brick_size) stored samples
+    - background: magnitude of the values outside the narrow band
+    """
+
+    MAGIC = b"TPMSGRID"
+    VERSION = 1
+    ALIGNMENT = 64  # Byte alignment of the arrays in saved files
+
+    OUTSIDE = -1
+    INSIDE = -2
+
+    def __init__(self, origin, spacing, shape, index, bricks, background):
+        self.origin = np.asarray(origin, dtype=float)
+        self.spacing = np.asarray(spacing, dtype=float)
+        self.shape = np.asarray(shape, dtype=np.int64)
+        self.index = index
+        self.bricks = bricks
+        self.background = float(background)
+
+    @property
+    def brick_size(self):
+        return self.bricks.shape[1]
+
+    @property
+    def nbytes(self):
+        """Memory used by the index and bricks."""
+        return self.index.nbytes + self.bricks.nbytes
+
+    def active_fraction(self):
+        """Fraction of the bricks that are stored."""
+        return len(self.bricks) / self.index.size
+
+    def values(self, I):
+        """Values of the samples with grid indices I (N, 3) (clamped to the grid)."""
+        I = np.clip(I, 0, self.shape - 1)
+        brick, local = np.divmod(I, self.brick_size)
+        ids = self.index[tuple(brick.T)]
+        stored = ids >= 0
+        values = np.where(
+            ids == self.INSIDE, -self.background, self.background
+        ).astype(self.bricks.dtype)
+        values[stored] = self.bricks[(ids[stored], *local[stored].T)]
+        return values
+
+    def __call__(self, P):
+        """
+        Trilinear interpolation of the samples at points P (N, 3).
+
+        Points outside the grid get the value at the closest point of the
+        grid.
+        """
+        P = np.atleast_2d(np.asarray(P, dtype=float))
+        u = np.clip((P - self.origin) / self.spacing, 0, self.shape - 1)
+        cell = np.minimum(np.floor(u).astype(np.int64), np.maximum(self.shape - 2, 0))
+        t = u - cell
+
+        result = np.zeros(len(P))
+        for corner in np.ndindex(2, 2, 2):
+            weight = np.prod(np.where(corner, t, 1 - t), axis=1)
+            result += weight * self.values(cell + corner)
+        return result
+
+    def to_dense(self):
+        """All samples as a dense array (for small grids)."""
+        I = np.stack(np.meshgrid(
+            *[np.arange(n) for n in self.shape], indexing="ij"), axis=-1)
+        return self.values(I.reshape(-1, 3)).reshape(self.shape)
+
+    def save(self, path):
+        """
+        Save to a file whose arrays can be memory-mapped (see load).
+
+        The file has the magic bytes, the length of a JSON header (uint64),
+        the header (metadata and array offsets), and the arrays, each
+        aligned to ALIGNMENT bytes.
+        """
+        arrays = {"index": self.index, "bricks": self.bricks}
+
+        def header_bytes(offsets):
+            return json.dumps({
+                "version": self.VERSION,
+                "origin": self.origin.tolist(),
+                "spacing": self.spacing.tolist(),
+                "shape": self.shape.tolist(),
+                "background": self.background,
+                "arrays": {
+                    name: {
+                        "offset": offsets[name],
+                        "dtype": np.asarray(A).dtype.str,
+                        "shape": list(np.shape(A)),
+                    } for name, A in arrays.items()
+                },
+            }).encode()
+
+        def align(n):
+            return -(-n // self.ALIGNMENT) * self.ALIGNMENT
+
+        # Offsets depend on the header length, which depends on the offsets
+        offsets = dict.fromkeys(arrays, 0)
+        while True:
+            start = align(len(self.MAGIC) + 8 + len(header_bytes(offsets)))
+            new_offsets = {}
+            for name, A in arrays.items():
+                new_offsets[name] = start
+                start = align(start + np.asarray(A).nbytes)
+            if new_offsets == offsets:
+                break
+            offsets = new_offsets
+
+        header = header_bytes(offsets)
+        with open(path, "wb") as file:
+            file.write(self.MAGIC)
+            file.write(np.uint64(len(header)).tobytes())
+            file.write(header)
+            for name, A in arrays.items():
+                file.write(b"\0" * (offsets[name] - file.tell()))
+                np.ascontiguousarray(A).tofile(file)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a grid saved by save.
+
+        Parameters:
+        - path: file to load
+        - mmap: memory-map the arrays (read-only) instead of reading them
+
+        Returns:
+        - SparseGrid
+        """
+        with open(path, "rb") as file:
+            if file.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"{path} is not a sparse grid file")
+            header_length = int(np.frombuffer(file.read(8), dtype=np.uint64)[0])
+            header = json.loads(file.read(header_length))
+            if header["version"] != cls.VERSION:
+                raise ValueError(f"Unsupported sparse grid version {header['version']}")
+
+            arrays = {}
+            for name, info in header["arrays"].items():
+                dtype, shape = np.dtype(info["dtype"]), tuple(info["shape"])
+                if mmap and np.prod(shape) > 0:
+                    arrays[name] = np.memmap(
+                        path, dtype=dtype, mode="r", offset=info["offset"],
+                        shape=shape)
+                else:
+                    file.seek(info["offset"])
+                    arrays[name] = np.fromfile(
+                        file, dtype=dtype, count=int(np.prod(shape))
+                    ).reshape(shape)
+
+        return cls(
+            header["origin"], header["spacing"], header["shape"],
+            arrays["index"], arrays["bricks"], header["background"])
+
+
+def narrow_band_grid(
+    f, domain, res_y=100, band=None, brick_size=8, lipschitz=None,
+    dtype=np.float32
+):
+    """
+    Sample the signed distance to the surface of f in a narrow band.
+
+    The distance is evaluated at the samples of every brick, except the
+    bricks whose corners, edge and face midpoints and center all lie beyond
+    the band on the same side: these are stored as an outside or inside
+    tile. The distance estimate of a shell is not Lipschitz (it blows up
+    where ∇S vanishes), so no margin is assumed by default, and features
+    that fit between these 27 samples can be tiled. Give a Lipschitz bound
+    of the distance (e.g., 1 for an exact signed distance) to make the
+    culling conservative.
+
+    Parameters:
+    - f: ImplicitShell (its first-order distance estimate f.distance is
+      used) or a vectorized estimate of the signed distance
+    - domain: (2, 3) bounds of the grid
+    - res_y: grid resolution along y (same grid as mesh_implicit_surface)
+    - band: half-width of the narrow band (default: 3 grid cells)
+    - brick_size: number of samples along each axis of a brick
+    - lipschitz: bound on the Lipschitz constant of the distance (None for
+      no margin between the checked samples)
+    - dtype: type of the stored samples
+
+    Returns:
+    - SparseGrid of the distances (clamped to ±band)
+    """
+    distance = getattr(f, "distance", f)
+    axes = _grid_axes(domain, res_y)
+    shape = np.array([len(v) for v in axes])
+    spacing = np.array([v[1] - v[0] for v in axes])
+    if band is None:
+        band = 3 * spacing.max()
+
+    def evaluate(I):
+        return np.asarray(distance(*(v[I[:, i]] for i, v in enumerate(axes))))
+
+    # Indices of the first, middle and last samples of the bricks per axis
+    n_bricks = -(-shape // brick_size)
+    lo = [np.arange(nb) * brick_size for nb in n_bricks]
+    hi = [np.minimum(l + brick_size, n) - 1 for l, n in zip(lo, shape)]
+    checked = [np.column_stack([l, (l + h) // 2, h]) for l, h in zip(lo, hi)]
+
+    # Largest distance from a sample to the closest checked sample
+    margin = 0.0
+    if lipschitz is not None:
+        half_cell = -(-(brick_size - 1) // 2) / 2 * spacing
+        margin = lipschitz * np.linalg.norm(half_cell)
+
+    # Classify the bricks one slab of bricks along x at a time
+    index = np.empty(n_bricks, dtype=np.int32)
+    for bx in range(n_bricks[0]):
+        X = np.meshgrid(
+            axes[0][checked[0][bx]], axes[1][checked[1].ravel()],
+            axes[2][checked[2].ravel()], indexing="ij")
+        d = np.asarray(distance(*(v.ravel() for v in X))).reshape(
+            3, n_bricks[1], 3, n_bricks[2], 3).transpose(1, 3, 0, 2, 4)
+        d = d.reshape(n_bricks[1], n_bricks[2], 27)
+        index[bx] = SparseGrid.OUTSIDE  # NaNs fail both tests below
+        index[bx][~np.all(d >= band + margin, axis=-1)] = 0
+        index[bx][np.all(d <= -band - margin, axis=-1)] = SparseGrid.INSIDE
+
+    active = (index >= 0).ravel()
+    index.ravel()[active] = np.arange(np.count_nonzero(active))
+    lo = np.stack(np.meshgrid(*lo, indexing="ij"), axis=-1).reshape(-1, 3)
+
+    # Evaluate the samples of the active bricks (clamped to the grid, so
+    # bricks past the end repeat their last samples)
+    local = np.stack(np.meshgrid(
+        *[np.arange(brick_size)] * 3, indexing="ij"), axis=-1).reshape(-1, 3)
+    bricks = np.empty((np.count_nonzero(active),) + (brick_size,) * 3, dtype=dtype)
+    chunk = max(1, 2**20 // brick_size**3)
+    for start in range(0, len(bricks), chunk):
+        origins = lo[active][start:start + chunk]
+        I = np.minimum(origins[:, None] + local, shape - 1).reshape(-1, 3)
+        values = np.clip(evaluate(I), -band, band)
+        bricks[start:start + chunk] = values.reshape((-1,) + (brick_size,) * 3)
+
+    return SparseGrid(
+        [v[0] for v in axes], spacing, shape, index, bricks, background=band)
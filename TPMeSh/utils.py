@@ -1,6 +1,11 @@
+import math
+from collections import OrderedDict
+
 import numpy as np
 import igl
 
+from _tpms import Implicit, ImplicitShell, GradedTPMSShell, ImplicitDomain
+
 
 def components(V: np.ndarray, F: np.ndarray):
     return igl.vertex_components_from_adjacency_matrix(igl.adjacency_matrix(F))[0]
@@ -29,6 +34,79 @@ def tet_volume(tet: np.ndarray):
     return np.linalg.det(np.hstack([np.ones((4, 1)), tet])) / 6
 
 
+def tet_volumes(V: np.ndarray, T: np.ndarray):
+    """Signed volumes of all tetrahedra (same sign convention as tet_volume)."""
+    P = V[T]
+    a, b, c = (P[:, 1:] - P[:, :1]).transpose(1, 0, 2)
+    return np.einsum("ij,ij->i", a, np.cross(b, c)) / 6
+
+
+# Vertex pairs of the six edges of a tetrahedron and, for each edge, the two
+# vertices opposite the faces meeting at it.
+TET_EDGES = np.array([[0, 1], [0, 2], [0, 3], [1, 2], [1, 3], [2, 3]])
+TET_EDGE_OPPOSITE = np.array([[2, 3], [1, 3], [1, 2], [0, 3], [0, 2], [0, 1]])
+# Vertices of the face opposite each vertex
+TET_FACES = np.array([[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]])
+
+
+def tet_quality(V: np.ndarray, T: np.ndarray):
+    """
+    Compute geometric quality measures of all tetrahedra in one pass.
+
+    Parameters:
+    - V: vertices of the mesh
+    - T: tetrahedra of the mesh
+
+    Returns:
+    - dict with (len(T),) arrays "volume" (signed), "min_dihedral_angle" and
+      "max_dihedral_angle" (radians), "aspect_ratio" (longest edge over
+      inradius, 1 for a regular tet) and "radius_ratio" (3 inradius over
+      circumradius, 1 for a regular tet and 0 for a flat one), and the
+      (len(T), 6) array "dihedral_angles" ordered as TET_EDGES (angles
+      and aspect ratios of degenerate tets are NaN)
+    """
+    P = V[T]
+    a, b, c = (P[:, 1:] - P[:, :1]).transpose(1, 0, 2)
+    volume = np.einsum("ij,ij->i", a, np.cross(b, c)) / 6
+    abs_volume = np.abs(volume)
+
+    # Normal of the face opposite each vertex, pointing towards the vertex
+    F = P[:, TET_FACES]
+    N = np.cross(F[:, :, 1] - F[:, :, 0], F[:, :, 2] - F[:, :, 0])
+    sign = np.sign(np.einsum("ijk,ijk->ij", N, P - F[:, :, 0]))
+    N *= sign[:, :, None]
+    areas = np.linalg.norm(N, axis=2) / 2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Interior dihedral angle at an edge from the normals of the two faces
+        N /= np.linalg.norm(N, axis=2, keepdims=True)
+        cos = -np.einsum(
+            "ijk,ijk->ij", N[:, TET_EDGE_OPPOSITE[:, 0]],
+            N[:, TET_EDGE_OPPOSITE[:, 1]])
+        dihedral_angles = np.arccos(np.clip(cos, -1, 1))
+
+        inradius = 3 * abs_volume / areas.sum(axis=1)
+        circumradius = np.linalg.norm(
+            (a * a).sum(axis=1)[:, None] * np.cross(b, c)
+            + (b * b).sum(axis=1)[:, None] * np.cross(c, a)
+            + (c * c).sum(axis=1)[:, None] * np.cross(a, b),
+            axis=1) / (12 * abs_volume)
+
+        edge_lengths = np.linalg.norm(
+            P[:, TET_EDGES[:, 1]] - P[:, TET_EDGES[:, 0]], axis=2)
+        aspect_ratio = edge_lengths.max(axis=1) / (2 * np.sqrt(6) * inradius)
+        radius_ratio = np.nan_to_num(3 * inradius / circumradius)
+
+    return {
+        "volume": volume,
+        "dihedral_angles": dihedral_angles,
+        "min_dihedral_angle": dihedral_angles.min(axis=1),
+        "max_dihedral_angle": dihedral_angles.max(axis=1),
+        "aspect_ratio": aspect_ratio,
+        "radius_ratio": radius_ratio,
+    }
+
+
 def lerp(a, b, t):
     assert 0 <= t <= 1
     return a + (b - a) * t
@@ -40,3 +118,78 @@ def scale_to_unit_cube(V: np.ndarray, domain: np.ndarray):
 
 def scale_to_domain(V: np.ndarray, domain: np.ndarray):
     return V * domain.max()
+
+
+def native_domain(f, scale, box=None, cache_size=0, cache_quantum=0):
+    """
+    Wrap a compiled implicit function in an ImplicitDomain.
+
+    Parameters:
+    - f: implicit function
+    - scale: per-axis scale applied to query points before evaluating f
+    - box: optional (2, 3) box (in unscaled coordinates) to intersect with
+    - cache_size: maximum number of values of f to memoize (0 disables)
+    - cache_quantum: spacing of the grid of cache keys (0 for exact keys)
+
+    Returns:
+    - ImplicitDomain, or None if f is not a compiled Implicit, ImplicitShell,
+      or GradedTPMSShell
+    """
+    if not isinstance(f, (Implicit, ImplicitShell, GradedTPMSShell)):
+        return None
+    return ImplicitDomain(
+        f, np.broadcast_to(scale, 3), box, cache_size, cache_quantum)
+
+
+class OracleCache:
+    """
+    Bounded LRU cache of the values of an oracle f(X) at 3D points X.
+
+    Used for Python implicit functions (compiled ones are cached by their
+    ImplicitDomain). Points are keyed exactly or, if quantum > 0, by the
+    cell of the grid of spacing quantum they fall in, in which case every
+    point of a cell gets the value at the first point of the cell queried.
+    """
+
+    def __init__(self, f, capacity, quantum=0):
+        self.f = f
+        self.capacity = capacity
+        self.quantum = quantum
+        self.values = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def __call__(self, X):
+        if self.quantum > 0:
+            key = tuple(math.floor(x / self.quantum) for x in X)
+        else:
+            key = tuple(X)
+        value = self.values.get(key)
+        if value is not None:
+            self.values.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = self.f(X)
+        if len(self.values) >= self.capacity:
+            self.values.popitem(last=False)
+            self.evictions += 1
+        self.values[key] = value
+        return value
+
+    @property
+    def size(self):
+        return len(self.values)
+
+
+def cache_counts(cache):
+    """Hit/miss counts of an OracleCache or ImplicitDomain cache (for stats)."""
+    if cache is None:
+        return {}
+    queries = cache.hits + cache.misses
+    return dict(
+        cache_hits=cache.hits,
+        cache_misses=cache.misses,
+        cache_evictions=cache.evictions,
+        cache_hit_rate=cache.hits / queries if queries else 0.0,
+    )
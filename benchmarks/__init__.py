@@ -0,0 +1,201 @@
+"""
+Benchmark suite of the evaluation and meshing hot paths.
+
+Run it with `python -m benchmarks` (see `python -m benchmarks --help`).
+Results (throughput and peak memory) are stored as JSON, so the results of
+two commits can be compared (see compare).
+"""
+import json
+import os
+import platform
+import sys
+import time
+
+from .suite import BENCHMARKS, SIZES, Skip
+
+MiB = 2**20
+
+
+def _max_rss():
+    """High-water mark of the resident memory of this process in bytes."""
+    try:
+        import resource
+    except ImportError:  # e.g., Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_benchmark(name, size="quick", repeat=5):
+    """
+    Run a benchmark in this process.
+
+    The first call is a warm-up traced by tracemalloc. It gives the peak
+    memory allocated by Python and NumPy (not by the C++ extensions, e.g.
+    CGAL). The process's peak resident memory (above the one after the
+    setup) includes all allocations, but only makes sense when running each
+    benchmark in a fresh process (see run).
+
+    Parameters:
+    - name: name of the benchmark (see suite.BENCHMARKS)
+    - size: size preset ("quick" or "full", see suite.SIZES)
+    - repeat: number of timed runs (capped for slow benchmarks)
+
+    Returns:
+    - dict of the results (seconds are the best of the runs)
+    """
+    import tracemalloc
+
+    setup = BENCHMARKS[name]
+    run, items, unit = setup(size)
+    if setup.max_repeat is not None:
+        repeat = min(repeat, setup.max_repeat)
+
+    rss = _max_rss()
+    tracemalloc.start()
+    run()
+    peak_traced = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    times = []
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    times.sort()
+
+    return dict(
+        seconds=times[0],
+        median_seconds=times[len(times) // 2],
+        runs=len(times),
+        items=items,
+        unit=unit,
+        throughput=items / times[0] if times[0] > 0 else float("inf"),
+        peak_traced_bytes=peak_traced,
+        peak_rss_bytes=None if rss is None else max(_max_rss() - rss, 0),
+    )
+
+
+def _try_benchmark(name, size, repeat):
+    """run_benchmark, catching the benchmarks that are skipped or fail."""
+    try:
+        return run_benchmark(name, size, repeat)
+    except Skip as e:
+        return dict(skipped=str(e))
+    except ImportError as e:  # e.g., pygalmesh is not installed
+        return dict(skipped=f"{type(e).__name__}: {e}")
+    except Exception as e:
+        return dict(error=f"{type(e).__name__}: {e}")
+
+
+def _benchmark_job(name, size, repeat, conn):
+    conn.send(_try_benchmark(name, size, repeat))
+    conn.close()
+
+
+def run(names, size="quick", repeat=5, isolate=True, callback=None):
+    """
+    Run benchmarks.
+
+    Parameters:
+    - names: names of the benchmarks to run
+    - size: size preset ("quick" or "full")
+    - repeat: number of timed runs of each benchmark
+    - isolate: run each benchmark in a fresh process, so the peak memories
+      and caches of the benchmarks do not interfere
+    - callback: optional function called with (name, result) after each
+      benchmark
+
+    Returns:
+    - dict of the results by name
+    """
+    import multiprocessing
+
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for name in names:
+        if not isolate:
+            result = _try_benchmark(name, size, repeat)
+        else:
+            recv_conn, send_conn = ctx.Pipe(duplex=False)
+            process = ctx.Process(
+                target=_benchmark_job, args=(name, size, repeat, send_conn))
+            process.start()
+            send_conn.close()
+            try:
+                result = recv_conn.recv()
+            except EOFError:
+                result = dict(error="process exited before sending results")
+            process.join()
+            if process.exitcode:
+                result = dict(error=f"process exited with code {process.exitcode}")
+        results[name] = result
+        if callback is not None:
+            callback(name, result)
+    return results
+
+
+def metadata(size):
+    """Description of the machine and commit the results were measured on."""
+    import subprocess
+    import numpy as np
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return dict(
+        commit=commit,
+        date=time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        size=size,
+        python=platform.python_version(),
+        numpy=np.__version__,
+        platform=platform.platform(),
+        processor=platform.processor(),
+        cpu_count=os.cpu_count(),
+    )
+
+
+def save(path, results, size):
+    """Save the results (and metadata) as JSON."""
+    with open(path, "w") as file:
+        json.dump(dict(metadata=metadata(size), results=results), file, indent=2)
+
+
+def load(path):
+    """Load results saved by save."""
+    with open(path) as file:
+        return json.load(file)
+
+
+def compare(results, baseline, threshold=0.1, min_memory=MiB):
+    """
+    Compare results to baseline results.
+
+    Parameters:
+    - results: results by name (see run)
+    - baseline: baseline results by name
+    - threshold: relative increase of time or memory counted as a regression
+    - min_memory: memory increases below this many bytes are ignored
+
+    Returns:
+    - dict of (time ratio, traced memory ratio, regressed) by name, for the
+      benchmarks in both results
+    """
+    comparison = {}
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or "seconds" not in result or "seconds" not in base:
+            continue
+        time_ratio = result["seconds"] / base["seconds"]
+        memory = result["peak_traced_bytes"]
+        base_memory = base["peak_traced_bytes"]
+        memory_ratio = memory / base_memory if base_memory else None
+        regressed = time_ratio > 1 + threshold or (
+            memory - base_memory > min_memory
+            and memory > (1 + threshold) * base_memory)
+        comparison[name] = time_ratio, memory_ratio, regressed
+    return comparison
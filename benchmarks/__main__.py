@@ -0,0 +1,104 @@
+import fnmatch
+
+from . import BENCHMARKS, SIZES, MiB, compare, load, run, save
+
+
+def parse_args():
+    import argparse
+    import pathlib
+
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark the evaluation and meshing hot paths.")
+
+    parser.add_argument(
+        "-k", "--filter", nargs="+", default=None,
+        help="only run the benchmarks matching these glob patterns (e.g., 'grid/*' '*gyroid')")
+    parser.add_argument(
+        "-s", "--size", choices=list(SIZES), default="quick",
+        help="size preset of the inputs (default: quick)")
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=5,
+        help="number of timed runs of each benchmark (default: 5)")
+    parser.add_argument(
+        "--no-isolate", dest="isolate", action="store_false",
+        help="run all benchmarks in this process (peak RSS is then meaningless)")
+
+    parser.add_argument(
+        "-o", "--output", type=pathlib.Path, default=None,
+        help="save the results as JSON (e.g., a baseline to compare to later)")
+    parser.add_argument(
+        "-b", "--baseline", type=pathlib.Path, default=None,
+        help="compare to the results in this JSON file")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1,
+        help="relative slowdown (or memory increase) reported as a regression (default: 0.1)")
+
+    parser.add_argument(
+        "-l", "--list", action="store_true", help="list the benchmarks and exit")
+
+    return parser.parse_args()
+
+
+def format_result(name, result, comparison=None):
+    """One line of the results table."""
+    if "skipped" in result:
+        return f"{name:<48} skipped ({result['skipped']})"
+    if "error" in result:
+        return f"{name:<48} FAILED ({result['error']})"
+    line = (
+        f"{name:<48} {result['throughput']:10.3e} {result['unit'] + '/s':<12}"
+        f" {1e3 * result['seconds']:10.2f} ms"
+        f" {result['peak_traced_bytes'] / MiB:9.1f} MiB")
+    if result["peak_rss_bytes"] is not None:
+        line += f" {result['peak_rss_bytes'] / MiB:9.1f} MiB RSS"
+    if comparison is not None:
+        time_ratio, _, regressed = comparison
+        line += f"  {time_ratio:5.2f}x time" + ("  REGRESSION" if regressed else "")
+    return line
+
+
+def main():
+    args = parse_args()
+
+    names = list(BENCHMARKS)
+    if args.filter is not None:
+        names = [name for name in names if any(
+            fnmatch.fnmatch(name, pattern) for pattern in args.filter)]
+
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    baseline = None
+    if args.baseline is not None:
+        baseline = load(args.baseline)
+        print(f"Comparing to {args.baseline} (commit {baseline['metadata']['commit']}, "
+              f"size {baseline['metadata']['size']})")
+        if baseline["metadata"]["size"] != args.size:
+            print(f"Warning: the baseline uses the {baseline['metadata']['size']} "
+                  f"size preset, not {args.size}")
+        baseline = baseline["results"]
+
+    def report(name, result):
+        comparison = None
+        if baseline is not None:
+            comparison = compare({name: result}, baseline, args.threshold).get(name)
+        print(format_result(name, result, comparison), flush=True)
+
+    results = run(names, args.size, args.repeat, args.isolate, callback=report)
+
+    if args.output is not None:
+        save(args.output, results, args.size)
+        print(f"Saved results to {args.output}")
+
+    if baseline is not None:
+        comparison = compare(results, baseline, args.threshold)
+        regressions = [name for name, (*_, regressed) in comparison.items() if regressed]
+        print(f"{len(regressions)} regression(s) in {len(comparison)} compared benchmark(s)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
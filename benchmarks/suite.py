@@ -0,0 +1,263 @@
+"""
+Benchmarks of the evaluation and meshing hot paths.
+
+Each benchmark is a function of the size preset ("quick" or "full") that
+sets up its inputs and returns (run, items, unit): run() is the timed
+function and it processes items units (points, samples, ...) per call.
+"""
+import numpy as np
+
+BENCHMARKS = {}
+
+
+class Skip(Exception):
+    """Raised by a benchmark setup that does not apply to a size preset."""
+
+
+PRIMITIVES = [
+    "schoen_gyroid",
+    "schwarz_diamond",
+    "schwarz_primitive",
+    "schoen_iwp",
+    "neovius",
+    "fischer_koch_s",
+    "schoen_frd",
+    "PMY",
+]  # Order of InterpolatedTPMS.TPMSs
+
+SIZES = {
+    "quick": dict(
+        scalar_points=2_000, batch_points=100_000, res_y=[50, 100],
+        feature_edge_res=25, elements_in_thickness=1, seeds=[0],
+        tile_repeats=(2, 2, 2)),
+    "full": dict(
+        scalar_points=20_000, batch_points=1_000_000, res_y=[50, 100, 200],
+        feature_edge_res=50, elements_in_thickness=2, seeds=[0, 1],
+        tile_repeats=(4, 4, 4)),
+}
+
+
+def benchmark(name, repeat=None):
+    """
+    Register a benchmark.
+
+    Parameters:
+    - name: unique name of the benchmark ("group/case")
+    - repeat: maximum number of timed runs (e.g., for slow meshing)
+    """
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        setup.max_repeat = repeat
+        return setup
+    return decorator
+
+
+def _random_points(domain, n, seed=0):
+    """n uniformly random points (x, y, z) in [0, domain]."""
+    P = np.random.default_rng(seed).random((3, n)) * np.reshape(domain, (3, 1))
+    return P[0], P[1], P[2]
+
+
+def _design(seed):
+    """Random InterpolatedTPMS design vector (normalized to sum to one)."""
+    x = np.random.default_rng(seed).random(8)
+    return x / x.sum()
+
+
+def _implicits():
+    """Named implicit functions to evaluate."""
+    from TPMeSh import InterpolatedTPMS, SpatiallyVaryingTPMS, FourierTPMS
+
+    implicits = dict(zip(PRIMITIVES, InterpolatedTPMS.TPMSs))
+    implicits["interpolated"] = InterpolatedTPMS(_design(0))
+    implicits["spatially_varying"] = SpatiallyVaryingTPMS()
+    implicits["fourier"] = FourierTPMS()
+    return implicits
+
+
+def _register_evaluation(name, shell):
+    def make(kind):
+        def setup(size):
+            from TPMeSh import ImplicitShell
+
+            f = _implicits()[name]
+            if shell:
+                f = ImplicitShell(f, thickness=0.5)
+            n = SIZES[size][f"{kind}_points"]
+            x, y, z = _random_points(f.domain, n)
+            if kind == "batch":
+                return lambda: f(x, y, z), n, "points"
+            P = list(zip(x.tolist(), y.tolist(), z.tolist()))
+
+            def run():
+                for p in P:
+                    f(*p)
+            return run, n, "points"
+        return setup
+
+    group = "shell" if shell else "implicit"
+    for kind in ("scalar", "batch"):
+        benchmark(f"{group}/{kind}/{name}")(make(kind))
+
+
+for _name in [*PRIMITIVES, "interpolated", "spatially_varying", "fourier"]:
+    for _shell in (False, True):
+        _register_evaluation(_name, _shell)
+
+
+def _tpms_shell(seed=0, thickness=0.5):
+    from TPMeSh import ImplicitShell, InterpolatedTPMS
+    return ImplicitShell(InterpolatedTPMS(_design(seed)), thickness=thickness)
+
+
+# Bound on |∂²f/∂x_i²| of _tpms_shell() (its largest second difference on a
+# 200³ grid is 33.6)
+TPMS_SHELL_GRADIENT_LIPSCHITZ = 40
+
+
+def _graded_shell(seed=0, shape=(8, 8, 8)):
+    """GradedTPMSShell over 2×2×2 cells with random design and thickness fields."""
+    from TPMeSh import GradedTPMSShell, InterpolatedTPMS
+
+    rng = np.random.default_rng(seed)
+    designs = rng.random((*shape, 8))
+    designs /= designs.sum(axis=-1, keepdims=True)
+    thicknesses = rng.uniform(0.3, 0.6, shape)
+    return GradedTPMSShell(
+        designs, thicknesses, 2 * InterpolatedTPMS.TPMSs[0].domain)
+
+
+def _cell_domain(f):
+    return np.vstack([np.zeros(3), f.domain])
+
+
+def _check_preset(size, key, value):
+    """Skip the benchmark if value is not in the size preset's key list."""
+    if value not in SIZES[size][key]:
+        raise Skip(f"{key}={value} is not in the {size} preset")
+
+
+def _register_grid(res_y):
+    def eval_implicit(size):
+        from TPMeSh.mesh_implicit_surface import _eval_implicit, res3D
+
+        _check_preset(size, "res_y", res_y)
+        f = _tpms_shell()
+        domain = _cell_domain(f)
+        n = int(np.prod(np.array(res3D(domain, res_y)) + 1))
+        return lambda: _eval_implicit(f, domain, res_y), n, "samples"
+
+    def surface(size):
+        from TPMeSh.mesh_implicit_surface import mesh_implicit_surface, res3D
+
+        _check_preset(size, "res_y", res_y)
+        f = _tpms_shell()
+        domain = _cell_domain(f)
+        n = int(np.prod(np.array(res3D(domain, res_y)) + 1))
+        return lambda: mesh_implicit_surface(f, domain, res_y), n, "samples"
+
+    def eval_graded(size):
+        from TPMeSh.mesh_implicit_surface import _eval_implicit, res3D
+
+        _check_preset(size, "res_y", res_y)
+        f = _graded_shell()
+        domain = _cell_domain(f)
+        n = int(np.prod(np.array(res3D(domain, res_y)) + 1))
+        return lambda: _eval_implicit(f, domain, res_y), n, "samples"
+
+    def narrow_band(size):
+        from TPMeSh.mesh_implicit_surface import res3D
+        from TPMeSh.sparse_grid import narrow_band_grid
+
+        _check_preset(size, "res_y", res_y)
+        f = _tpms_shell()
+        domain = _cell_domain(f)
+        n = int(np.prod(np.array(res3D(domain, res_y)) + 1))
+        return lambda: narrow_band_grid(f, domain, res_y), n, "samples"
+
+    def adaptive_surface(size):
+        from TPMeSh.mesh_implicit_surface import mesh_implicit_surface, res3D
+
+        _check_preset(size, "res_y", res_y)
+        f = _tpms_shell()
+        domain = _cell_domain(f)
+        n = int(np.prod(np.array(res3D(domain, res_y)) + 1))
+        return (lambda: mesh_implicit_surface(
+            f, domain, res_y, adaptive=True,
+            gradient_lipschitz=TPMS_SHELL_GRADIENT_LIPSCHITZ), n, "samples")
+
+    benchmark(f"grid/eval_implicit/res{res_y}")(eval_implicit)
+    benchmark(f"grid/eval_graded/res{res_y}")(eval_graded)
+    benchmark(f"grid/mesh_implicit_surface/res{res_y}")(surface)
+    benchmark(f"grid/mesh_implicit_surface_adaptive/res{res_y}")(adaptive_surface)
+    benchmark(f"grid/narrow_band/res{res_y}")(narrow_band)
+
+
+for _res_y in sorted({r for s in SIZES.values() for r in s["res_y"]}):
+    _register_grid(_res_y)
+
+
+@benchmark("mesh/feature_edges", repeat=3)
+def _feature_edges(size):
+    from TPMeSh.mesh_implicit import PyGALImplicit
+
+    f = _tpms_shell()
+    res = SIZES[size]["feature_edge_res"]
+    bbox = np.array([[0, 0, 0], [1, 1, 1]])
+    return lambda: PyGALImplicit(f, np.ones(3), res, bbox=bbox), 1, "domains"
+
+
+def _register_meshing(seed):
+    def full(size):
+        from TPMeSh.mesh_implicit import mesh_implicit
+
+        _check_preset(size, "seeds", seed)
+        f = _tpms_shell(seed)
+        kwargs = dict(
+            elements_in_thickness=SIZES[size]["elements_in_thickness"],
+            feature_edge_res=SIZES[size]["feature_edge_res"])
+        return lambda: mesh_implicit(f, **kwargs), 1, "meshes"
+
+    def periodic(size):
+        from TPMeSh.mesh_implicit_periodic import mesh_implicit_periodic
+
+        _check_preset(size, "seeds", seed)
+        f = _tpms_shell(seed)
+        n = SIZES[size]["elements_in_thickness"]
+        return lambda: mesh_implicit_periodic(f, n), 1, "meshes"
+
+    benchmark(f"mesh/mesh_implicit/seed{seed}", repeat=1)(full)
+    benchmark(f"mesh/mesh_implicit_periodic/seed{seed}", repeat=1)(periodic)
+
+
+for _seed in sorted({seed for s in SIZES.values() for seed in s["seeds"]}):
+    _register_meshing(_seed)
+
+
+def _periodic_cell(size):
+    """Periodic surface mesh of one TPMS cell (V, F, domain)."""
+    from TPMeSh.mesh_implicit_surface import mesh_periodic_implicit_surface
+
+    f = _tpms_shell()
+    V, F = mesh_periodic_implicit_surface(f, np.ones(3, dtype=int), 50)
+    return V, F, np.asarray(f.domain)
+
+
+@benchmark("periodic/tile_mesh")
+def _tile_mesh(size):
+    from TPMeSh.mesh_implicit_periodic import tile_mesh, periodic_vertex_pairs
+
+    V, F, domain = _periodic_cell(size)
+    pairs = periodic_vertex_pairs(V, (np.zeros(3), domain))
+    repeats = SIZES[size]["tile_repeats"]
+    return (lambda: tile_mesh(V, F, domain, repeats, pairs),
+            len(F) * int(np.prod(repeats)), "elements")
+
+
+@benchmark("periodic/periodic_components")
+def _periodic_components(size):
+    from TPMeSh.mesh_implicit_periodic import periodic_components
+
+    V, F, domain = _periodic_cell(size)
+    return (lambda: periodic_components(V, F, (np.zeros(3), domain)),
+            len(V), "vertices")
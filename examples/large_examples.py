@@ -1,4 +1,3 @@
-import meshio
 # import trimesh
 # import trimesh.creation
 import igl
@@ -10,8 +9,9 @@ import sys
 sys.path.append(str(pathlib.Path(__file__).parents[1]))  # noqa
 
 from TPMeSh import ImplicitShell, InterpolatedTPMS
-from TPMeSh.mesh_implicit_surface import mesh_implicit_surface
+from TPMeSh.mesh_implicit_surface import mesh_periodic_implicit_surface
 from TPMeSh.mesh_implicit_periodic import tile_mesh
+from TPMeSh.mesh_io import write_ply
 
 
 def param_to_name(param):
@@ -31,10 +31,10 @@ tilings = np.array([
 ])
 
 for param, tiling in zip(params, tilings):
-    domain = np.array([[0, 0, 0], tiling * np.full(3, 2 * np.pi)])
-    V, BF = mesh_implicit_surface(
+    # Mesh one cell and tile it (800 samples per 16 cells along y)
+    V, BF = mesh_periodic_implicit_surface(
         ImplicitShell(InterpolatedTPMS(param), thickness=0.5),
-        domain, res_y=int(tiling[1]//16*800), intersect_with_box=True)
+        tiling, res_y=50, intersect_with_box=True)
     print(f"|V|={len(V)} |BF|={len(BF)}")
 
     # Plot mesh
@@ -64,9 +64,9 @@ for param, tiling in zip(params, tilings):
     # BF = mesh.faces
     # print(f"|V|={len(V)} |BF|={len(BF)}")
 
-    meshio.write(
+    write_ply(
         f"meshes/{param_to_name(param)} ({{}}x{{}}x{{}}).ply".format(*tiling),
-        meshio.Mesh(V, {"triangle": BF}))
+        V, BF)
 
     # Plot mesh
     # ps.init()
@@ -1,23 +1,151 @@
 #include <nanobind/nanobind.h>
+#include <nanobind/stl/string.h>
 #include <nanobind/stl/vector.h>
+#include <nanobind/stl/array.h>
 #include <nanobind/stl/function.h>
+#include <nanobind/stl/optional.h>
+#include <nanobind/stl/pair.h>
+#include <nanobind/ndarray.h>
 #include <nanobind/eigen/dense.h>
 
 #include <Eigen/Core>
 
 #include "tpms.hpp"
 #include "tpms_gradient.hpp"
+#include "tpms_batch.hpp"
 #include "implicit.hpp"
 #include "implicit_shell.hpp"
+#include "implicit_domain.hpp"
 #include "interpolated_tpms.hpp"
 #include "spatially_varying_tpms.hpp"
 #include "fourier_tpms.hpp"
+#include "primitive_tpms.hpp"
+#include "graded_tpms_shell.hpp"
 
 namespace nb = nanobind;
 
 #define BIND_3D_FUNCTION(NAME)                                                 \
     m.def(#NAME, &tpms::NAME, nb::arg("x"), nb::arg("y"), nb::arg("z"))
 
+// Bind the batch version of NAME with CHANNELS outputs per point
+#define BIND_BATCH_FUNCTION(NAME, CHANNELS)                                    \
+    m.def(                                                                     \
+        #NAME, &evaluate_batch<&tpms::batch::NAME, CHANNELS>, nb::arg("x"),    \
+        nb::arg("y"), nb::arg("z"), nb::arg("num_threads") = 0)
+
+namespace {
+
+using Array = nb::ndarray<const double, nb::c_contig, nb::device::cpu>;
+using BatchFunction = void (*)(
+    const double*, const double*, const double*, double*, Eigen::Index);
+
+/// @brief Evaluate a batch function on NumPy arrays of any (matching) shape.
+/// @return Array of the same shape (with an extra axis if CHANNELS > 1), or
+///         a float for 0-d inputs (e.g., NumPy scalars) when CHANNELS == 1
+template <BatchFunction F, size_t CHANNELS>
+nb::object evaluate_batch(
+    const Array& x, const Array& y, const Array& z, const int num_threads)
+{
+    std::vector<size_t> shape(x.ndim());
+    for (size_t i = 0; i < x.ndim(); ++i) {
+        shape[i] = x.shape(i);
+    }
+    const auto same_shape = [&](const Array& a) {
+        if (a.ndim() != shape.size()) {
+            return false;
+        }
+        for (size_t i = 0; i < shape.size(); ++i) {
+            if (a.shape(i) != shape[i]) {
+                return false;
+            }
+        }
+        return true;
+    };
+    if (!same_shape(y) || !same_shape(z)) {
+        throw std::invalid_argument("x, y, and z must have the same shape");
+    }
+    if (CHANNELS > 1) {
+        shape.push_back(CHANNELS);
+    }
+
+    const Eigen::Index n = x.size();
+    double* out = new double[n * CHANNELS];
+    nb::capsule owner(out, [](void* p) noexcept { delete[] (double*)p; });
+    {
+        nb::gil_scoped_release release;
+        tpms::parallel_for(
+            n,
+            [&](const Eigen::Index start, const Eigen::Index end) {
+                F(x.data() + start, y.data() + start, z.data() + start,
+                  out + CHANNELS * start, end - start);
+            },
+            num_threads);
+    }
+    if (shape.empty()) {
+        return nb::float_(out[0]);
+    }
+    return nb::cast(nb::ndarray<nb::numpy, double>(
+        out, shape.size(), shape.data(), owner));
+}
+
+template <typename T>
+using GridArray = nb::ndarray<T, nb::ndim<3>, nb::c_contig, nb::device::cpu>;
+
+/// @brief Evaluate f.eval_grid into out, a float32 or float64 array of shape
+///        (nx, ny, nz), or into a new float64 array if out is None.
+/// @return out or the new array
+template <typename F>
+nb::object evaluate_grid(
+    const F& f,
+    const Eigen::VectorXd& xs,
+    const Eigen::VectorXd& ys,
+    const Eigen::VectorXd& zs,
+    nb::object out,
+    const int num_threads)
+{
+    const size_t shape[3] = { size_t(xs.size()), size_t(ys.size()),
+                              size_t(zs.size()) };
+
+    if (out.is_none()) {
+        Eigen::VectorXd* values;
+        {
+            nb::gil_scoped_release release;
+            values =
+                new Eigen::VectorXd(f.eval_grid(xs, ys, zs, num_threads));
+        }
+        nb::capsule owner(
+            values, [](void* p) noexcept { delete (Eigen::VectorXd*)p; });
+        return nb::cast(
+            nb::ndarray<nb::numpy, double>(values->data(), 3, shape, owner));
+    }
+
+    GridArray<float> out_float;
+    GridArray<double> out_double;
+    const bool is_float = nb::try_cast(out, out_float, /*convert=*/false);
+    if (!is_float && !nb::try_cast(out, out_double, /*convert=*/false)) {
+        throw nb::type_error(
+            "out must be a C-contiguous float32 or float64 array");
+    }
+    for (size_t i = 0; i < 3; ++i) {
+        if ((is_float ? out_float.shape(i) : out_double.shape(i))
+            != shape[i]) {
+            throw std::invalid_argument(
+                "out must have shape (len(xs), len(ys), len(zs))");
+        }
+    }
+    {
+        nb::gil_scoped_release release;
+        if (is_float) {
+            f.eval_grid(xs, ys, zs, out_float.data(), num_threads);
+        } else {
+            f.eval_grid(xs, ys, zs, out_double.data(), num_threads);
+        }
+    }
+    return out;
+}
+
+} // namespace
+
 NB_MODULE(_tpms, m)
 {
     using namespace tpms;
@@ -50,14 +178,74 @@ NB_MODULE(_tpms, m)
     BIND_3D_FUNCTION(fischer_koch_s_gradient);
     BIND_3D_FUNCTION(schoen_frd_gradient);
     BIND_3D_FUNCTION(PMY_gradient);
+    BIND_3D_FUNCTION(double_schoen_gyroid_gradient);
+    BIND_3D_FUNCTION(double_swartz_diamond_gradient);
+    BIND_3D_FUNCTION(double_schwarz_primitive_gradient);
+    BIND_3D_FUNCTION(lipnoid_gradient);
+    BIND_3D_FUNCTION(tubular_G_AB_gradient);
+    BIND_3D_FUNCTION(tubular_G_C_gradient);
+    BIND_3D_FUNCTION(BCC_gradient);
+
+    // Batch (NumPy array) versions of the TPMS and gradient functions
+    BIND_BATCH_FUNCTION(schoen_gyroid, 1);
+    BIND_BATCH_FUNCTION(double_schoen_gyroid, 1);
+    BIND_BATCH_FUNCTION(schwarz_diamond, 1);
+    BIND_BATCH_FUNCTION(double_swartz_diamond, 1);
+    BIND_BATCH_FUNCTION(schwarz_primitive, 1);
+    BIND_BATCH_FUNCTION(double_schwarz_primitive, 1);
+    BIND_BATCH_FUNCTION(schoen_iwp, 1);
+    BIND_BATCH_FUNCTION(lipnoid, 1);
+    BIND_BATCH_FUNCTION(neovius, 1);
+    BIND_BATCH_FUNCTION(fischer_koch_s, 1);
+    BIND_BATCH_FUNCTION(schoen_frd, 1);
+    BIND_BATCH_FUNCTION(PMY, 1);
+    BIND_BATCH_FUNCTION(tubular_G_AB, 1);
+    BIND_BATCH_FUNCTION(tubular_G_C, 1);
+    BIND_BATCH_FUNCTION(BCC, 1);
+
+    BIND_BATCH_FUNCTION(schoen_gyroid_gradient, 3);
+    BIND_BATCH_FUNCTION(schwarz_diamond_gradient, 3);
+    BIND_BATCH_FUNCTION(schwarz_primitive_gradient, 3);
+    BIND_BATCH_FUNCTION(schoen_iwp_gradient, 3);
+    BIND_BATCH_FUNCTION(neovius_gradient, 3);
+    BIND_BATCH_FUNCTION(fischer_koch_s_gradient, 3);
+    BIND_BATCH_FUNCTION(schoen_frd_gradient, 3);
+    BIND_BATCH_FUNCTION(PMY_gradient, 3);
+    BIND_BATCH_FUNCTION(double_schoen_gyroid_gradient, 3);
+    BIND_BATCH_FUNCTION(double_swartz_diamond_gradient, 3);
+    BIND_BATCH_FUNCTION(double_schwarz_primitive_gradient, 3);
+    BIND_BATCH_FUNCTION(lipnoid_gradient, 3);
+    BIND_BATCH_FUNCTION(tubular_G_AB_gradient, 3);
+    BIND_BATCH_FUNCTION(tubular_G_C_gradient, 3);
+    BIND_BATCH_FUNCTION(BCC_gradient, 3);
+
+    // Fused value and gradient functions
+    BIND_3D_FUNCTION(schoen_gyroid_value_and_gradient);
+    BIND_3D_FUNCTION(schwarz_diamond_value_and_gradient);
+    BIND_3D_FUNCTION(schwarz_primitive_value_and_gradient);
+    BIND_3D_FUNCTION(schoen_iwp_value_and_gradient);
+    BIND_3D_FUNCTION(neovius_value_and_gradient);
+    BIND_3D_FUNCTION(fischer_koch_s_value_and_gradient);
+    BIND_3D_FUNCTION(schoen_frd_value_and_gradient);
+    BIND_3D_FUNCTION(PMY_value_and_gradient);
+    BIND_3D_FUNCTION(double_schoen_gyroid_value_and_gradient);
+    BIND_3D_FUNCTION(double_swartz_diamond_value_and_gradient);
+    BIND_3D_FUNCTION(double_schwarz_primitive_value_and_gradient);
+    BIND_3D_FUNCTION(lipnoid_value_and_gradient);
+    BIND_3D_FUNCTION(tubular_G_AB_value_and_gradient);
+    BIND_3D_FUNCTION(tubular_G_C_value_and_gradient);
+    BIND_3D_FUNCTION(BCC_value_and_gradient);
 
     nb::class_<Implicit>(m, "Implicit")
         .def(
             nb::init<
                 const std::function<double(double, double, double)>&,
                 const std::function<Eigen::Vector3d(double, double, double)>&,
-                const Eigen::Array3d&>(),
-            nb::arg("f"), nb::arg("df"), nb::arg("domain"))
+                const Eigen::Array3d&,
+                const std::function<std::pair<double, Eigen::Vector3d>(
+                    double, double, double)>&>(),
+            nb::arg("f"), nb::arg("df"), nb::arg("domain"),
+            nb::arg("fdf").none() = nb::none())
         .def(
             "__call__",
             nb::overload_cast<double, double, double>(
@@ -67,8 +255,11 @@ NB_MODULE(_tpms, m)
             "__call__",
             nb::overload_cast<
                 const Eigen::VectorXd&, const Eigen::VectorXd&,
-                const Eigen::VectorXd&>(&Implicit::operator(), nb::const_),
-            nb::arg("x"), nb::arg("y"), nb::arg("z"))
+                const Eigen::VectorXd&, int>(
+                &Implicit::operator(), nb::const_),
+            nb::arg("x"), nb::arg("y"), nb::arg("z"),
+            nb::arg("num_threads") = 0,
+            nb::call_guard<nb::gil_scoped_release>())
         .def(
             "eval",
             nb::overload_cast<double, double, double>(
@@ -78,11 +269,34 @@ NB_MODULE(_tpms, m)
             "eval",
             nb::overload_cast<
                 const Eigen::VectorXd&, const Eigen::VectorXd&,
-                const Eigen::VectorXd&>(&Implicit::operator(), nb::const_),
-            nb::arg("x"), nb::arg("y"), nb::arg("z"))
+                const Eigen::VectorXd&, int>(
+                &Implicit::operator(), nb::const_),
+            nb::arg("x"), nb::arg("y"), nb::arg("z"),
+            nb::arg("num_threads") = 0,
+            nb::call_guard<nb::gil_scoped_release>())
         .def(
             "gradient", &Implicit::gradient, nb::arg("x"), nb::arg("y"),
             nb::arg("z"))
+        .def(
+            "value_and_gradient",
+            nb::overload_cast<double, double, double>(
+                &Implicit::value_and_gradient, nb::const_),
+            nb::arg("x"), nb::arg("y"), nb::arg("z"))
+        .def(
+            "value_and_gradient",
+            nb::overload_cast<
+                const Eigen::VectorXd&, const Eigen::VectorXd&,
+                const Eigen::VectorXd&, int>(
+                &Implicit::value_and_gradient, nb::const_),
+            nb::arg("x"), nb::arg("y"), nb::arg("z"),
+            nb::arg("num_threads") = 0,
+            nb::call_guard<nb::gil_scoped_release>())
+        .def(
+            "eval_grid", &evaluate_grid<Implicit>, nb::arg("xs"),
+            nb::arg("ys"), nb::arg("zs"), nb::arg("out").none() = nb::none(),
+            nb::arg("num_threads") = 0,
+            "Evaluate on the grid xs × ys × zs as an (nx, ny, nz) array "
+            "(written into out if given, a float32 or float64 array)")
         .def_prop_ro("domain", &Implicit::domain);
 
     nb::class_<ImplicitShell>(m, "ImplicitShell")
@@ -96,8 +310,11 @@ NB_MODULE(_tpms, m)
             "__call__",
             nb::overload_cast<
                 const Eigen::VectorXd&, const Eigen::VectorXd&,
-                const Eigen::VectorXd&>(&ImplicitShell::operator(), nb::const_),
-            nb::arg("x"), nb::arg("y"), nb::arg("z"))
+                const Eigen::VectorXd&, int>(
+                &ImplicitShell::operator(), nb::const_),
+            nb::arg("x"), nb::arg("y"), nb::arg("z"),
+            nb::arg("num_threads") = 0,
+            nb::call_guard<nb::gil_scoped_release>())
         .def(
             "eval",
             nb::overload_cast<double, double, double>(
@@ -107,17 +324,244 @@ NB_MODULE(_tpms, m)
             "eval",
             nb::overload_cast<
                 const Eigen::VectorXd&, const Eigen::VectorXd&,
-                const Eigen::VectorXd&>(&ImplicitShell::operator(), nb::const_),
-            nb::arg("x"), nb::arg("y"), nb::arg("z"))
+                const Eigen::VectorXd&, int>(
+                &ImplicitShell::operator(), nb::const_),
+            nb::arg("x"), nb::arg("y"), nb::arg("z"),
+            nb::arg("num_threads") = 0,
+            nb::call_guard<nb::gil_scoped_release>())
+        .def(
+            "eval_grid", &evaluate_grid<ImplicitShell>, nb::arg("xs"),
+            nb::arg("ys"), nb::arg("zs"), nb::arg("out").none() = nb::none(),
+            nb::arg("num_threads") = 0,
+            "Evaluate on the grid xs × ys × zs as an (nx, ny, nz) array "
+            "(written into out if given, a float32 or float64 array)")
+        .def(
+            "distance",
+            nb::overload_cast<double, double, double>(
+                &ImplicitShell::distance, nb::const_),
+            nb::arg("x"), nb::arg("y"), nb::arg("z"),
+            "First-order estimate of the signed distance to the shell "
+            "(negative inside): |S| / |∇S| - thickness / 2")
+        .def(
+            "distance",
+            nb::overload_cast<
+                const Eigen::VectorXd&, const Eigen::VectorXd&,
+                const Eigen::VectorXd&, int>(
+                &ImplicitShell::distance, nb::const_),
+            nb::arg("x"), nb::arg("y"), nb::arg("z"),
+            nb::arg("num_threads") = 0,
+            nb::call_guard<nb::gil_scoped_release>())
         .def_prop_ro("thickness", &ImplicitShell::thickness)
         .def_prop_ro("domain", &ImplicitShell::domain);
 
+    nb::class_<GradedTPMSShell>(m, "GradedTPMSShell")
+        .def(
+            "__init__",
+            [](GradedTPMSShell* self,
+               const nb::ndarray<
+                   const double, nb::shape<nb::any, nb::any, nb::any, 8>,
+                   nb::c_contig, nb::device::cpu>& designs,
+               const nb::ndarray<
+                   const double, nb::ndim<3>, nb::c_contig, nb::device::cpu>&
+                   thicknesses,
+               const Eigen::Array3d& domain, const double tolerance) {
+                for (size_t i = 0; i < 3; ++i) {
+                    if (thicknesses.shape(i) != designs.shape(i)) {
+                        throw std::invalid_argument(
+                            "designs must have shape (nx, ny, nz, 8) and "
+                            "thicknesses (nx, ny, nz)");
+                    }
+                }
+                new (self) GradedTPMSShell(
+                    Eigen::Map<const Eigen::VectorXd>(
+                        designs.data(), designs.size()),
+                    Eigen::Map<const Eigen::VectorXd>(
+                        thicknesses.data(), thicknesses.size()),
+                    { Eigen::Index(designs.shape(0)),
+                      Eigen::Index(designs.shape(1)),
+                      Eigen::Index(designs.shape(2)) },
+                    domain, tolerance);
+            },
+            nb::arg("designs"), nb::arg("thicknesses"), nb::arg("domain"),
+            nb::arg("tolerance") = SpatiallyVaryingTPMS::DEFAULT_TOLERANCE,
+            "Shell of the blend of the primitives with an (nx, ny, nz, 8) grid "
+            "of design vectors and an (nx, ny, nz) grid of thicknesses "
+            "spanning [0, domain], interpolated trilinearly")
+        .def(
+            "__call__",
+            nb::overload_cast<double, double, double>(
+                &GradedTPMSShell::operator(), nb::const_),
+            nb::arg("x"), nb::arg("y"), nb::arg("z"))
+        .def(
+            "__call__",
+            nb::overload_cast<
+                const Eigen::VectorXd&, const Eigen::VectorXd&,
+                const Eigen::VectorXd&, int>(
+                &GradedTPMSShell::operator(), nb::const_),
+            nb::arg("x"), nb::arg("y"), nb::arg("z"),
+            nb::arg("num_threads") = 0,
+            nb::call_guard<nb::gil_scoped_release>())
+        .def(
+            "eval",
+            nb::overload_cast<double, double, double>(
+                &GradedTPMSShell::operator(), nb::const_),
+            nb::arg("x"), nb::arg("y"), nb::arg("z"))
+        .def(
+            "eval",
+            nb::overload_cast<
+                const Eigen::VectorXd&, const Eigen::VectorXd&,
+                const Eigen::VectorXd&, int>(
+                &GradedTPMSShell::operator(), nb::const_),
+            nb::arg("x"), nb::arg("y"), nb::arg("z"),
+            nb::arg("num_threads") = 0,
+            nb::call_guard<nb::gil_scoped_release>())
+        .def(
+            "eval_grid", &evaluate_grid<GradedTPMSShell>, nb::arg("xs"),
+            nb::arg("ys"), nb::arg("zs"), nb::arg("out").none() = nb::none(),
+            nb::arg("num_threads") = 0,
+            "Evaluate on the grid xs × ys × zs as an (nx, ny, nz) array "
+            "(written into out if given, a float32 or float64 array)")
+        .def(
+            "distance",
+            nb::overload_cast<double, double, double>(
+                &GradedTPMSShell::distance, nb::const_),
+            nb::arg("x"), nb::arg("y"), nb::arg("z"),
+            "First-order estimate of the signed distance to the shell "
+            "(negative inside): |S| / |∇S| - thickness / 2")
+        .def(
+            "distance",
+            nb::overload_cast<
+                const Eigen::VectorXd&, const Eigen::VectorXd&,
+                const Eigen::VectorXd&, int>(
+                &GradedTPMSShell::distance, nb::const_),
+            nb::arg("x"), nb::arg("y"), nb::arg("z"),
+            nb::arg("num_threads") = 0,
+            nb::call_guard<nb::gil_scoped_release>())
+        .def(
+            "design", &GradedTPMSShell::design, nb::arg("x"), nb::arg("y"),
+            nb::arg("z"))
+        .def(
+            "thickness_at", &GradedTPMSShell::thickness_at, nb::arg("x"),
+            nb::arg("y"), nb::arg("z"))
+        .def_prop_ro(
+            "thickness", &GradedTPMSShell::thickness,
+            "Smallest thickness (used to size the elements of meshes)")
+        .def_prop_ro(
+            "tpms", &GradedTPMSShell::tpms,
+            "Blend of the primitives (without the shell) with gradients")
+        .def_prop_ro("tolerance", &GradedTPMSShell::tolerance)
+        .def_prop_ro("domain", &GradedTPMSShell::domain);
+
+    nb::class_<OracleCache>(m, "OracleCache")
+        .def_prop_ro("capacity", &OracleCache::capacity)
+        .def_prop_ro("quantum", &OracleCache::quantum)
+        .def_prop_ro("size", &OracleCache::size)
+        .def_prop_ro("hits", &OracleCache::hits)
+        .def_prop_ro("misses", &OracleCache::misses)
+        .def_prop_ro("evictions", &OracleCache::evictions);
+
+    nb::class_<ImplicitDomain>(m, "ImplicitDomain")
+        .def(
+            nb::init<
+                const Implicit&, const Eigen::Array3d&,
+                const std::optional<ImplicitDomain::Box>&, std::size_t,
+                double>(),
+            nb::arg("f"), nb::arg("scale"), nb::arg("box") = nb::none(),
+            nb::arg("cache_size") = 0, nb::arg("cache_quantum") = 0.0)
+        .def(
+            nb::init<
+                const ImplicitShell&, const Eigen::Array3d&,
+                const std::optional<ImplicitDomain::Box>&, std::size_t,
+                double>(),
+            nb::arg("f"), nb::arg("scale"), nb::arg("box") = nb::none(),
+            nb::arg("cache_size") = 0, nb::arg("cache_quantum") = 0.0)
+        .def(
+            nb::init<
+                const GradedTPMSShell&, const Eigen::Array3d&,
+                const std::optional<ImplicitDomain::Box>&, std::size_t,
+                double>(),
+            nb::arg("f"), nb::arg("scale"), nb::arg("box") = nb::none(),
+            nb::arg("cache_size") = 0, nb::arg("cache_quantum") = 0.0)
+        .def(
+            "__call__",
+            nb::overload_cast<double, double, double>(
+                &ImplicitDomain::operator(), nb::const_),
+            nb::arg("x"), nb::arg("y"), nb::arg("z"))
+        .def("eval", &ImplicitDomain::eval, nb::arg("x"))
+        .def_prop_ro("scale", &ImplicitDomain::scale)
+        .def_prop_ro("box", &ImplicitDomain::box)
+        .def_prop_ro(
+            "evaluations", &ImplicitDomain::evaluations,
+            "Number of evaluations since construction (or the last reset)")
+        .def("reset_evaluations", &ImplicitDomain::reset_evaluations)
+        .def_prop_ro(
+            "cache", &ImplicitDomain::cache, nb::rv_policy::reference_internal,
+            "Cache of the values of f (None if disabled)");
+
     nb::class_<InterpolatedTPMS, Implicit>(m, "InterpolatedTPMS")
         .def(nb::init<const Eigen::ArrayXd&>(), nb::arg("params"))
         .def_ro_static("TPMSs", &InterpolatedTPMS::TPMSs);
 
     nb::class_<SpatiallyVaryingTPMS, Implicit>(m, "SpatiallyVaryingTPMS")
-        .def(nb::init<>());
+        .def(
+            nb::init<double, const Eigen::Vector3d&, double>(),
+            nb::arg("sharpness") = 1.0,
+            nb::arg("center") = Eigen::Vector3d::Zero(),
+            nb::arg("tolerance") = SpatiallyVaryingTPMS::DEFAULT_TOLERANCE,
+            "Blend the primitives with products of sigmoids of the "
+            "coordinates (one corner of the blend per primitive)")
+        .def(
+            "__init__",
+            [](SpatiallyVaryingTPMS* self,
+               const nb::ndarray<
+                   const double, nb::shape<nb::any, nb::any, nb::any, 8>,
+                   nb::c_contig, nb::device::cpu>& weights,
+               const Eigen::Array3d& domain, const double tolerance) {
+                new (self) SpatiallyVaryingTPMS(
+                    Eigen::Map<const Eigen::VectorXd>(
+                        weights.data(), weights.size()),
+                    { Eigen::Index(weights.shape(0)),
+                      Eigen::Index(weights.shape(1)),
+                      Eigen::Index(weights.shape(2)) },
+                    domain, tolerance);
+            },
+            nb::arg("weights"), nb::arg("domain"),
+            nb::arg("tolerance") = SpatiallyVaryingTPMS::DEFAULT_TOLERANCE,
+            "Blend the primitives with an (nx, ny, nz, 8) grid of weights "
+            "spanning [0, domain], interpolated trilinearly")
+        .def(
+            "__init__",
+            [](SpatiallyVaryingTPMS* self,
+               const std::function<Eigen::VectorXd(double, double, double)>&
+                   weights,
+               const Eigen::Array3d& domain, const double tolerance) {
+                // Check the number of weights here: a fixed-size cast of the
+                // result fails with an opaque std::bad_cast
+                new (self) SpatiallyVaryingTPMS(
+                    [weights](double x, double y, double z) {
+                        const Eigen::VectorXd w = weights(x, y, z);
+                        if (w.size() != SpatiallyVaryingTPMS::NUM_TPMS) {
+                            throw std::invalid_argument(
+                                "weights(x, y, z) must return 8 weights, got "
+                                + std::to_string(w.size()));
+                        }
+                        return SpatiallyVaryingTPMS::Weights(w);
+                    },
+                    domain, tolerance);
+            },
+            nb::arg("weights"), nb::arg("domain"),
+            nb::arg("tolerance") = SpatiallyVaryingTPMS::DEFAULT_TOLERANCE,
+            "Blend the primitives with weights(x, y, z) -> 8 weights (a grid "
+            "of weights is much faster to evaluate)")
+        .def(
+            "weights", &SpatiallyVaryingTPMS::weights, nb::arg("x"),
+            nb::arg("y"), nb::arg("z"))
+        .def_prop_ro("tolerance", &SpatiallyVaryingTPMS::tolerance);
 
     nb::class_<FourierTPMS, Implicit>(m, "FourierTPMS").def(nb::init<>());
+
+    nb::class_<PrimitiveTPMS, Implicit>(m, "PrimitiveTPMS")
+        .def(nb::init<const std::string&>(), nb::arg("name"))
+        .def_prop_ro("name", &PrimitiveTPMS::name)
+        .def_ro_static("NAMES", &PrimitiveTPMS::NAMES);
 }
@@ -34,6 +34,20 @@ FourierTPMS::FourierTPMS() : Implicit()
         }
         return (4 / M_PI) * r;
     };
+
+    this->fdf = [](double x, double y, double z) {
+        double r = 0;
+        Eigen::Vector3d dr = Eigen::Vector3d::Zero();
+        for (int k = 1; k <= N; ++k) {
+            const double tmp = 2 * M_PI * (2 * k - 1) * FREQUENCY;
+            auto [v, g] = schoen_gyroid_value_and_gradient(tmp * x, y, z);
+            g[0] *= tmp;
+            r += v / (2 * k - 1);
+            dr += g / (2 * k - 1);
+        }
+        return std::make_pair(
+            (4 / M_PI) * r, Eigen::Vector3d((4 / M_PI) * dr));
+    };
 }
 
 } // namespace tpms
\ No newline at end of file
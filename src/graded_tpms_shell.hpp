@@ -0,0 +1,272 @@
+#pragma once
+
+#include "grid_field.hpp"
+#include "parallel.hpp"
+#include "spatially_varying_tpms.hpp"
+#include "tpms_batch.hpp"
+
+#include <Eigen/Core>
+
+#include <cmath>
+#include <limits>
+#include <memory>
+#include <vector>
+
+namespace tpms {
+
+/// @brief Shell of a blend of the TPMS primitives whose design vector and
+/// thickness vary over the part.
+///
+/// The design vectors (weights of InterpolatedTPMS::TPMSs) and thicknesses
+/// are sampled on a grid spanning [0, domain] (e.g., the voxels of a
+/// topology optimization) and interpolated trilinearly. They are stored as
+/// the channels of one GridField, so a point needs a single cell lookup,
+/// and grid evaluation looks up each coordinate once. The blend S and its
+/// analytic gradient are computed as in SpatiallyVaryingTPMS, and the shell
+/// is (S - t |∇S| / 2) (S + t |∇S| / 2) as in ImplicitShell.
+class GradedTPMSShell {
+public:
+    static constexpr int NUM_TPMS = SpatiallyVaryingTPMS::NUM_TPMS;
+    using Weights = SpatiallyVaryingTPMS::Weights;
+    using WeightsJacobian = SpatiallyVaryingTPMS::WeightsJacobian;
+
+    /// @param designs Design vectors in row-major (x, y, z, primitive) order
+    /// @param thicknesses Thicknesses in row-major (x, y, z) order
+    /// @param shape Number of grid samples along each axis (at least 2)
+    /// @param domain Extent of the grid and of the implicit
+    /// @param tolerance Weights at most this are skipped (0 skips only zero weights)
+    GradedTPMSShell(
+        const Eigen::VectorXd& designs,
+        const Eigen::VectorXd& thicknesses,
+        const std::array<Eigen::Index, 3>& shape,
+        const Eigen::Array3d& domain,
+        const double tolerance = SpatiallyVaryingTPMS::DEFAULT_TOLERANCE)
+        : m_field(make_field(designs, thicknesses, shape, domain))
+        , m_tpms(m_field, tolerance)
+        , m_tolerance(tolerance)
+    {
+        for (int i = 0; i < NUM_TPMS; ++i) {
+            const auto [min, max] = m_field->bounds(i);
+            m_uses_double_angles |=
+                InterpolatedTPMSKernel::uses_double_angles(i)
+                && (min != 0 || max != 0);
+        }
+    }
+
+    double operator()(double x, double y, double z) const
+    {
+        const auto [S, dS, thickness] = sample(x, y, z);
+        const double t = thickness / 2 * dS.norm();
+        return (S - t) * (S + t);
+    }
+
+    /// @brief Evaluate at a batch of points in parallel.
+    /// @param num_threads Number of threads (<= 0 uses all hardware threads)
+    Eigen::VectorXd operator()(
+        const Eigen::VectorXd& x,
+        const Eigen::VectorXd& y,
+        const Eigen::VectorXd& z,
+        const int num_threads = 0) const
+    {
+        return evaluate_batch(
+            x, y, z, num_threads,
+            [this](double x, double y, double z) { return (*this)(x, y, z); });
+    }
+
+    /// @brief First-order estimate of the signed distance to the shell
+    /// (negative inside): |S| / |∇S| - thickness / 2.
+    double distance(double x, double y, double z) const
+    {
+        const auto [S, dS, thickness] = sample(x, y, z);
+        const double norm = dS.norm();
+        if (norm == 0) {
+            return S == 0 ? -thickness / 2
+                          : std::numeric_limits<double>::infinity();
+        }
+        return std::abs(S) / norm - thickness / 2;
+    }
+
+    /// @brief Estimate the signed distance at a batch of points in parallel.
+    /// @param num_threads Number of threads (<= 0 uses all hardware threads)
+    Eigen::VectorXd distance(
+        const Eigen::VectorXd& x,
+        const Eigen::VectorXd& y,
+        const Eigen::VectorXd& z,
+        const int num_threads = 0) const
+    {
+        return evaluate_batch(
+            x, y, z, num_threads, [this](double x, double y, double z) {
+                return distance(x, y, z);
+            });
+    }
+
+    /// @brief Evaluate on the grid xs × ys × zs in parallel into out.
+    ///
+    /// The cells of the coordinates are looked up once per axis and the trig
+    /// functions are only evaluated along each axis.
+    /// @param out Values in row-major (x, y, z) order (see Implicit::eval_grid)
+    /// @param num_threads Number of threads (<= 0 uses all hardware threads)
+    template <typename T>
+    void eval_grid(
+        const Eigen::VectorXd& xs,
+        const Eigen::VectorXd& ys,
+        const Eigen::VectorXd& zs,
+        T* out,
+        const int num_threads = 0) const
+    {
+        const auto locate = [this](const Eigen::VectorXd& v, const int axis) {
+            std::vector<GridField::AxisCell> cells(v.size());
+            for (Eigen::Index i = 0; i < v.size(); ++i) {
+                cells[i] = m_field->locate(axis, v[i]);
+            }
+            return cells;
+        };
+        const auto x_cells = locate(xs, 0);
+        const auto y_cells = locate(ys, 1);
+        const auto z_cells = locate(zs, 2);
+
+        const Eigen::Index nz = zs.size();
+        const Eigen::Index plane_size = ys.size() * nz;
+        parallel_for(
+            xs.size(),
+            [&](const Eigen::Index start, const Eigen::Index end) {
+                for (Eigen::Index i = start; i < end; ++i) {
+                    for_each_grid_trig_terms(
+                        xs.data() + i, 1, ys.data(), ys.size(), zs.data(), nz,
+                        m_uses_double_angles, 1,
+                        [&](const TrigTerms& t, const Eigen::Index index) {
+                            const auto [S, dS, thickness] = sample(
+                                t, x_cells[i], y_cells[index / nz],
+                                z_cells[index % nz]);
+                            const double r = thickness / 2 * dS.norm();
+                            out[i * plane_size + index] = T((S - r) * (S + r));
+                        });
+                }
+            },
+            num_threads, /*min_chunk_size=*/1);
+    }
+
+    /// @brief Evaluate on the grid xs × ys × zs in parallel.
+    /// @param num_threads Number of threads (<= 0 uses all hardware threads)
+    /// @return Values in row-major (x, y, z) order
+    Eigen::VectorXd eval_grid(
+        const Eigen::VectorXd& xs,
+        const Eigen::VectorXd& ys,
+        const Eigen::VectorXd& zs,
+        const int num_threads = 0) const
+    {
+        Eigen::VectorXd result(xs.size() * ys.size() * zs.size());
+        eval_grid(xs, ys, zs, result.data(), num_threads);
+        return result;
+    }
+
+    /// @brief Interpolated design vector at (x, y, z).
+    Weights design(double x, double y, double z) const
+    {
+        Weights w;
+        (*m_field)(x, y, z, w.data(), nullptr, 0, NUM_TPMS);
+        return w;
+    }
+
+    /// @brief Interpolated thickness at (x, y, z).
+    double thickness_at(double x, double y, double z) const
+    {
+        double t;
+        (*m_field)(x, y, z, &t, nullptr, NUM_TPMS, 1);
+        return t;
+    }
+
+    /// @brief Blend of the primitives (without the shell) with gradients.
+    const SpatiallyVaryingTPMS& tpms() const { return m_tpms; }
+
+    /// @brief Smallest thickness (e.g., to size the elements of a mesh).
+    double thickness() const { return m_field->bounds(NUM_TPMS).first; }
+
+    const Eigen::Array3d& domain() const { return m_field->domain(); }
+    double tolerance() const { return m_tolerance; }
+
+private:
+    struct Sample {
+        double S;
+        Eigen::Vector3d dS;
+        double thickness;
+    };
+
+    static std::shared_ptr<const GridField> make_field(
+        const Eigen::VectorXd& designs,
+        const Eigen::VectorXd& thicknesses,
+        const std::array<Eigen::Index, 3>& shape,
+        const Eigen::Array3d& domain)
+    {
+        const Eigen::Index n = thicknesses.size();
+        if (designs.size() != NUM_TPMS * n) {
+            throw std::invalid_argument(
+                "designs must have shape (nx, ny, nz, 8) and thicknesses "
+                "(nx, ny, nz)");
+        }
+        // Interleave the channels: the design vector, then the thickness
+        Eigen::VectorXd values((NUM_TPMS + 1) * n);
+        for (Eigen::Index i = 0; i < n; ++i) {
+            values.segment<NUM_TPMS>((NUM_TPMS + 1) * i) =
+                designs.segment<NUM_TPMS>(NUM_TPMS * i);
+            values[(NUM_TPMS + 1) * i + NUM_TPMS] = thicknesses[i];
+        }
+        return std::make_shared<const GridField>(
+            values, shape, domain, NUM_TPMS + 1);
+    }
+
+    /// @brief Interpolate the fields in a located cell and blend.
+    /// @param t Terms of the point (with the doubled angles if needed)
+    Sample sample(
+        const TrigTerms& t,
+        const GridField::AxisCell& x,
+        const GridField::AxisCell& y,
+        const GridField::AxisCell& z) const
+    {
+        Weights w;
+        WeightsJacobian dw;
+        double thickness;
+        m_field->interpolate(x, y, z, w.data(), dw.data(), 0, NUM_TPMS);
+        m_field->interpolate(x, y, z, &thickness, nullptr, NUM_TPMS, 1);
+        const auto [S, dS] =
+            SpatiallyVaryingTPMS::blend(t, w, dw, m_tolerance);
+        return { S, dS, thickness };
+    }
+
+    Sample sample(double x, double y, double z) const
+    {
+        return sample(
+            TrigTerms(x, y, z, m_uses_double_angles), m_field->locate(0, x),
+            m_field->locate(1, y), m_field->locate(2, z));
+    }
+
+    template <typename F>
+    static Eigen::VectorXd evaluate_batch(
+        const Eigen::VectorXd& x,
+        const Eigen::VectorXd& y,
+        const Eigen::VectorXd& z,
+        const int num_threads,
+        const F& f)
+    {
+        if (y.size() != x.size() || z.size() != x.size()) {
+            throw std::invalid_argument("x, y, and z must have the same size");
+        }
+        Eigen::VectorXd result(x.size());
+        parallel_for(
+            x.size(),
+            [&](const Eigen::Index start, const Eigen::Index end) {
+                for (Eigen::Index i = start; i < end; ++i) {
+                    result(i) = f(x(i), y(i), z(i));
+                }
+            },
+            num_threads);
+        return result;
+    }
+
+    std::shared_ptr<const GridField> m_field;
+    SpatiallyVaryingTPMS m_tpms;
+    double m_tolerance;
+    bool m_uses_double_angles = false;
+};
+
+} // namespace tpms
@@ -0,0 +1,168 @@
+#pragma once
+
+#include <Eigen/Core>
+
+#include <algorithm>
+#include <array>
+#include <limits>
+#include <stdexcept>
+#include <utility>
+
+namespace tpms {
+
+/// @brief Field of one or more channels sampled on a regular grid spanning
+/// [0, domain] and interpolated trilinearly (constant outside the grid).
+///
+/// A lookup is split per axis (see locate), so points of a tensor grid can
+/// reuse the lookups of their coordinates, and the offsets of the 8 corners
+/// of a cell are precomputed.
+class GridField {
+public:
+    /// @brief Location of a coordinate in the grid along one axis.
+    struct AxisCell {
+        /// @brief Offset of the cell's first sample in the values
+        Eigen::Index offset;
+        /// @brief Position in the cell in [0, 1]
+        double t;
+        /// @brief Derivative of t with respect to the coordinate
+        double dt;
+    };
+
+    /// @param values Samples in row-major (x, y, z, channel) order
+    /// @param shape Number of samples along each axis (at least 2)
+    /// @param domain Extent of the grid
+    /// @param channels Number of channels
+    GridField(
+        const Eigen::VectorXd& values,
+        const std::array<Eigen::Index, 3>& shape,
+        const Eigen::Array3d& domain,
+        const Eigen::Index channels = 1)
+        : m_values(values)
+        , m_shape(shape)
+        , m_domain(domain)
+        , m_channels(channels)
+    {
+        if (std::any_of(shape.begin(), shape.end(), [](auto n) {
+                return n < 2;
+            })) {
+            throw std::invalid_argument("The grid needs 2 samples per axis");
+        }
+        if (values.size() != shape[0] * shape[1] * shape[2] * channels) {
+            throw std::invalid_argument(
+                "The grid values must have shape (nx, ny, nz, channels)");
+        }
+        m_strides = { shape[1] * shape[2] * channels, shape[2] * channels,
+                      channels };
+        for (int corner = 0; corner < 8; ++corner) {
+            m_corner_offsets[corner] = 0;
+            for (int a = 0; a < 3; ++a) {
+                m_corner_offsets[corner] += ((corner >> (2 - a)) & 1)
+                    * m_strides[a];
+            }
+        }
+    }
+
+    /// @brief Locate the coordinate x along an axis.
+    AxisCell locate(const int axis, const double x) const
+    {
+        const Eigen::Index n = m_shape[axis];
+        const double scale = (n - 1) / m_domain[axis];
+        const double u = x * scale;
+        if (!(u > 0)) { // Also catches NaN
+            return { 0, 0, 0 };
+        }
+        if (u >= n - 1) {
+            return { (n - 2) * m_strides[axis], 1, 0 };
+        }
+        const Eigen::Index cell = std::min(Eigen::Index(u), n - 2);
+        return { cell * m_strides[axis], u - cell, scale };
+    }
+
+    /// @brief Interpolate the channels [first, first + count) in the
+    /// located cell.
+    /// @param out Values of the channels
+    /// @param jacobian Gradients of the channels in column-major
+    /// (count × 3) order (not computed if null)
+    /// @param count Number of channels (< 0 for all channels from first)
+    void interpolate(
+        const AxisCell& x,
+        const AxisCell& y,
+        const AxisCell& z,
+        double* out,
+        double* jacobian = nullptr,
+        const Eigen::Index first = 0,
+        const Eigen::Index count = -1) const
+    {
+        const double* cell =
+            m_values.data() + x.offset + y.offset + z.offset + first;
+        const Eigen::Index n = count < 0 ? m_channels - first : count;
+        std::fill(out, out + n, 0.0);
+        if (jacobian != nullptr) {
+            std::fill(jacobian, jacobian + 3 * n, 0.0);
+        }
+        for (int corner = 0; corner < 8; ++corner) {
+            const bool bx = corner & 4, by = corner & 2, bz = corner & 1;
+            const double wx = bx ? x.t : 1 - x.t, dwx = bx ? x.dt : -x.dt;
+            const double wy = by ? y.t : 1 - y.t, dwy = by ? y.dt : -y.dt;
+            const double wz = bz ? z.t : 1 - z.t, dwz = bz ? z.dt : -z.dt;
+            const double* values = cell + m_corner_offsets[corner];
+
+            const double w = wx * wy * wz;
+            for (Eigen::Index c = 0; c < n; ++c) {
+                out[c] += w * values[c];
+            }
+            if (jacobian == nullptr) {
+                continue;
+            }
+            const double dw[3] = { dwx * wy * wz, wx * dwy * wz,
+                                   wx * wy * dwz };
+            for (int a = 0; a < 3; ++a) {
+                for (Eigen::Index c = 0; c < n; ++c) {
+                    jacobian[a * n + c] += dw[a] * values[c];
+                }
+            }
+        }
+    }
+
+    /// @brief Interpolate the channels at (x, y, z) (see interpolate).
+    void operator()(
+        const double x,
+        const double y,
+        const double z,
+        double* out,
+        double* jacobian = nullptr,
+        const Eigen::Index first = 0,
+        const Eigen::Index count = -1) const
+    {
+        interpolate(
+            locate(0, x), locate(1, y), locate(2, z), out, jacobian, first,
+            count);
+    }
+
+    /// @brief Smallest and largest values of a channel over the grid.
+    std::pair<double, double> bounds(const Eigen::Index channel) const
+    {
+        std::pair<double, double> result(
+            std::numeric_limits<double>::infinity(),
+            -std::numeric_limits<double>::infinity());
+        for (Eigen::Index i = channel; i < m_values.size(); i += m_channels) {
+            result.first = std::min(result.first, m_values[i]);
+            result.second = std::max(result.second, m_values[i]);
+        }
+        return result;
+    }
+
+    const std::array<Eigen::Index, 3>& shape() const { return m_shape; }
+    const Eigen::Array3d& domain() const { return m_domain; }
+    Eigen::Index channels() const { return m_channels; }
+
+private:
+    Eigen::VectorXd m_values;
+    std::array<Eigen::Index, 3> m_shape;
+    Eigen::Array3d m_domain;
+    Eigen::Index m_channels;
+    std::array<Eigen::Index, 3> m_strides;
+    std::array<Eigen::Index, 8> m_corner_offsets;
+};
+
+} // namespace tpms
@@ -1,23 +1,57 @@
 #pragma once
 
+#include "parallel.hpp"
+
 #include <Eigen/Core>
 
+#include <algorithm>
 #include <cmath>
 #include <functional>
+#include <stdexcept>
+#include <type_traits>
+#include <utility>
+#include <vector>
 
 namespace tpms {
 
+/// @brief N×3 row-major matrix (e.g., one gradient per row).
+using MatrixX3dR = Eigen::Matrix<double, Eigen::Dynamic, 3, Eigen::RowMajor>;
+
 class Implicit {
 protected:
     Implicit() = default;
 
 public:
+    /// @brief Kernel evaluating f at n contiguous points (x, y, z) into out.
+    using BatchFunction = std::function<void(
+        const double* x,
+        const double* y,
+        const double* z,
+        double* out,
+        Eigen::Index n)>;
+
+    /// @brief Kernel evaluating f (and ∇f if gradients is not null) on the
+    /// grid xs × ys × zs. Values (and gradients) are stored in row-major
+    /// (x, y, z[, 3]) order.
+    using GridFunction = std::function<void(
+        const double* xs,
+        Eigen::Index nx,
+        const double* ys,
+        Eigen::Index ny,
+        const double* zs,
+        Eigen::Index nz,
+        double* values,
+        double* gradients)>;
+
     Implicit(
         const std::function<double(double, double, double)>& f,
         const std::function<Eigen::Vector3d(double, double, double)>& df,
-        const Eigen::Array3d& domain)
+        const Eigen::Array3d& domain,
+        const std::function<std::pair<double, Eigen::Vector3d>(
+            double, double, double)>& fdf = nullptr)
         : f(f)
         , df(df)
+        , fdf(fdf)
         , m_domain(domain)
     {
     }
@@ -30,15 +64,32 @@ public:
         return f(x, y, z);
     }
 
+    /// @brief Evaluate at a batch of points in parallel.
+    /// @param num_threads Number of threads (<= 0 uses all hardware threads)
     Eigen::VectorXd operator()(
         const Eigen::VectorXd& x,
         const Eigen::VectorXd& y,
-        const Eigen::VectorXd& z) const
+        const Eigen::VectorXd& z,
+        const int num_threads = 0) const
     {
-        Eigen::VectorXd result(x.size());
-        for (int i = 0; i < x.size(); ++i) {
-            result(i) = (*this)(x(i), y(i), z(i));
+        if (y.size() != x.size() || z.size() != x.size()) {
+            throw std::invalid_argument("x, y, and z must have the same size");
         }
+        Eigen::VectorXd result(x.size());
+        parallel_for(
+            x.size(),
+            [&](const Eigen::Index start, const Eigen::Index end) {
+                if (f_batch != nullptr) {
+                    f_batch(
+                        x.data() + start, y.data() + start, z.data() + start,
+                        result.data() + start, end - start);
+                    return;
+                }
+                for (Eigen::Index i = start; i < end; ++i) {
+                    result(i) = (*this)(x(i), y(i), z(i));
+                }
+            },
+            num_threads);
         return result;
     }
 
@@ -50,11 +101,156 @@ public:
         return df(x, y, z);
     }
 
+    /// @brief Evaluate the value and gradient together.
+    /// Uses the fused kernel if available, otherwise evaluates f and df.
+    std::pair<double, Eigen::Vector3d>
+    value_and_gradient(double x, double y, double z) const
+    {
+        if (fdf != nullptr) {
+            return fdf(x, y, z);
+        }
+        return { (*this)(x, y, z), gradient(x, y, z) };
+    }
+
+    /// @brief Evaluate the values and gradients at a batch of points.
+    /// @param num_threads Number of threads (<= 0 uses all hardware threads)
+    /// @return (N,) values and (N, 3) gradients
+    std::pair<Eigen::VectorXd, MatrixX3dR> value_and_gradient(
+        const Eigen::VectorXd& x,
+        const Eigen::VectorXd& y,
+        const Eigen::VectorXd& z,
+        const int num_threads = 0) const
+    {
+        if (y.size() != x.size() || z.size() != x.size()) {
+            throw std::invalid_argument("x, y, and z must have the same size");
+        }
+        Eigen::VectorXd values(x.size());
+        MatrixX3dR gradients(x.size(), 3);
+        parallel_for(
+            x.size(),
+            [&](const Eigen::Index start, const Eigen::Index end) {
+                for (Eigen::Index i = start; i < end; ++i) {
+                    const auto [value, grad] =
+                        value_and_gradient(x(i), y(i), z(i));
+                    values(i) = value;
+                    gradients.row(i) = grad;
+                }
+            },
+            num_threads);
+        return { values, gradients };
+    }
+
+    /// @brief Evaluate on the grid xs × ys × zs (and the gradients if
+    /// gradients is not null) in row-major (x, y, z[, 3]) order.
+    ///
+    /// Uses the grid kernel if available, which only evaluates the trig
+    /// functions along each axis. Otherwise, evaluates point by point
+    /// without building the coordinate arrays.
+    void eval_grid(
+        const double* xs,
+        const Eigen::Index nx,
+        const double* ys,
+        const Eigen::Index ny,
+        const double* zs,
+        const Eigen::Index nz,
+        double* values,
+        double* gradients = nullptr) const
+    {
+        if (f_grid != nullptr) {
+            f_grid(xs, nx, ys, ny, zs, nz, values, gradients);
+            return;
+        }
+
+        std::vector<double> x_row, y_row;
+        if (f_batch != nullptr && gradients == nullptr) {
+            x_row.resize(nz), y_row.resize(nz);
+        }
+        for (Eigen::Index i = 0; i < nx; ++i) {
+            for (Eigen::Index j = 0; j < ny; ++j) {
+                const Eigen::Index row = (i * ny + j) * nz;
+                if (!x_row.empty()) {
+                    std::fill(x_row.begin(), x_row.end(), xs[i]);
+                    std::fill(y_row.begin(), y_row.end(), ys[j]);
+                    f_batch(
+                        x_row.data(), y_row.data(), zs, values + row, nz);
+                    continue;
+                }
+                for (Eigen::Index k = 0; k < nz; ++k) {
+                    if (gradients == nullptr) {
+                        values[row + k] = (*this)(xs[i], ys[j], zs[k]);
+                        continue;
+                    }
+                    const auto [value, grad] =
+                        value_and_gradient(xs[i], ys[j], zs[k]);
+                    values[row + k] = value;
+                    gradients[3 * (row + k) + 0] = grad.x();
+                    gradients[3 * (row + k) + 1] = grad.y();
+                    gradients[3 * (row + k) + 2] = grad.z();
+                }
+            }
+        }
+    }
+
+    /// @brief Evaluate on the grid xs × ys × zs in parallel into out.
+    ///
+    /// Values are computed in double precision and converted to T one
+    /// x-plane at a time, so no double-precision copy of the grid is made.
+    /// @param out Values in row-major (x, y, z) order
+    /// @param num_threads Number of threads (<= 0 uses all hardware threads)
+    template <typename T>
+    void eval_grid(
+        const Eigen::VectorXd& xs,
+        const Eigen::VectorXd& ys,
+        const Eigen::VectorXd& zs,
+        T* out,
+        const int num_threads = 0) const
+    {
+        const Eigen::Index plane_size = ys.size() * zs.size();
+        parallel_for(
+            xs.size(),
+            [&](const Eigen::Index start, const Eigen::Index end) {
+                if constexpr (std::is_same_v<T, double>) {
+                    eval_grid(
+                        xs.data() + start, end - start, ys.data(), ys.size(),
+                        zs.data(), zs.size(), out + start * plane_size);
+                    return;
+                }
+                std::vector<double> plane(plane_size);
+                for (Eigen::Index i = start; i < end; ++i) {
+                    eval_grid(
+                        xs.data() + i, 1, ys.data(), ys.size(), zs.data(),
+                        zs.size(), plane.data());
+                    std::copy(plane.begin(), plane.end(), out + i * plane_size);
+                }
+            },
+            num_threads, /*min_chunk_size=*/1);
+    }
+
+    /// @brief Evaluate on the grid xs × ys × zs in parallel.
+    /// @param num_threads Number of threads (<= 0 uses all hardware threads)
+    /// @return Values in row-major (x, y, z) order
+    Eigen::VectorXd eval_grid(
+        const Eigen::VectorXd& xs,
+        const Eigen::VectorXd& ys,
+        const Eigen::VectorXd& zs,
+        const int num_threads = 0) const
+    {
+        Eigen::VectorXd result(xs.size() * ys.size() * zs.size());
+        eval_grid(xs, ys, zs, result.data(), num_threads);
+        return result;
+    }
+
     const Eigen::Array3d& domain() const { return m_domain; }
 
 protected:
     std::function<double(double, double, double)> f;
     std::function<Eigen::Vector3d(double, double, double)> df;
+    std::function<std::pair<double, Eigen::Vector3d>(double, double, double)>
+        fdf;
+    /// @brief Optional batch kernel (avoids a std::function call per point)
+    BatchFunction f_batch;
+    /// @brief Optional grid kernel (see eval_grid)
+    GridFunction f_grid;
     Eigen::Array3d m_domain;
 };
 
@@ -0,0 +1,135 @@
+#pragma once
+
+#include "graded_tpms_shell.hpp"
+#include "implicit.hpp"
+#include "implicit_shell.hpp"
+#include "oracle_cache.hpp"
+
+#include <Eigen/Core>
+
+#include <algorithm>
+#include <array>
+#include <atomic>
+#include <cstdint>
+#include <functional>
+#include <memory>
+#include <optional>
+
+namespace tpms {
+
+/// @brief Implicit domain for mesh generation oracle queries.
+///
+/// Evaluates f(scale * x), optionally intersected with an axis-aligned box
+/// given in the unscaled coordinates, entirely in C++ so that CGAL does not
+/// have to run Python code per query. The number of queries is counted.
+///
+/// The values of f can be memoized in a bounded LRU cache (see
+/// OracleCache), as mesh refinement repeatedly queries the same or nearly
+/// the same points. The box is not cached, so it stays exact.
+class ImplicitDomain {
+public:
+    using Box = Eigen::Matrix<double, 2, 3, Eigen::RowMajor>;
+
+    /// @param cache_size Maximum number of cached values of f (0 disables)
+    /// @param cache_quantum Spacing of the grid of cache keys in the
+    /// unscaled coordinates (0 for exact keys)
+    ImplicitDomain(
+        const Implicit& f,
+        const Eigen::Array3d& scale,
+        const std::optional<Box>& box = std::nullopt,
+        const std::size_t cache_size = 0,
+        const double cache_quantum = 0)
+        : f([f](double x, double y, double z) { return f(x, y, z); })
+        , m_scale(scale)
+        , m_box(box)
+        , m_cache(make_cache(cache_size, cache_quantum))
+    {
+    }
+
+    /// @param cache_size Maximum number of cached values of f (0 disables)
+    /// @param cache_quantum Spacing of the grid of cache keys in the
+    /// unscaled coordinates (0 for exact keys)
+    ImplicitDomain(
+        const ImplicitShell& f,
+        const Eigen::Array3d& scale,
+        const std::optional<Box>& box = std::nullopt,
+        const std::size_t cache_size = 0,
+        const double cache_quantum = 0)
+        : f([f](double x, double y, double z) { return f(x, y, z); })
+        , m_scale(scale)
+        , m_box(box)
+        , m_cache(make_cache(cache_size, cache_quantum))
+    {
+    }
+
+    /// @param cache_size Maximum number of cached values of f (0 disables)
+    /// @param cache_quantum Spacing of the grid of cache keys in the
+    /// unscaled coordinates (0 for exact keys)
+    ImplicitDomain(
+        const GradedTPMSShell& f,
+        const Eigen::Array3d& scale,
+        const std::optional<Box>& box = std::nullopt,
+        const std::size_t cache_size = 0,
+        const double cache_quantum = 0)
+        : f([f](double x, double y, double z) { return f(x, y, z); })
+        , m_scale(scale)
+        , m_box(box)
+        , m_cache(make_cache(cache_size, cache_quantum))
+    {
+    }
+
+    double operator()(double x, double y, double z) const
+    {
+        m_evaluations.fetch_add(1, std::memory_order_relaxed);
+        const auto value_of_f = [&] {
+            return f(m_scale[0] * x, m_scale[1] * y, m_scale[2] * z);
+        };
+        const double value =
+            m_cache ? (*m_cache)(x, y, z, value_of_f) : value_of_f();
+        if (!m_box.has_value()) {
+            return value;
+        }
+        // Same expression as pygalmesh.Cuboid
+        const Box& box = *m_box;
+        return std::max(
+            { value, (x - box(0, 0)) * (x - box(1, 0)),
+              (y - box(0, 1)) * (y - box(1, 1)),
+              (z - box(0, 2)) * (z - box(1, 2)) });
+    }
+
+    double eval(const std::array<double, 3>& x) const
+    {
+        return (*this)(x[0], x[1], x[2]);
+    }
+
+    const Eigen::Array3d& scale() const { return m_scale; }
+    const std::optional<Box>& box() const { return m_box; }
+
+    /// @brief Number of evaluations since construction (or the last reset).
+    std::uint64_t evaluations() const
+    {
+        return m_evaluations.load(std::memory_order_relaxed);
+    }
+    void reset_evaluations() { m_evaluations.store(0); }
+
+    /// @brief Cache of the values of f (null if disabled).
+    const OracleCache* cache() const { return m_cache.get(); }
+
+private:
+    static std::shared_ptr<OracleCache>
+    make_cache(const std::size_t size, const double quantum)
+    {
+        if (size == 0) {
+            return nullptr;
+        }
+        return std::make_shared<OracleCache>(size, quantum);
+    }
+
+    std::function<double(double, double, double)> f;
+    Eigen::Array3d m_scale;
+    std::optional<Box> m_box;
+    std::shared_ptr<OracleCache> m_cache;
+    mutable std::atomic<std::uint64_t> m_evaluations = 0;
+};
+
+} // namespace tpms
@@ -2,6 +2,10 @@
 
 #include "implicit.hpp"
 
+#include <cmath>
+#include <limits>
+#include <vector>
+
 namespace tpms {
 
 class ImplicitShell {
@@ -14,21 +18,116 @@ public:
 
     double operator()(double x, double y, double z) const
     {
-        const double S = f(x, y, z);
-        const Eigen::Vector3d dS = f.gradient(x, y, z);
+        const auto [S, dS] = f.value_and_gradient(x, y, z);
         const double t = thickness() / 2 * dS.norm();
         return (S - t) * (S + t);
     }
 
+    /// @brief Evaluate at a batch of points in parallel.
+    /// @param num_threads Number of threads (<= 0 uses all hardware threads)
     Eigen::VectorXd operator()(
         const Eigen::VectorXd& x,
         const Eigen::VectorXd& y,
-        const Eigen::VectorXd& z) const
+        const Eigen::VectorXd& z,
+        const int num_threads = 0) const
     {
+        if (y.size() != x.size() || z.size() != x.size()) {
+            throw std::invalid_argument("x, y, and z must have the same size");
+        }
         Eigen::VectorXd result(x.size());
-        for (int i = 0; i < x.size(); ++i) {
-            result(i) = (*this)(x(i), y(i), z(i));
+        parallel_for(
+            x.size(),
+            [&](const Eigen::Index start, const Eigen::Index end) {
+                for (Eigen::Index i = start; i < end; ++i) {
+                    result(i) = (*this)(x(i), y(i), z(i));
+                }
+            },
+            num_threads);
+        return result;
+    }
+
+    /// @brief First-order estimate of the signed distance to the shell
+    /// (negative inside): |S| / |∇S| - thickness / 2.
+    double distance(double x, double y, double z) const
+    {
+        const auto [S, dS] = f.value_and_gradient(x, y, z);
+        const double norm = dS.norm();
+        if (norm == 0) {
+            return S == 0 ? -thickness() / 2
+                          : std::numeric_limits<double>::infinity();
+        }
+        return std::abs(S) / norm - thickness() / 2;
+    }
+
+    /// @brief Estimate the signed distance at a batch of points in parallel.
+    /// @param num_threads Number of threads (<= 0 uses all hardware threads)
+    Eigen::VectorXd distance(
+        const Eigen::VectorXd& x,
+        const Eigen::VectorXd& y,
+        const Eigen::VectorXd& z,
+        const int num_threads = 0) const
+    {
+        if (y.size() != x.size() || z.size() != x.size()) {
+            throw std::invalid_argument("x, y, and z must have the same size");
         }
+        Eigen::VectorXd result(x.size());
+        parallel_for(
+            x.size(),
+            [&](const Eigen::Index start, const Eigen::Index end) {
+                for (Eigen::Index i = start; i < end; ++i) {
+                    result(i) = distance(x(i), y(i), z(i));
+                }
+            },
+            num_threads);
+        return result;
+    }
+
+    /// @brief Evaluate on the grid xs × ys × zs in parallel into out.
+    /// @param out Values in row-major (x, y, z) order (see Implicit::eval_grid)
+    /// @param num_threads Number of threads (<= 0 uses all hardware threads)
+    template <typename T>
+    void eval_grid(
+        const Eigen::VectorXd& xs,
+        const Eigen::VectorXd& ys,
+        const Eigen::VectorXd& zs,
+        T* out,
+        const int num_threads = 0) const
+    {
+        const Eigen::Index plane_size = ys.size() * zs.size();
+        parallel_for(
+            xs.size(),
+            [&](const Eigen::Index start, const Eigen::Index end) {
+                // One x-plane of values and gradients at a time
+                std::vector<double> values(plane_size);
+                std::vector<double> gradients(3 * plane_size);
+                for (Eigen::Index i = start; i < end; ++i) {
+                    f.eval_grid(
+                        xs.data() + i, 1, ys.data(), ys.size(), zs.data(),
+                        zs.size(), values.data(), gradients.data());
+                    for (Eigen::Index j = 0; j < plane_size; ++j) {
+                        const double t = thickness() / 2
+                            * Eigen::Map<const Eigen::Vector3d>(
+                                  gradients.data() + 3 * j)
+                                  .norm();
+                        out[i * plane_size + j] =
+                            T((values[j] - t) * (values[j] + t));
+                    }
+                }
+            },
+            num_threads, /*min_chunk_size=*/1);
+    }
+
+    /// @brief Evaluate on the grid xs × ys × zs in parallel.
+    /// @param num_threads Number of threads (<= 0 uses all hardware threads)
+    /// @return Values in row-major (x, y, z) order
+    Eigen::VectorXd eval_grid(
+        const Eigen::VectorXd& xs,
+        const Eigen::VectorXd& ys,
+        const Eigen::VectorXd& zs,
+        const int num_threads = 0) const
+    {
+        Eigen::VectorXd result(xs.size() * ys.size() * zs.size());
+        eval_grid(xs, ys, zs, result.data(), num_threads);
         return result;
     }
 
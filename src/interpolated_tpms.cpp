@@ -2,67 +2,271 @@
 
 #include "tpms.hpp"
 #include "tpms_gradient.hpp"
+#include "tpms_batch.hpp"
 
 #include <cassert>
+#include <cmath>
 #include <iostream>
 
 namespace tpms {
 
 const std::vector<Implicit> InterpolatedTPMS::TPMSs = { {
-    Implicit(schoen_gyroid, schoen_gyroid_gradient, TPMS_DOMAIN),
-    Implicit(schwarz_diamond, schwarz_diamond_gradient, TPMS_DOMAIN),
-    Implicit(schwarz_primitive, schwarz_primitive_gradient, TPMS_DOMAIN),
-    Implicit(schoen_iwp, schoen_iwp_gradient, TPMS_DOMAIN),
-    Implicit(neovius, neovius_gradient, TPMS_DOMAIN),
-    Implicit(fischer_koch_s, fischer_koch_s_gradient, TPMS_DOMAIN),
-    Implicit(schoen_frd, schoen_frd_gradient, TPMS_DOMAIN),
-    Implicit(PMY, PMY_gradient, TPMS_DOMAIN),
+    Implicit(
+        schoen_gyroid,
+        schoen_gyroid_gradient,
+        TPMS_DOMAIN,
+        schoen_gyroid_value_and_gradient),
+    Implicit(
+        schwarz_diamond,
+        schwarz_diamond_gradient,
+        TPMS_DOMAIN,
+        schwarz_diamond_value_and_gradient),
+    Implicit(
+        schwarz_primitive,
+        schwarz_primitive_gradient,
+        TPMS_DOMAIN,
+        schwarz_primitive_value_and_gradient),
+    Implicit(
+        schoen_iwp,
+        schoen_iwp_gradient,
+        TPMS_DOMAIN,
+        schoen_iwp_value_and_gradient),
+    Implicit(
+        neovius,
+        neovius_gradient,
+        TPMS_DOMAIN,
+        neovius_value_and_gradient),
+    Implicit(
+        fischer_koch_s,
+        fischer_koch_s_gradient,
+        TPMS_DOMAIN,
+        fischer_koch_s_value_and_gradient),
+    Implicit(
+        schoen_frd,
+        schoen_frd_gradient,
+        TPMS_DOMAIN,
+        schoen_frd_value_and_gradient),
+    Implicit(
+        PMY,
+        PMY_gradient,
+        TPMS_DOMAIN,
+        PMY_value_and_gradient),
 } };
 
-InterpolatedTPMS::InterpolatedTPMS(const Eigen::ArrayXd& params) : Implicit()
+namespace {
+    /// @brief Value of the primitive TPMSs[id] (see tpms.hpp).
+    inline double tpms_value(const int id, const TrigTerms& t)
+    {
+        switch (id) {
+        case 0: // schoen_gyroid
+            return t.sx * t.cy + t.sy * t.cz + t.sz * t.cx;
+        case 1: // schwarz_diamond
+            return t.cx * t.cy * t.cz - t.sx * t.sy * t.sz;
+        case 2: // schwarz_primitive
+            return t.cx + t.cy + t.cz;
+        case 3: // schoen_iwp
+            return 2 * (t.cx * t.cy + t.cy * t.cz + t.cz * t.cx)
+                - (t.c2x + t.c2y + t.c2z);
+        case 4: // neovius
+            return 3 * (t.cx + t.cy + t.cz) + 4 * t.cx * t.cy * t.cz;
+        case 5: // fischer_koch_s
+            return t.c2x * t.sy * t.cz + t.cx * t.c2y * t.sz
+                + t.sx * t.cy * t.c2z;
+        case 6: // schoen_frd
+            return 4 * t.cx * t.cy * t.cz
+                - (t.c2x * t.c2y + t.c2y * t.c2z + t.c2z * t.c2x);
+        case 7: // PMY
+            return 2 * t.cx * t.cy * t.cz + t.s2x * t.sy + t.sx * t.s2z
+                + t.s2y * t.sz;
+        default:
+            return 0;
+        }
+    }
+
+    /// @brief Gradient of the primitive TPMSs[id] (see tpms_gradient.hpp).
+    inline Eigen::Vector3d tpms_gradient(const int id, const TrigTerms& t)
+    {
+        switch (id) {
+        case 0: // schoen_gyroid
+            return Eigen::Vector3d(
+                t.cx * t.cy - t.sx * t.sz, t.cy * t.cz - t.sx * t.sy,
+                t.cx * t.cz - t.sy * t.sz);
+        case 1: // schwarz_diamond
+            return Eigen::Vector3d(
+                -t.sx * t.cy * t.cz - t.cx * t.sy * t.sz,
+                -t.cx * t.sy * t.cz - t.sx * t.cy * t.sz,
+                -t.cx * t.cy * t.sz - t.sx * t.sy * t.cz);
+        case 2: // schwarz_primitive
+            return Eigen::Vector3d(-t.sx, -t.sy, -t.sz);
+        case 3: // schoen_iwp
+            return Eigen::Vector3d(
+                -2 * t.sx * (t.cy + t.cz) + 2 * t.s2x,
+                -2 * t.sy * (t.cz + t.cx) + 2 * t.s2y,
+                -2 * t.sz * (t.cx + t.cy) + 2 * t.s2z);
+        case 4: // neovius
+            return Eigen::Vector3d(
+                -(4 * t.cy * t.cz + 3) * t.sx, -(4 * t.cz * t.cx + 3) * t.sy,
+                -(4 * t.cx * t.cy + 3) * t.sz);
+        case 5: // fischer_koch_s
+            return Eigen::Vector3d(
+                -2 * t.s2x * t.sy * t.cz - t.sx * t.c2y * t.sz
+                    + t.cx * t.cy * t.c2z,
+                t.c2x * t.cy * t.cz - 2 * t.cx * t.s2y * t.sz
+                    - t.sx * t.sy * t.c2z,
+                -t.c2x * t.sy * t.sz + t.cx * t.c2y * t.cz
+                    - 2 * t.sx * t.cy * t.s2z);
+        case 6: // schoen_frd
+            return Eigen::Vector3d(
+                -4 * t.sx * t.cy * t.cz + 2 * t.s2x * (t.c2y + t.c2z),
+                -4 * t.cx * t.sy * t.cz + 2 * t.s2y * (t.c2z + t.c2x),
+                -4 * t.cx * t.cy * t.sz + 2 * t.s2z * (t.c2x + t.c2y));
+        case 7: // PMY
+            return Eigen::Vector3d(
+                -2 * t.sx * t.cy * t.cz + 2 * t.c2x * t.sy + t.cx * t.s2z,
+                -2 * t.cx * t.sy * t.cz + t.s2x * t.cy + 2 * t.c2y * t.sz,
+                -2 * t.cx * t.cy * t.sz + 2 * t.sx * t.c2z + t.s2y * t.cz);
+        default:
+            return Eigen::Vector3d::Zero();
+        }
+    }
+} // namespace
+
+double InterpolatedTPMSKernel::primitive(const int id, const TrigTerms& t)
 {
-    assert(params.size() == TPMSs.size());
-    assert((0 <= params).all() && (params <= 1).all());
-    assert(std::abs(params.sum() - 1.0) < 1e-10);
+    return tpms_value(id, t);
+}
 
-    std::vector<size_t> nonzero_indices;
-    for (size_t i = 0; i < params.size(); ++i) {
+Eigen::Vector3d
+InterpolatedTPMSKernel::primitive_gradient(const int id, const TrigTerms& t)
+{
+    return tpms_gradient(id, t);
+}
+
+InterpolatedTPMSKernel::InterpolatedTPMSKernel(const Eigen::ArrayXd& params)
+{
+    assert(params.size() == NUM_TPMS);
+    for (int i = 0; i < params.size() && i < NUM_TPMS; ++i) {
         if (params[i] != 0) {
-            nonzero_indices.push_back(i);
+            m_weights[m_size] = params[i];
+            m_ids[m_size] = i;
+            m_uses_double_angles |= uses_double_angles(i);
+            ++m_size;
         }
     }
+}
 
-    std::vector<double> _params;
-    std::vector<Implicit> _tpms;
+double InterpolatedTPMSKernel::operator()(double x, double y, double z) const
+{
+    const TrigTerms t(x, y, z, m_uses_double_angles);
+    double result = 0.0;
+    for (int i = 0; i < m_size; ++i) {
+        result += m_weights[i] * tpms_value(m_ids[i], t);
+    }
+    return result;
+}
+
+std::pair<double, Eigen::Vector3d>
+InterpolatedTPMSKernel::value_and_gradient(double x, double y, double z) const
+{
+    const TrigTerms t(x, y, z, m_uses_double_angles);
+    std::pair<double, Eigen::Vector3d> result(0.0, Eigen::Vector3d::Zero());
+    for (int i = 0; i < m_size; ++i) {
+        result.first += m_weights[i] * tpms_value(m_ids[i], t);
+        result.second += m_weights[i] * tpms_gradient(m_ids[i], t);
+    }
+    return result;
+}
 
-    _params.reserve(nonzero_indices.size());
-    _tpms.reserve(nonzero_indices.size());
+void InterpolatedTPMSKernel::operator()(
+    const double* x,
+    const double* y,
+    const double* z,
+    double* out,
+    Eigen::Index n) const
+{
+    for_each_trig_terms(
+        x, y, z, n, m_uses_double_angles, 1,
+        [&](const TrigTerms& t, const Eigen::Index i) {
+            double result = 0.0;
+            for (int j = 0; j < m_size; ++j) {
+                result += m_weights[j] * tpms_value(m_ids[j], t);
+            }
+            out[i] = result;
+        });
+}
 
-    for (size_t i : nonzero_indices) {
-        _params.push_back(params[i]);
-        _tpms.push_back(TPMSs[i]);
+void InterpolatedTPMSKernel::grid(
+    const double* xs,
+    Eigen::Index nx,
+    const double* ys,
+    Eigen::Index ny,
+    const double* zs,
+    Eigen::Index nz,
+    double* values,
+    double* gradients) const
+{
+    if (gradients == nullptr) {
+        for_each_grid_trig_terms(
+            xs, nx, ys, ny, zs, nz, m_uses_double_angles, 1,
+            [&](const TrigTerms& t, const Eigen::Index i) {
+                double result = 0.0;
+                for (int j = 0; j < m_size; ++j) {
+                    result += m_weights[j] * tpms_value(m_ids[j], t);
+                }
+                values[i] = result;
+            });
+        return;
     }
 
-    this->f = [_params, _tpms](double x, double y, double z) {
-        double result = 0.0;
-        for (size_t i = 0; i < _params.size(); ++i) {
-            result += _params[i] * _tpms[i](x, y, z);
-        }
-        return result;
+    for_each_grid_trig_terms(
+        xs, nx, ys, ny, zs, nz, m_uses_double_angles, 1,
+        [&](const TrigTerms& t, const Eigen::Index i) {
+            double value = 0.0;
+            Eigen::Vector3d grad = Eigen::Vector3d::Zero();
+            for (int j = 0; j < m_size; ++j) {
+                value += m_weights[j] * tpms_value(m_ids[j], t);
+                grad += m_weights[j] * tpms_gradient(m_ids[j], t);
+            }
+            values[i] = value;
+            Eigen::Map<Eigen::Vector3d>(gradients + 3 * i) = grad;
+        });
+}
+
+InterpolatedTPMS::InterpolatedTPMS(const Eigen::ArrayXd& params) : Implicit()
+{
+    assert(params.size() == TPMSs.size());
+    assert((0 <= params).all() && (params <= 1).all());
+    assert(std::abs(params.sum() - 1.0) < 1e-10);
+
+    const InterpolatedTPMSKernel kernel(params);
+
+    this->f = [kernel](double x, double y, double z) {
+        return kernel(x, y, z);
     };
 
-    this->df = [_params, _tpms](double x, double y, double z) {
-        Eigen::Vector3d result = Eigen::Vector3d::Zero();
-        for (size_t i = 0; i < _params.size(); ++i) {
-            result += _params[i] * _tpms[i].gradient(x, y, z);
-        }
-        return result;
+    this->df = [kernel](double x, double y, double z) {
+        return kernel.value_and_gradient(x, y, z).second;
     };
 
-    this->m_domain = Eigen::Array3d::Zero();
-    for (const Implicit& tpms : _tpms) {
-        this->m_domain = this->m_domain.max(tpms.domain());
-    }
+    this->fdf = [kernel](double x, double y, double z) {
+        return kernel.value_and_gradient(x, y, z);
+    };
+
+    this->f_batch = [kernel](
+                        const double* x, const double* y, const double* z,
+                        double* out, Eigen::Index n) {
+        kernel(x, y, z, out, n);
+    };
+
+    this->f_grid = [kernel](
+                       const double* xs, Eigen::Index nx, const double* ys,
+                       Eigen::Index ny, const double* zs, Eigen::Index nz,
+                       double* values, double* gradients) {
+        kernel.grid(xs, nx, ys, ny, zs, nz, values, gradients);
+    };
+
+    // All primitives share the same domain
+    this->m_domain = TPMS_DOMAIN;
 }
 
 } // namespace tpms
\ No newline at end of file
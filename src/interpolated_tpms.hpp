@@ -4,10 +4,66 @@
 
 #include <Eigen/Core>
 
+#include <array>
+#include <utility>
 #include <vector>
 
 namespace tpms {
 
+struct TrigTerms;
+
+/// @brief Weighted sum of the TPMS primitives evaluated with shared terms.
+///
+/// The active weights and primitive IDs are stored in flat arrays, and the
+/// primitives are evaluated through a switch from sin/cos of x, y, z, 2x, 2y,
+/// and 2z computed once per point.
+class InterpolatedTPMSKernel {
+public:
+    /// @brief Number of TPMS primitives that can be interpolated.
+    static constexpr int NUM_TPMS = 8;
+
+    explicit InterpolatedTPMSKernel(const Eigen::ArrayXd& params);
+
+    /// @brief Value of the primitive TPMSs[id] from the shared terms.
+    static double primitive(int id, const TrigTerms& t);
+
+    /// @brief Gradient of the primitive TPMSs[id] from the shared terms.
+    static Eigen::Vector3d primitive_gradient(int id, const TrigTerms& t);
+
+    /// @brief Whether the primitive uses sin/cos of 2x, 2y, or 2z.
+    static bool uses_double_angles(int id) { return id == 3 || id >= 5; }
+
+    double operator()(double x, double y, double z) const;
+
+    std::pair<double, Eigen::Vector3d>
+    value_and_gradient(double x, double y, double z) const;
+
+    /// @brief Evaluate at n contiguous points.
+    void operator()(
+        const double* x,
+        const double* y,
+        const double* z,
+        double* out,
+        Eigen::Index n) const;
+
+    /// @brief Evaluate on the grid xs × ys × zs (see Implicit::eval_grid).
+    void grid(
+        const double* xs,
+        Eigen::Index nx,
+        const double* ys,
+        Eigen::Index ny,
+        const double* zs,
+        Eigen::Index nz,
+        double* values,
+        double* gradients) const;
+
+private:
+    std::array<double, NUM_TPMS> m_weights;
+    std::array<int, NUM_TPMS> m_ids;
+    int m_size = 0;
+    bool m_uses_double_angles = false;
+};
+
 class InterpolatedTPMS : public Implicit {
 public:
     InterpolatedTPMS(const Eigen::ArrayXd& params);
@@ -0,0 +1,118 @@
+#pragma once
+
+#include <array>
+#include <cmath>
+#include <cstdint>
+#include <cstring>
+#include <list>
+#include <mutex>
+#include <unordered_map>
+#include <utility>
+
+namespace tpms {
+
+/// @brief Bounded LRU cache of the values of a function of 3D points.
+///
+/// Points are keyed exactly (by their bits) or, if quantum > 0, by the cell
+/// of the grid of spacing quantum they fall in. With quantized keys, every
+/// point of a cell gets the value at the first point of the cell that was
+/// queried.
+class OracleCache {
+public:
+    /// @param capacity Maximum number of cached values
+    /// @param quantum Spacing of the key grid (0 for exact keys)
+    explicit OracleCache(std::size_t capacity, double quantum = 0)
+        : m_capacity(capacity)
+        , m_quantum(quantum)
+    {
+        m_index.reserve(capacity);
+    }
+
+    /// @brief Value at (x, y, z), computed by f() on a miss.
+    template <typename F> double operator()(double x, double y, double z, F&& f)
+    {
+        const Key k = key(x, y, z);
+        {
+            std::lock_guard<std::mutex> lock(m_mutex);
+            const auto it = m_index.find(k);
+            if (it != m_index.end()) {
+                // Move to the front (most recently used)
+                m_lru.splice(m_lru.begin(), m_lru, it->second);
+                ++m_hits;
+                return it->second->second;
+            }
+            ++m_misses;
+        }
+
+        const double value = f(); // Evaluate without holding the lock
+
+        std::lock_guard<std::mutex> lock(m_mutex);
+        if (m_capacity == 0 || m_index.count(k)) {
+            return value;
+        }
+        if (m_index.size() >= m_capacity) {
+            m_index.erase(m_lru.back().first);
+            m_lru.pop_back();
+            ++m_evictions;
+        }
+        m_lru.emplace_front(k, value);
+        m_index.emplace(k, m_lru.begin());
+        return value;
+    }
+
+    void clear()
+    {
+        std::lock_guard<std::mutex> lock(m_mutex);
+        m_lru.clear();
+        m_index.clear();
+        m_hits = m_misses = m_evictions = 0;
+    }
+
+    std::size_t capacity() const { return m_capacity; }
+    double quantum() const { return m_quantum; }
+    std::size_t size() const { return m_index.size(); }
+    std::uint64_t hits() const { return m_hits; }
+    std::uint64_t misses() const { return m_misses; }
+    std::uint64_t evictions() const { return m_evictions; }
+
+private:
+    using Key = std::array<std::int64_t, 3>;
+
+    struct KeyHash {
+        std::size_t operator()(const Key& k) const
+        {
+            std::uint64_t h = 0;
+            for (const std::int64_t v : k) {
+                h ^= std::uint64_t(v) + 0x9e3779b97f4a7c15ULL + (h << 6)
+                    + (h >> 2);
+            }
+            return std::size_t(h);
+        }
+    };
+
+    Key key(double x, double y, double z) const
+    {
+        Key k;
+        const double p[3] = { x, y, z };
+        for (int i = 0; i < 3; ++i) {
+            if (m_quantum > 0) {
+                k[i] = std::int64_t(std::floor(p[i] / m_quantum));
+            } else {
+                std::memcpy(&k[i], &p[i], sizeof(double));
+            }
+        }
+        return k;
+    }
+
+    std::size_t m_capacity;
+    double m_quantum;
+    std::list<std::pair<Key, double>> m_lru;
+    std::unordered_map<Key, std::list<std::pair<Key, double>>::iterator, KeyHash>
+        m_index;
+    std::uint64_t m_hits = 0;
+    std::uint64_t m_misses = 0;
+    std::uint64_t m_evictions = 0;
+    std::mutex m_mutex;
+};
+
+} // namespace tpms
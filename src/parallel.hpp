@@ -0,0 +1,93 @@
+#pragma once
+
+#include <Eigen/Core>
+
+#include <algorithm>
+#include <atomic>
+#include <exception>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+namespace tpms {
+
+/// @brief Minimum number of items assigned to a single thread.
+static constexpr Eigen::Index PARALLEL_MIN_CHUNK_SIZE = 1024;
+
+/// @brief Resolve a requested thread count.
+/// @param num_threads Requested number of threads (<= 0 uses all threads).
+/// @return Number of threads to use (at least one).
+inline int get_num_threads(const int num_threads)
+{
+    if (num_threads > 0) {
+        return num_threads;
+    }
+    return std::max(1u, std::thread::hardware_concurrency());
+}
+
+/// @brief Evaluate f(start, end) over [0, n) split into contiguous chunks.
+///
+/// Each index is processed exactly once by the same code as the serial loop,
+/// so results are identical regardless of the number of threads. The first
+/// exception thrown by any chunk is rethrown on the calling thread.
+///
+/// @param n Number of items.
+/// @param f Function processing the half-open range [start, end).
+/// @param num_threads Number of threads (<= 0 uses all hardware threads).
+/// @param min_chunk_size Minimum number of items assigned to a single thread.
+template <typename Function>
+void parallel_for(
+    const Eigen::Index n,
+    const Function& f,
+    const int num_threads = 0,
+    const Eigen::Index min_chunk_size = PARALLEL_MIN_CHUNK_SIZE)
+{
+    if (n <= 0) {
+        return;
+    }
+
+    const Eigen::Index max_chunks = std::max<Eigen::Index>(
+        1, (n + min_chunk_size - 1) / min_chunk_size);
+    const Eigen::Index n_chunks = std::min<Eigen::Index>(
+        get_num_threads(num_threads), max_chunks);
+
+    if (n_chunks == 1) {
+        f(Eigen::Index(0), n);
+        return;
+    }
+
+    std::exception_ptr exception = nullptr;
+    std::mutex exception_mutex;
+    std::atomic<bool> failed(false);
+
+    const auto run_chunk = [&](const Eigen::Index chunk) {
+        if (failed) {
+            return;
+        }
+        try {
+            f(chunk * n / n_chunks, (chunk + 1) * n / n_chunks);
+        } catch (...) {
+            std::lock_guard<std::mutex> lock(exception_mutex);
+            if (!exception) {
+                exception = std::current_exception();
+            }
+            failed = true;
+        }
+    };
+
+    std::vector<std::thread> threads;
+    threads.reserve(n_chunks - 1);
+    for (Eigen::Index chunk = 1; chunk < n_chunks; ++chunk) {
+        threads.emplace_back(run_chunk, chunk);
+    }
+    run_chunk(0); // Use the calling thread for the first chunk
+    for (std::thread& thread : threads) {
+        thread.join();
+    }
+
+    if (exception) {
+        std::rethrow_exception(exception);
+    }
+}
+
+} // namespace tpms
@@ -0,0 +1,75 @@
+#include "primitive_tpms.hpp"
+
+#include "tpms.hpp"
+#include "tpms_gradient.hpp"
+#include "tpms_batch.hpp"
+
+#include <algorithm>
+#include <stdexcept>
+
+namespace tpms {
+
+namespace {
+    struct Primitive {
+        const char* name;
+        double (*f)(double, double, double);
+        Eigen::Vector3d (*df)(double, double, double);
+        std::pair<double, Eigen::Vector3d> (*fdf)(double, double, double);
+        void (*f_batch)(
+            const double*, const double*, const double*, double*,
+            Eigen::Index);
+        /// @brief Period in multiples of TPMS_DOMAIN
+        double period;
+    };
+
+#define TPMS_PRIMITIVE(NAME, PERIOD)                                           \
+    { #NAME, NAME, NAME##_gradient, NAME##_value_and_gradient, batch::NAME,    \
+      PERIOD }
+
+    const Primitive PRIMITIVES[] = {
+        TPMS_PRIMITIVE(schoen_gyroid, 1),
+        TPMS_PRIMITIVE(double_schoen_gyroid, 1),
+        TPMS_PRIMITIVE(schwarz_diamond, 1),
+        TPMS_PRIMITIVE(double_swartz_diamond, 1),
+        TPMS_PRIMITIVE(schwarz_primitive, 1),
+        TPMS_PRIMITIVE(double_schwarz_primitive, 1),
+        TPMS_PRIMITIVE(schoen_iwp, 1),
+        TPMS_PRIMITIVE(lipnoid, 1),
+        TPMS_PRIMITIVE(neovius, 1),
+        TPMS_PRIMITIVE(fischer_koch_s, 1),
+        TPMS_PRIMITIVE(schoen_frd, 1),
+        TPMS_PRIMITIVE(PMY, 1),
+        TPMS_PRIMITIVE(tubular_G_AB, 1),
+        TPMS_PRIMITIVE(tubular_G_C, 1),
+        TPMS_PRIMITIVE(BCC, 2), // cos(x / 2) has period 4π
+    };
+
+#undef TPMS_PRIMITIVE
+} // namespace
+
+const std::vector<std::string> PrimitiveTPMS::NAMES = [] {
+    std::vector<std::string> names;
+    for (const Primitive& primitive : PRIMITIVES) {
+        names.emplace_back(primitive.name);
+    }
+    return names;
+}();
+
+PrimitiveTPMS::PrimitiveTPMS(const std::string& name)
+    : Implicit()
+    , m_name(name)
+{
+    const auto it = std::find_if(
+        std::begin(PRIMITIVES), std::end(PRIMITIVES),
+        [&](const Primitive& p) { return name == p.name; });
+    if (it == std::end(PRIMITIVES)) {
+        throw std::invalid_argument("Unknown TPMS primitive: " + name);
+    }
+    this->f = it->f;
+    this->df = it->df;
+    this->fdf = it->fdf;
+    this->f_batch = it->f_batch;
+    this->m_domain = it->period * TPMS_DOMAIN;
+}
+
+} // namespace tpms
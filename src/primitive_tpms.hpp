@@ -0,0 +1,26 @@
+#pragma once
+
+#include "implicit.hpp"
+
+#include <string>
+#include <vector>
+
+namespace tpms {
+
+/// @brief One of the TPMS primitives of tpms.hpp as an implicit, with its
+/// analytic gradient, fused value and gradient, and batch kernel.
+class PrimitiveTPMS : public Implicit {
+public:
+    /// @param name Name of the primitive (one of NAMES)
+    explicit PrimitiveTPMS(const std::string& name);
+
+    /// @brief Names of the primitives
+    static const std::vector<std::string> NAMES;
+
+    const std::string& name() const { return m_name; }
+
+private:
+    std::string m_name;
+};
+
+} // namespace tpms
@@ -1,11 +1,11 @@
 #include "spatially_varying_tpms.hpp"
 
 #include "tpms.hpp"
-#include "tpms_gradient.hpp"
-#include "interpolated_tpms.hpp"
+#include "tpms_batch.hpp"
 
-#include <cassert>
-#include <iostream>
+#include <algorithm>
+#include <cmath>
+#include <stdexcept>
 
 namespace tpms {
 
@@ -15,57 +15,186 @@ namespace {
         return 1 / (1 + std::exp(-f * x));
     }
 
-    double sigmoid_gradient(const double x, const double f = 1)
+    /// @brief Sign (±1) of the blend of primitive i along axis (bit 2 - axis).
+    double corner_sign(const int i, const int axis)
     {
-        double s = sigmoid(x, f);
-        return f * s * (1 - s);
+        return ((i >> (2 - axis)) & 1) ? 1 : -1;
     }
 } // namespace
 
-SpatiallyVaryingTPMS::SpatiallyVaryingTPMS() : Implicit()
+SpatiallyVaryingTPMS::SpatiallyVaryingTPMS(
+    const double sharpness,
+    const Eigen::Vector3d& center,
+    const double tolerance)
+    : Implicit()
+    , m_tolerance(tolerance)
 {
     this->m_domain = 4 * TPMS_DOMAIN;
-    const double dx = 0; // this->m_domain[0] / 2;
-    const double dy = 0; // this->m_domain[1] / 2;
-    const double dz = 0; // this->m_domain[2] / 2;
-
-    this->f = [dx, dy, dz](double x, double y, double z) {
-        double r = 0;
-        for (int i = 0; i < 8; ++i) {
-            r += sigmoid((2 * ((4 & i) >> 2) - 1) * (x - dx))
-                * sigmoid((2 * ((2 & i) >> 1) - 1) * (y - dy))
-                * sigmoid((2 * ((1 & i) >> 0) - 1) * (z - dz))
-                * InterpolatedTPMS::TPMSs[i](x, y, z);
+
+    init([sharpness, center](
+             double x, double y, double z, Weights& w, WeightsJacobian* dw) {
+        // One sigmoid per axis, as σ(-t) = 1 - σ(t) and σ' = k σ (1 - σ)
+        const Eigen::Vector3d p(x, y, z);
+        double s[3], ds[3];
+        for (int a = 0; a < 3; ++a) {
+            s[a] = sigmoid(p[a] - center[a], sharpness);
+            ds[a] = sharpness * s[a] * (1 - s[a]);
         }
-        return r;
-    };
 
-    this->df = [dx, dy, dz](double x, double y, double z) {
-        Eigen::Vector3d r = Eigen::Vector3d::Zero();
-        for (int i = 0; i < 8; ++i) {
-            const double sigmoid_x =
-                sigmoid((2 * ((4 & i) >> 2) - 1) * (x - dx));
-            const double sigmoid_y =
-                sigmoid((2 * ((2 & i) >> 1) - 1) * (y - dy));
-            const double sigmoid_z =
-                sigmoid((2 * ((1 & i) >> 0) - 1) * (z - dz));
-
-            const double f = InterpolatedTPMS::TPMSs[i](x, y, z);
-            const Eigen::Vector3d grad_f =
-                InterpolatedTPMS::TPMSs[i].gradient(x, y, z);
-
-            r += sigmoid_x * sigmoid_y * sigmoid_z * grad_f
-                + sigmoid_gradient((2 * ((4 & i) >> 2) - 1) * (x - dx))
-                    * sigmoid_y * sigmoid_z * f * Eigen::Vector3d::UnitX()
-                + sigmoid_x
-                    * sigmoid_gradient((2 * ((2 & i) >> 1) - 1) * (y - dy))
-                    * sigmoid_z * f * Eigen::Vector3d::UnitY()
-                + sigmoid_x * sigmoid_y
-                    * sigmoid_gradient((2 * ((1 & i) >> 0) - 1) * (z - dz)) * f
-                    * Eigen::Vector3d::UnitZ();
+        for (int i = 0; i < NUM_TPMS; ++i) {
+            double s_i[3], ds_i[3];
+            for (int a = 0; a < 3; ++a) {
+                const double sign = corner_sign(i, a);
+                s_i[a] = sign > 0 ? s[a] : 1 - s[a];
+                ds_i[a] = sign * ds[a]; // Chain rule of σ(±k (p - c))
+            }
+            w[i] = s_i[0] * s_i[1] * s_i[2];
+            if (dw != nullptr) {
+                dw->row(i) << ds_i[0] * s_i[1] * s_i[2],
+                    s_i[0] * ds_i[1] * s_i[2], s_i[0] * s_i[1] * ds_i[2];
+            }
+        }
+    });
+}
+
+SpatiallyVaryingTPMS::SpatiallyVaryingTPMS(
+    const Eigen::VectorXd& weights,
+    const std::array<Eigen::Index, 3>& shape,
+    const Eigen::Array3d& domain,
+    const double tolerance)
+    : SpatiallyVaryingTPMS(
+          std::make_shared<const GridField>(weights, shape, domain, NUM_TPMS),
+          tolerance)
+{
+}
+
+SpatiallyVaryingTPMS::SpatiallyVaryingTPMS(
+    std::shared_ptr<const GridField> weights, const double tolerance)
+    : Implicit()
+    , m_tolerance(tolerance)
+{
+    if (weights->channels() < NUM_TPMS) {
+        throw std::invalid_argument("The weight grid needs 8 channels");
+    }
+    this->m_domain = weights->domain();
+
+    init([weights](
+             double x, double y, double z, Weights& w, WeightsJacobian* dw) {
+        (*weights)(
+            x, y, z, w.data(), dw != nullptr ? dw->data() : nullptr, 0,
+            NUM_TPMS);
+    });
+}
+
+SpatiallyVaryingTPMS::SpatiallyVaryingTPMS(
+    const WeightFunction& weights,
+    const Eigen::Array3d& domain,
+    const double tolerance)
+    : Implicit()
+    , m_tolerance(tolerance)
+{
+    this->m_domain = domain;
+    const double h = 1e-6 * domain.maxCoeff();
+
+    init([weights, h](
+             double x, double y, double z, Weights& w, WeightsJacobian* dw) {
+        w = weights(x, y, z);
+        if (dw != nullptr) {
+            dw->col(0) = weights(x + h, y, z) - weights(x - h, y, z);
+            dw->col(1) = weights(x, y + h, z) - weights(x, y - h, z);
+            dw->col(2) = weights(x, y, z + h) - weights(x, y, z - h);
+            *dw /= 2 * h;
+        }
+    });
+}
+
+SpatiallyVaryingTPMS::Weights
+SpatiallyVaryingTPMS::weights(double x, double y, double z) const
+{
+    Weights w;
+    m_weights(x, y, z, w, nullptr);
+    return w;
+}
+
+double SpatiallyVaryingTPMS::blend(
+    double x, double y, double z, const Weights& w, const double tolerance)
+{
+    std::array<int, NUM_TPMS> ids;
+    int size = 0;
+    bool double_angles = false;
+    for (int i = 0; i < NUM_TPMS; ++i) {
+        if (std::abs(w[i]) > tolerance) {
+            ids[size++] = i;
+            double_angles |= InterpolatedTPMSKernel::uses_double_angles(i);
         }
-        return r;
+    }
+
+    const TrigTerms t(x, y, z, double_angles);
+    double r = 0;
+    for (int j = 0; j < size; ++j) {
+        r += w[ids[j]] * InterpolatedTPMSKernel::primitive(ids[j], t);
+    }
+    return r;
+}
+
+std::pair<double, Eigen::Vector3d> SpatiallyVaryingTPMS::blend(
+    double x,
+    double y,
+    double z,
+    const Weights& w,
+    const WeightsJacobian& dw,
+    const double tolerance)
+{
+    bool double_angles = false;
+    for (int i = 0; i < NUM_TPMS; ++i) {
+        double_angles |= InterpolatedTPMSKernel::uses_double_angles(i)
+            && is_active(i, w, dw, tolerance);
+    }
+    return blend(TrigTerms(x, y, z, double_angles), w, dw, tolerance);
+}
+
+std::pair<double, Eigen::Vector3d> SpatiallyVaryingTPMS::blend(
+    const TrigTerms& t,
+    const Weights& w,
+    const WeightsJacobian& dw,
+    const double tolerance)
+{
+    // Skip a primitive only if both its weight and weight gradient are
+    // negligible, so the gradient stays consistent with the value
+    std::pair<double, Eigen::Vector3d> r(0.0, Eigen::Vector3d::Zero());
+    for (int i = 0; i < NUM_TPMS; ++i) {
+        if (!is_active(i, w, dw, tolerance)) {
+            continue;
+        }
+        const double f_i = InterpolatedTPMSKernel::primitive(i, t);
+        r.first += w[i] * f_i;
+        r.second += w[i] * InterpolatedTPMSKernel::primitive_gradient(i, t)
+            + f_i * dw.row(i).transpose();
+    }
+    return r;
+}
+
+void SpatiallyVaryingTPMS::init(const WeightKernel& weights)
+{
+    m_weights = weights;
+    const double tolerance = m_tolerance;
+
+    this->f = [weights, tolerance](double x, double y, double z) {
+        Weights w;
+        weights(x, y, z, w, nullptr);
+        return blend(x, y, z, w, tolerance);
+    };
+
+    this->fdf = [weights, tolerance](double x, double y, double z) {
+        Weights w;
+        WeightsJacobian dw;
+        weights(x, y, z, w, &dw);
+        return blend(x, y, z, w, dw, tolerance);
+    };
+
+    this->df = [fdf = this->fdf](double x, double y, double z) {
+        return fdf(x, y, z).second;
     };
 }
 
-} // namespace tpms
\ No newline at end of file
+} // namespace tpms
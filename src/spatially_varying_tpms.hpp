@@ -1,12 +1,125 @@
 #pragma once
 
+#include "grid_field.hpp"
 #include "implicit.hpp"
+#include "interpolated_tpms.hpp"
+
+#include <Eigen/Core>
+
+#include <array>
+#include <functional>
+#include <memory>
+#include <utility>
 
 namespace tpms {
 
+/// @brief Blend of the TPMS primitives with weights that vary in space.
+///
+/// The weights of InterpolatedTPMS::TPMSs are given by a product of
+/// sigmoids (one corner of the blend per primitive), by a coarse grid of
+/// weights interpolated trilinearly, or by a function of the position.
+/// Primitives whose weight (and weight gradient) is at most tolerance at a
+/// point are not evaluated there, and the weights are computed once per
+/// point for both the value and the gradient. With the default tolerance of
+/// 0 only zero weights are skipped, so the blend is exact; a positive
+/// tolerance trades accuracy for speed, and the blend jumps by up to
+/// tolerance |f_i| where a weight crosses it.
 class SpatiallyVaryingTPMS : public Implicit {
 public:
-    SpatiallyVaryingTPMS();
+    static constexpr int NUM_TPMS = InterpolatedTPMSKernel::NUM_TPMS;
+
+    using Weights = Eigen::Matrix<double, NUM_TPMS, 1>;
+    using WeightsJacobian = Eigen::Matrix<double, NUM_TPMS, 3>;
+    using WeightFunction = std::function<Weights(double, double, double)>;
+
+    /// @brief Default tolerance below which primitives are skipped (only
+    /// zero weights, so pruning is opt-in).
+    static constexpr double DEFAULT_TOLERANCE = 0;
+
+    /// @brief Blend with weights σ(±k (x - cx)) σ(±k (y - cy)) σ(±k (z - cz)),
+    /// where the signs are the bits of the primitive's index.
+    /// @param sharpness Sharpness k of the sigmoids
+    /// @param center Center (cx, cy, cz) of the blend
+    /// @param tolerance Weights at most this are skipped (0 skips only zero weights)
+    SpatiallyVaryingTPMS(
+        double sharpness = 1,
+        const Eigen::Vector3d& center = Eigen::Vector3d::Zero(),
+        double tolerance = DEFAULT_TOLERANCE);
+
+    /// @brief Blend with weights interpolated trilinearly from a grid
+    /// spanning [0, domain] (clamped outside).
+    /// @param weights Weights in row-major (x, y, z, primitive) order
+    /// @param shape Number of grid samples along each axis (at least 2)
+    /// @param domain Extent of the grid and of the implicit
+    /// @param tolerance Weights at most this are skipped (0 skips only zero weights)
+    SpatiallyVaryingTPMS(
+        const Eigen::VectorXd& weights,
+        const std::array<Eigen::Index, 3>& shape,
+        const Eigen::Array3d& domain,
+        double tolerance = DEFAULT_TOLERANCE);
+
+    /// @brief Blend with weights from the first NUM_TPMS channels of a grid
+    /// field (shared, e.g., with a thickness channel).
+    /// @param tolerance Weights at most this are skipped (0 skips only zero weights)
+    SpatiallyVaryingTPMS(
+        std::shared_ptr<const GridField> weights,
+        double tolerance = DEFAULT_TOLERANCE);
+
+    /// @brief Blend with weights given by a function of the position.
+    ///
+    /// The gradients of the weights are approximated by central differences.
+    /// @param weights Function returning the weights of the primitives
+    /// @param domain Extent of the implicit
+    /// @param tolerance Weights at most this are skipped (0 skips only zero weights)
+    SpatiallyVaryingTPMS(
+        const WeightFunction& weights,
+        const Eigen::Array3d& domain,
+        double tolerance = DEFAULT_TOLERANCE);
+
+    /// @brief Weights of the primitives at (x, y, z).
+    Weights weights(double x, double y, double z) const;
+
+    double tolerance() const { return m_tolerance; }
+
+    /// @brief Blend of the primitives at (x, y, z) with the weights w.
+    static double
+    blend(double x, double y, double z, const Weights& w, double tolerance);
+
+    /// @brief Blend of the primitives and its gradient at (x, y, z) with the
+    /// weights w and their Jacobian dw.
+    static std::pair<double, Eigen::Vector3d> blend(
+        double x,
+        double y,
+        double z,
+        const Weights& w,
+        const WeightsJacobian& dw,
+        double tolerance);
+
+    /// @brief Blend of the primitives and its gradient from precomputed
+    /// terms (with the doubled angles if an active primitive needs them).
+    static std::pair<double, Eigen::Vector3d> blend(
+        const TrigTerms& t,
+        const Weights& w,
+        const WeightsJacobian& dw,
+        double tolerance);
+
+    /// @brief Whether the primitive i is active (see blend).
+    static bool is_active(
+        int i, const Weights& w, const WeightsJacobian& dw, double tolerance)
+    {
+        return std::abs(w[i]) > tolerance
+            || dw.row(i).cwiseAbs().maxCoeff() > tolerance;
+    }
+
+private:
+    /// @brief Computes the weights (and their Jacobian if not null).
+    using WeightKernel = std::function<void(
+        double, double, double, Weights&, WeightsJacobian*)>;
+
+    void init(const WeightKernel& weights);
+
+    WeightKernel m_weights;
+    double m_tolerance;
 };
 
 } // namespace tpms
@@ -0,0 +1,423 @@
+#pragma once
+
+#include <Eigen/Core>
+
+#include <algorithm>
+#include <cmath>
+#include <vector>
+
+namespace tpms {
+
+/// @brief sin and cos of x, y, z and of 2x, 2y, 2z at a point.
+struct TrigTerms {
+    TrigTerms() = default;
+
+    /// @brief Compute the terms of (x, y, z).
+    /// @param double_angles Also compute the terms of (2x, 2y, 2z).
+    TrigTerms(double x, double y, double z, bool double_angles)
+        : sx(std::sin(x))
+        , cx(std::cos(x))
+        , sy(std::sin(y))
+        , cy(std::cos(y))
+        , sz(std::sin(z))
+        , cz(std::cos(z))
+    {
+        if (double_angles) {
+            s2x = 2 * sx * cx, c2x = (cx - sx) * (cx + sx);
+            s2y = 2 * sy * cy, c2y = (cy - sy) * (cy + sy);
+            s2z = 2 * sz * cz, c2z = (cz - sz) * (cz + sz);
+        }
+    }
+
+    double sx, cx, sy, cy, sz, cz;
+    double s2x = 0, c2x = 0, s2y = 0, c2y = 0, s2z = 0, c2z = 0;
+};
+
+/// @brief Compute sin and cos of scale * x[i] for n values.
+///
+/// Uses a branch-free Cody-Waite reduction by π/2 and minimax polynomials
+/// on [-π/4, π/4] (Cephes), so the loop can be auto-vectorized. Results are
+/// within a few ulp of std::sin/std::cos. Arguments beyond 1e5 (or NaN)
+/// fall back to std::sin/std::cos.
+inline void sincos(
+    const double* x, const double scale, double* s, double* c, Eigen::Index n)
+{
+    constexpr double TWO_OVER_PI = 0.636619772367581343076;
+    constexpr double PIO2_1 = 1.57079632673412561417e+00;
+    constexpr double PIO2_2 = 6.07710050630396597660e-11;
+    constexpr double PIO2_3 = 2.02226624879595063154e-21;
+    constexpr double ROUND = 6755399441055744.0; // 1.5 * 2^52
+    constexpr double MAX_ARGUMENT = 1e5;
+
+    for (Eigen::Index i = 0; i < n; ++i) {
+        const double xi = scale * x[i];
+        const double k = (xi * TWO_OVER_PI + ROUND) - ROUND;
+        const double r = ((xi - k * PIO2_1) - k * PIO2_2) - k * PIO2_3;
+        const double r2 = r * r;
+
+        const double sr = r
+            + r * r2
+                * (-1.66666666666666307295E-1
+                   + r2
+                       * (8.33333333332211858878E-3
+                          + r2
+                              * (-1.98412698295895385996E-4
+                                 + r2
+                                     * (2.75573136213857245213E-6
+                                        + r2
+                                            * (-2.50507477628578072866E-8
+                                               + r2
+                                                   * 1.58962301576546568060E-10)))));
+        const double cr = 1 - 0.5 * r2
+            + r2 * r2
+                * (4.16666666666665929218E-2
+                   + r2
+                       * (-1.38888888888730564116E-3
+                          + r2
+                              * (2.48015872888517045348E-5
+                                 + r2
+                                     * (-2.75573141792967388112E-7
+                                        + r2
+                                            * (2.08757008419747316778E-9
+                                               + r2
+                                                   * -1.13585365213876817300E-11)))));
+
+        // Select the quadrant q = k mod 4 with arithmetic instead of
+        // branches: odd = q mod 2 and half = floor(q / 2), all exact.
+        const double q = k - 4 * ((((k - 1.5) * 0.25) + ROUND) - ROUND);
+        const double half = (((q - 0.5) * 0.5) + ROUND) - ROUND;
+        const double odd = q - 2 * half;
+        const double sign_s = 1 - 2 * half;
+        const double sign_c = 1 - 2 * (odd + half - 2 * odd * half);
+        s[i] = sign_s * (1 - odd) * sr + sign_s * odd * cr;
+        c[i] = sign_c * (1 - odd) * cr + sign_c * odd * sr;
+    }
+
+    for (Eigen::Index i = 0; i < n; ++i) {
+        const double xi = scale * x[i];
+        if (!(std::abs(xi) <= MAX_ARGUMENT)) {
+            s[i] = std::sin(xi);
+            c[i] = std::cos(xi);
+        }
+    }
+}
+
+/// @brief Trigonometric terms of a block of contiguous points.
+class TrigBlock {
+public:
+    /// @brief Maximum number of points in a block.
+    static constexpr Eigen::Index SIZE = 256;
+
+    /// @brief Compute the terms of (scale * x, scale * y, scale * z).
+    /// @param n Number of points (at most SIZE).
+    /// @param double_angles Also compute the terms of the doubled angles.
+    void compute(
+        const double* x,
+        const double* y,
+        const double* z,
+        const Eigen::Index n,
+        const bool double_angles,
+        const double scale = 1)
+    {
+        sincos(x, scale, sx, cx, n);
+        sincos(y, scale, sy, cy, n);
+        sincos(z, scale, sz, cz, n);
+        m_double_angles = double_angles;
+        if (!double_angles) {
+            return;
+        }
+        for (Eigen::Index i = 0; i < n; ++i) {
+            s2x[i] = 2 * sx[i] * cx[i], c2x[i] = (cx[i] - sx[i]) * (cx[i] + sx[i]);
+            s2y[i] = 2 * sy[i] * cy[i], c2y[i] = (cy[i] - sy[i]) * (cy[i] + sy[i]);
+            s2z[i] = 2 * sz[i] * cz[i], c2z[i] = (cz[i] - sz[i]) * (cz[i] + sz[i]);
+        }
+    }
+
+    TrigTerms operator[](const Eigen::Index i) const
+    {
+        TrigTerms t;
+        t.sx = sx[i], t.cx = cx[i];
+        t.sy = sy[i], t.cy = cy[i];
+        t.sz = sz[i], t.cz = cz[i];
+        if (m_double_angles) {
+            t.s2x = s2x[i], t.c2x = c2x[i];
+            t.s2y = s2y[i], t.c2y = c2y[i];
+            t.s2z = s2z[i], t.c2z = c2z[i];
+        }
+        return t;
+    }
+
+private:
+    double sx[SIZE], cx[SIZE], sy[SIZE], cy[SIZE], sz[SIZE], cz[SIZE];
+    double s2x[SIZE], c2x[SIZE], s2y[SIZE], c2y[SIZE], s2z[SIZE], c2z[SIZE];
+    bool m_double_angles = false;
+};
+
+/// @brief Call kernel(terms, i) for each of n contiguous points.
+/// @param double_angles Also compute the terms of the doubled angles.
+/// @param scale Scale applied to the coordinates before the trig functions.
+template <typename Kernel>
+void for_each_trig_terms(
+    const double* x,
+    const double* y,
+    const double* z,
+    const Eigen::Index n,
+    const bool double_angles,
+    const double scale,
+    const Kernel& kernel)
+{
+    TrigBlock block;
+    for (Eigen::Index start = 0; start < n; start += TrigBlock::SIZE) {
+        const Eigen::Index m = std::min(TrigBlock::SIZE, n - start);
+        block.compute(x + start, y + start, z + start, m, double_angles, scale);
+        for (Eigen::Index i = 0; i < m; ++i) {
+            kernel(block[i], start + i);
+        }
+    }
+}
+
+/// @brief sin and cos of the coordinates along one axis of a grid.
+struct TrigTable {
+    /// @brief Compute the terms of scale * x[i] for n values.
+    /// @param double_angles Also compute the terms of the doubled angles.
+    TrigTable(
+        const double* x,
+        const Eigen::Index n,
+        const bool double_angles,
+        const double scale = 1)
+        : s(n)
+        , c(n)
+    {
+        sincos(x, scale, s.data(), c.data(), n);
+        if (!double_angles) {
+            return;
+        }
+        s2.resize(n), c2.resize(n);
+        for (Eigen::Index i = 0; i < n; ++i) {
+            s2[i] = 2 * s[i] * c[i], c2[i] = (c[i] - s[i]) * (c[i] + s[i]);
+        }
+    }
+
+    std::vector<double> s, c, s2, c2;
+};
+
+/// @brief Call kernel(terms, i) for each point of the grid xs × ys × zs.
+///
+/// Points are visited in row-major (x, y, z) order. The trig functions are
+/// only evaluated along each axis (nx + ny + nz times) and the terms of a
+/// point are the outer product of the axis tables.
+/// @param double_angles Also compute the terms of the doubled angles.
+/// @param scale Scale applied to the coordinates before the trig functions.
+template <typename Kernel>
+void for_each_grid_trig_terms(
+    const double* xs,
+    const Eigen::Index nx,
+    const double* ys,
+    const Eigen::Index ny,
+    const double* zs,
+    const Eigen::Index nz,
+    const bool double_angles,
+    const double scale,
+    const Kernel& kernel)
+{
+    const TrigTable tx(xs, nx, double_angles, scale);
+    const TrigTable ty(ys, ny, double_angles, scale);
+    const TrigTable tz(zs, nz, double_angles, scale);
+
+    TrigTerms t;
+    Eigen::Index index = 0;
+    for (Eigen::Index i = 0; i < nx; ++i) {
+        t.sx = tx.s[i], t.cx = tx.c[i];
+        if (double_angles) {
+            t.s2x = tx.s2[i], t.c2x = tx.c2[i];
+        }
+        for (Eigen::Index j = 0; j < ny; ++j) {
+            t.sy = ty.s[j], t.cy = ty.c[j];
+            if (double_angles) {
+                t.s2y = ty.s2[j], t.c2y = ty.c2[j];
+            }
+            for (Eigen::Index k = 0; k < nz; ++k) {
+                t.sz = tz.s[k], t.cz = tz.c[k];
+                if (double_angles) {
+                    t.s2z = tz.s2[k], t.c2z = tz.c2[k];
+                }
+                kernel(t, index++);
+            }
+        }
+    }
+}
+
+/// @brief Batch versions of the functions in tpms.hpp and tpms_gradient.hpp.
+///
+/// Each function evaluates n contiguous points (x, y, z) into out (n values
+/// or n row-major gradients).
+namespace batch {
+
+#define TPMS_BATCH_FUNCTION(NAME, DOUBLE_ANGLES, SCALE, VALUE)                 \
+    inline void NAME(                                                          \
+        const double* x, const double* y, const double* z, double* out,        \
+        const Eigen::Index n)                                                  \
+    {                                                                          \
+        for_each_trig_terms(                                                   \
+            x, y, z, n, DOUBLE_ANGLES, SCALE,                                  \
+            [out](const TrigTerms& t, const Eigen::Index i) {                  \
+                out[i] = VALUE;                                                \
+            });                                                                \
+    }
+
+#define TPMS_BATCH_GRADIENT(NAME, DOUBLE_ANGLES, SCALE, GX, GY, GZ)            \
+    inline void NAME(                                                          \
+        const double* x, const double* y, const double* z, double* out,        \
+        const Eigen::Index n)                                                  \
+    {                                                                          \
+        for_each_trig_terms(                                                   \
+            x, y, z, n, DOUBLE_ANGLES, SCALE,                                  \
+            [out](const TrigTerms& t, const Eigen::Index i) {                  \
+                out[3 * i + 0] = GX;                                           \
+                out[3 * i + 1] = GY;                                           \
+                out[3 * i + 2] = GZ;                                           \
+            });                                                                \
+    }
+
+// clang-format off
+TPMS_BATCH_FUNCTION(schoen_gyroid, false, 1,
+    t.sx * t.cy + t.sy * t.cz + t.sz * t.cx)
+
+TPMS_BATCH_FUNCTION(double_schoen_gyroid, true, 1,
+    2.75 * (t.s2x * t.sz * t.cy + t.s2y * t.sx * t.cz + t.s2z * t.sy * t.cx)
+    - (t.c2x * t.c2y + t.c2y * t.c2z + t.c2z * t.c2x))
+
+TPMS_BATCH_FUNCTION(schwarz_diamond, false, 1,
+    t.cx * t.cy * t.cz - t.sx * t.sy * t.sz)
+
+TPMS_BATCH_FUNCTION(double_swartz_diamond, true, 1,
+    t.s2x * t.s2y + t.s2y * t.s2z + t.s2z * t.s2x + t.c2x * t.c2y * t.c2z)
+
+TPMS_BATCH_FUNCTION(schwarz_primitive, false, 1,
+    t.cx + t.cy + t.cz)
+
+TPMS_BATCH_FUNCTION(double_schwarz_primitive, false, 1,
+    t.sx * t.sy * t.sz + t.sx * t.cy * t.cz + t.cx * t.sy * t.cz
+    + t.cx * t.cy * t.sz)
+
+TPMS_BATCH_FUNCTION(schoen_iwp, true, 1,
+    2 * (t.cx * t.cy + t.cy * t.cz + t.cz * t.cx) - (t.c2x + t.c2y + t.c2z))
+
+TPMS_BATCH_FUNCTION(lipnoid, true, 1,
+    t.s2x * t.cy * t.sz + t.s2y * t.cz * t.sx + t.s2z * t.cx * t.sy
+    + t.c2x * t.c2y + t.c2y * t.c2z + t.c2z * t.c2x)
+
+TPMS_BATCH_FUNCTION(neovius, false, 1,
+    3 * (t.cx + t.cy + t.cz) + 4 * t.cx * t.cy * t.cz)
+
+TPMS_BATCH_FUNCTION(fischer_koch_s, true, 1,
+    t.c2x * t.sy * t.cz + t.cx * t.c2y * t.sz + t.sx * t.cy * t.c2z)
+
+TPMS_BATCH_FUNCTION(schoen_frd, true, 1,
+    4 * t.cx * t.cy * t.cz - (t.c2x * t.c2y + t.c2y * t.c2z + t.c2z * t.c2x))
+
+TPMS_BATCH_FUNCTION(PMY, true, 1,
+    2 * t.cx * t.cy * t.cz + t.s2x * t.sy + t.sx * t.s2z + t.s2y * t.sz)
+
+TPMS_BATCH_FUNCTION(tubular_G_AB, true, 1,
+    20 * (t.cx * t.sy + t.cy * t.sz + t.cz * t.sx)
+    - 0.5 * (t.c2x * t.c2y + t.c2y * t.c2z + t.c2z * t.c2x) - 4)
+
+TPMS_BATCH_FUNCTION(tubular_G_C, true, 1,
+    -10 * (t.cx * t.sy + t.cy * t.sz + t.cz * t.sx)
+    + 2 * (t.c2x * t.c2y + t.c2y * t.c2z + t.c2z * t.c2x) + 12)
+
+// Terms of (x/2, y/2, z/2), so the "doubled" terms are those of (x, y, z)
+TPMS_BATCH_FUNCTION(BCC, true, 0.5,
+    t.c2x + t.c2y + t.c2z - 2 * (t.cx * t.cy + t.cy * t.cz + t.cz * t.cx))
+
+TPMS_BATCH_GRADIENT(schoen_gyroid_gradient, false, 1,
+    t.cx * t.cy - t.sx * t.sz,
+    t.cy * t.cz - t.sx * t.sy,
+    t.cx * t.cz - t.sy * t.sz)
+
+TPMS_BATCH_GRADIENT(schwarz_diamond_gradient, false, 1,
+    -t.sx * t.cy * t.cz - t.cx * t.sy * t.sz,
+    -t.cx * t.sy * t.cz - t.sx * t.cy * t.sz,
+    -t.cx * t.cy * t.sz - t.sx * t.sy * t.cz)
+
+TPMS_BATCH_GRADIENT(schwarz_primitive_gradient, false, 1,
+    -t.sx, -t.sy, -t.sz)
+
+TPMS_BATCH_GRADIENT(schoen_iwp_gradient, true, 1,
+    -2 * t.sx * (t.cy + t.cz) + 2 * t.s2x,
+    -2 * t.sy * (t.cz + t.cx) + 2 * t.s2y,
+    -2 * t.sz * (t.cx + t.cy) + 2 * t.s2z)
+
+TPMS_BATCH_GRADIENT(neovius_gradient, false, 1,
+    -(4 * t.cy * t.cz + 3) * t.sx,
+    -(4 * t.cz * t.cx + 3) * t.sy,
+    -(4 * t.cx * t.cy + 3) * t.sz)
+
+TPMS_BATCH_GRADIENT(fischer_koch_s_gradient, true, 1,
+    -2 * t.s2x * t.sy * t.cz - t.sx * t.c2y * t.sz + t.cx * t.cy * t.c2z,
+    t.c2x * t.cy * t.cz - 2 * t.cx * t.s2y * t.sz - t.sx * t.sy * t.c2z,
+    -t.c2x * t.sy * t.sz + t.cx * t.c2y * t.cz - 2 * t.sx * t.cy * t.s2z)
+
+TPMS_BATCH_GRADIENT(schoen_frd_gradient, true, 1,
+    -4 * t.sx * t.cy * t.cz + 2 * t.s2x * (t.c2y + t.c2z),
+    -4 * t.cx * t.sy * t.cz + 2 * t.s2y * (t.c2z + t.c2x),
+    -4 * t.cx * t.cy * t.sz + 2 * t.s2z * (t.c2x + t.c2y))
+
+TPMS_BATCH_GRADIENT(PMY_gradient, true, 1,
+    -2 * t.sx * t.cy * t.cz + 2 * t.c2x * t.sy + t.cx * t.s2z,
+    -2 * t.cx * t.sy * t.cz + t.s2x * t.cy + 2 * t.c2y * t.sz,
+    -2 * t.cx * t.cy * t.sz + 2 * t.sx * t.c2z + t.s2y * t.cz)
+
+TPMS_BATCH_GRADIENT(double_schoen_gyroid_gradient, true, 1,
+    2.75 * (2 * t.c2x * t.sz * t.cy + t.s2y * t.cx * t.cz - t.s2z * t.sy * t.sx)
+    + 2 * t.s2x * (t.c2y + t.c2z),
+    2.75 * (2 * t.c2y * t.sx * t.cz + t.s2z * t.cy * t.cx - t.s2x * t.sz * t.sy)
+    + 2 * t.s2y * (t.c2z + t.c2x),
+    2.75 * (t.s2x * t.cz * t.cy - t.s2y * t.sx * t.sz + 2 * t.c2z * t.sy * t.cx)
+    + 2 * t.s2z * (t.c2x + t.c2y))
+
+TPMS_BATCH_GRADIENT(double_swartz_diamond_gradient, true, 1,
+    2 * t.c2x * (t.s2y + t.s2z) - 2 * t.s2x * t.c2y * t.c2z,
+    2 * t.c2y * (t.s2z + t.s2x) - 2 * t.c2x * t.s2y * t.c2z,
+    2 * t.c2z * (t.s2x + t.s2y) - 2 * t.c2x * t.c2y * t.s2z)
+
+TPMS_BATCH_GRADIENT(double_schwarz_primitive_gradient, false, 1,
+    t.cx * t.sy * t.sz + t.cx * t.cy * t.cz - t.sx * t.sy * t.cz
+    - t.sx * t.cy * t.sz,
+    t.sx * t.cy * t.sz - t.sx * t.sy * t.cz + t.cx * t.cy * t.cz
+    - t.cx * t.sy * t.sz,
+    t.sx * t.sy * t.cz - t.sx * t.cy * t.sz - t.cx * t.sy * t.sz
+    + t.cx * t.cy * t.cz)
+
+TPMS_BATCH_GRADIENT(lipnoid_gradient, true, 1,
+    2 * t.c2x * t.cy * t.sz + t.s2y * t.cz * t.cx - t.s2z * t.sx * t.sy
+    - 2 * t.s2x * (t.c2y + t.c2z),
+    -t.s2x * t.sy * t.sz + 2 * t.c2y * t.cz * t.sx + t.s2z * t.cx * t.cy
+    - 2 * t.s2y * (t.c2z + t.c2x),
+    t.s2x * t.cy * t.cz - t.s2y * t.sz * t.sx + 2 * t.c2z * t.cx * t.sy
+    - 2 * t.s2z * (t.c2x + t.c2y))
+
+TPMS_BATCH_GRADIENT(tubular_G_AB_gradient, true, 1,
+    20 * (t.cz * t.cx - t.sx * t.sy) + t.s2x * (t.c2y + t.c2z),
+    20 * (t.cx * t.cy - t.sy * t.sz) + t.s2y * (t.c2z + t.c2x),
+    20 * (t.cy * t.cz - t.sz * t.sx) + t.s2z * (t.c2x + t.c2y))
+
+TPMS_BATCH_GRADIENT(tubular_G_C_gradient, true, 1,
+    -10 * (t.cz * t.cx - t.sx * t.sy) - 4 * t.s2x * (t.c2y + t.c2z),
+    -10 * (t.cx * t.cy - t.sy * t.sz) - 4 * t.s2y * (t.c2z + t.c2x),
+    -10 * (t.cy * t.cz - t.sz * t.sx) - 4 * t.s2z * (t.c2x + t.c2y))
+
+// Terms of (x/2, y/2, z/2), as in BCC
+TPMS_BATCH_GRADIENT(BCC_gradient, true, 0.5,
+    -t.s2x + t.sx * (t.cy + t.cz),
+    -t.s2y + t.sy * (t.cz + t.cx),
+    -t.s2z + t.sz * (t.cx + t.cy))
+// clang-format on
+
+#undef TPMS_BATCH_FUNCTION
+#undef TPMS_BATCH_GRADIENT
+
+} // namespace batch
+
+} // namespace tpms
@@ -2,6 +2,8 @@
 
 #include <Eigen/Dense>
 
+#include <utility>
+
 namespace tpms {
 
 inline Eigen::Vector3d
@@ -124,4 +126,277 @@ PMY_gradient(const double x, const double y, const double z)
         -t0 * t4 * t8 + t5 * sin(t7) + t6 * cos(t1));
 }
 
-} // namespace tpms
\ No newline at end of file
+// ----------------------------------------------------------------------------
+// Fused value and gradient evaluation (shares trigonometric terms)
+
+inline std::pair<double, Eigen::Vector3d>
+schoen_gyroid_value_and_gradient(const double x, const double y, const double z)
+{
+    const double sx = sin(x), cx = cos(x);
+    const double sy = sin(y), cy = cos(y);
+    const double sz = sin(z), cz = cos(z);
+    return {
+        sx * cy + sy * cz + sz * cx,
+        Eigen::Vector3d(cx * cy - sx * sz, cy * cz - sx * sy, cx * cz - sy * sz)
+    };
+}
+
+inline std::pair<double, Eigen::Vector3d> schwarz_diamond_value_and_gradient(
+    const double x, const double y, const double z)
+{
+    const double sx = sin(x), cx = cos(x);
+    const double sy = sin(y), cy = cos(y);
+    const double sz = sin(z), cz = cos(z);
+    return {
+        cx * cy * cz - sx * sy * sz,
+        Eigen::Vector3d(
+            -sx * cy * cz - cx * sy * sz, -cx * sy * cz - sx * cy * sz,
+            -cx * cy * sz - sx * sy * cz)
+    };
+}
+
+inline std::pair<double, Eigen::Vector3d> schwarz_primitive_value_and_gradient(
+    const double x, const double y, const double z)
+{
+    return {
+        cos(x) + cos(y) + cos(z), Eigen::Vector3d(-sin(x), -sin(y), -sin(z))
+    };
+}
+
+inline std::pair<double, Eigen::Vector3d>
+schoen_iwp_value_and_gradient(const double x, const double y, const double z)
+{
+    const double sx = sin(x), cx = cos(x);
+    const double sy = sin(y), cy = cos(y);
+    const double sz = sin(z), cz = cos(z);
+    return {
+        2 * (cx * cy + cy * cz + cz * cx)
+            - (cos(2 * x) + cos(2 * y) + cos(2 * z)),
+        Eigen::Vector3d(
+            -2 * sx * (cy + cz) + 2 * sin(2 * x),
+            -2 * sy * (cz + cx) + 2 * sin(2 * y),
+            -2 * sz * (cx + cy) + 2 * sin(2 * z))
+    };
+}
+
+inline std::pair<double, Eigen::Vector3d>
+neovius_value_and_gradient(const double x, const double y, const double z)
+{
+    const double cx = cos(x), cy = cos(y), cz = cos(z);
+    return {
+        3 * (cx + cy + cz) + 4 * cx * cy * cz,
+        Eigen::Vector3d(
+            -(4 * cy * cz + 3) * sin(x), -(4 * cz * cx + 3) * sin(y),
+            -(4 * cx * cy + 3) * sin(z))
+    };
+}
+
+inline std::pair<double, Eigen::Vector3d> fischer_koch_s_value_and_gradient(
+    const double x, const double y, const double z)
+{
+    const double sx = sin(x), cx = cos(x), s2x = sin(2 * x), c2x = cos(2 * x);
+    const double sy = sin(y), cy = cos(y), s2y = sin(2 * y), c2y = cos(2 * y);
+    const double sz = sin(z), cz = cos(z), s2z = sin(2 * z), c2z = cos(2 * z);
+    return {
+        c2x * sy * cz + cx * c2y * sz + sx * cy * c2z,
+        Eigen::Vector3d(
+            -2 * s2x * sy * cz - sx * c2y * sz + cx * cy * c2z,
+            c2x * cy * cz - 2 * cx * s2y * sz - sx * sy * c2z,
+            -c2x * sy * sz + cx * c2y * cz - 2 * sx * cy * s2z)
+    };
+}
+
+inline std::pair<double, Eigen::Vector3d>
+schoen_frd_value_and_gradient(const double x, const double y, const double z)
+{
+    const double cx = cos(x), s2x = sin(2 * x), c2x = cos(2 * x);
+    const double cy = cos(y), s2y = sin(2 * y), c2y = cos(2 * y);
+    const double cz = cos(z), s2z = sin(2 * z), c2z = cos(2 * z);
+    return {
+        4 * cx * cy * cz - (c2x * c2y + c2y * c2z + c2z * c2x),
+        Eigen::Vector3d(
+            -4 * sin(x) * cy * cz + 2 * s2x * (c2y + c2z),
+            -4 * cx * sin(y) * cz + 2 * s2y * (c2z + c2x),
+            -4 * cx * cy * sin(z) + 2 * s2z * (c2x + c2y))
+    };
+}
+
+inline std::pair<double, Eigen::Vector3d>
+PMY_value_and_gradient(const double x, const double y, const double z)
+{
+    const double sx = sin(x), cx = cos(x), s2x = sin(2 * x), c2x = cos(2 * x);
+    const double sy = sin(y), cy = cos(y), s2y = sin(2 * y), c2y = cos(2 * y);
+    const double sz = sin(z), cz = cos(z), s2z = sin(2 * z), c2z = cos(2 * z);
+    return {
+        2 * cx * cy * cz + s2x * sy + sx * s2z + s2y * sz,
+        Eigen::Vector3d(
+            -2 * sx * cy * cz + 2 * c2x * sy + cx * s2z,
+            -2 * cx * sy * cz + s2x * cy + 2 * c2y * sz,
+            -2 * cx * cy * sz + 2 * sx * c2z + s2y * cz)
+    };
+}
+
+inline std::pair<double, Eigen::Vector3d>
+double_schoen_gyroid_value_and_gradient(
+    const double x, const double y, const double z)
+{
+    const double sx = sin(x), cx = cos(x), s2x = sin(2 * x), c2x = cos(2 * x);
+    const double sy = sin(y), cy = cos(y), s2y = sin(2 * y), c2y = cos(2 * y);
+    const double sz = sin(z), cz = cos(z), s2z = sin(2 * z), c2z = cos(2 * z);
+    return {
+        2.75 * (s2x * sz * cy + s2y * sx * cz + s2z * sy * cx)
+            - (c2x * c2y + c2y * c2z + c2z * c2x),
+        Eigen::Vector3d(
+            2.75 * (2 * c2x * sz * cy + s2y * cx * cz - s2z * sy * sx)
+                + 2 * s2x * (c2y + c2z),
+            2.75 * (-s2x * sz * sy + 2 * c2y * sx * cz + s2z * cy * cx)
+                + 2 * s2y * (c2z + c2x),
+            2.75 * (s2x * cz * cy - s2y * sx * sz + 2 * c2z * sy * cx)
+                + 2 * s2z * (c2x + c2y))
+    };
+}
+
+inline std::pair<double, Eigen::Vector3d>
+double_swartz_diamond_value_and_gradient(
+    const double x, const double y, const double z)
+{
+    const double s2x = sin(2 * x), c2x = cos(2 * x);
+    const double s2y = sin(2 * y), c2y = cos(2 * y);
+    const double s2z = sin(2 * z), c2z = cos(2 * z);
+    return {
+        s2x * s2y + s2y * s2z + s2z * s2x + c2x * c2y * c2z,
+        Eigen::Vector3d(
+            2 * c2x * (s2y + s2z) - 2 * s2x * c2y * c2z,
+            2 * c2y * (s2z + s2x) - 2 * c2x * s2y * c2z,
+            2 * c2z * (s2x + s2y) - 2 * c2x * c2y * s2z)
+    };
+}
+
+inline std::pair<double, Eigen::Vector3d>
+double_schwarz_primitive_value_and_gradient(
+    const double x, const double y, const double z)
+{
+    const double sx = sin(x), cx = cos(x);
+    const double sy = sin(y), cy = cos(y);
+    const double sz = sin(z), cz = cos(z);
+    return {
+        sx * sy * sz + sx * cy * cz + cx * sy * cz + cx * cy * sz,
+        Eigen::Vector3d(
+            cx * sy * sz + cx * cy * cz - sx * sy * cz - sx * cy * sz,
+            sx * cy * sz - sx * sy * cz + cx * cy * cz - cx * sy * sz,
+            sx * sy * cz - sx * cy * sz - cx * sy * sz + cx * cy * cz)
+    };
+}
+
+inline std::pair<double, Eigen::Vector3d>
+lipnoid_value_and_gradient(const double x, const double y, const double z)
+{
+    const double sx = sin(x), cx = cos(x), s2x = sin(2 * x), c2x = cos(2 * x);
+    const double sy = sin(y), cy = cos(y), s2y = sin(2 * y), c2y = cos(2 * y);
+    const double sz = sin(z), cz = cos(z), s2z = sin(2 * z), c2z = cos(2 * z);
+    return {
+        s2x * cy * sz + s2y * cz * sx + s2z * cx * sy + c2x * c2y + c2y * c2z
+            + c2z * c2x,
+        Eigen::Vector3d(
+            2 * c2x * cy * sz + s2y * cz * cx - s2z * sx * sy
+                - 2 * s2x * (c2y + c2z),
+            -s2x * sy * sz + 2 * c2y * cz * sx + s2z * cx * cy
+                - 2 * s2y * (c2z + c2x),
+            s2x * cy * cz - s2y * sz * sx + 2 * c2z * cx * sy
+                - 2 * s2z * (c2x + c2y))
+    };
+}
+
+inline std::pair<double, Eigen::Vector3d>
+tubular_G_AB_value_and_gradient(const double x, const double y, const double z)
+{
+    const double sx = sin(x), cx = cos(x), s2x = sin(2 * x), c2x = cos(2 * x);
+    const double sy = sin(y), cy = cos(y), s2y = sin(2 * y), c2y = cos(2 * y);
+    const double sz = sin(z), cz = cos(z), s2z = sin(2 * z), c2z = cos(2 * z);
+    return {
+        20 * (cx * sy + cy * sz + cz * sx)
+            - 0.5 * (c2x * c2y + c2y * c2z + c2z * c2x) - 4,
+        Eigen::Vector3d(
+            20 * (cz * cx - sx * sy) + s2x * (c2y + c2z),
+            20 * (cx * cy - sy * sz) + s2y * (c2z + c2x),
+            20 * (cy * cz - sz * sx) + s2z * (c2x + c2y))
+    };
+}
+
+inline std::pair<double, Eigen::Vector3d>
+tubular_G_C_value_and_gradient(const double x, const double y, const double z)
+{
+    const double sx = sin(x), cx = cos(x), s2x = sin(2 * x), c2x = cos(2 * x);
+    const double sy = sin(y), cy = cos(y), s2y = sin(2 * y), c2y = cos(2 * y);
+    const double sz = sin(z), cz = cos(z), s2z = sin(2 * z), c2z = cos(2 * z);
+    return {
+        -10 * (cx * sy + cy * sz + cz * sx)
+            + 2 * (c2x * c2y + c2y * c2z + c2z * c2x) + 12,
+        Eigen::Vector3d(
+            -10 * (cz * cx - sx * sy) - 4 * s2x * (c2y + c2z),
+            -10 * (cx * cy - sy * sz) - 4 * s2y * (c2z + c2x),
+            -10 * (cy * cz - sz * sx) - 4 * s2z * (c2x + c2y))
+    };
+}
+
+inline std::pair<double, Eigen::Vector3d>
+BCC_value_and_gradient(const double x, const double y, const double z)
+{
+    // Terms of the half angles
+    const double shx = sin(x / 2), chx = cos(x / 2);
+    const double shy = sin(y / 2), chy = cos(y / 2);
+    const double shz = sin(z / 2), chz = cos(z / 2);
+    return {
+        cos(x) + cos(y) + cos(z) - 2 * (chx * chy + chy * chz + chz * chx),
+        Eigen::Vector3d(
+            -sin(x) + shx * (chy + chz), -sin(y) + shy * (chz + chx),
+            -sin(z) + shz * (chx + chy))
+    };
+}
+
+// Gradients of the remaining primitives (computed with their values, which
+// share all the trigonometric terms)
+
+inline Eigen::Vector3d
+double_schoen_gyroid_gradient(const double x, const double y, const double z)
+{
+    return double_schoen_gyroid_value_and_gradient(x, y, z).second;
+}
+
+inline Eigen::Vector3d
+double_swartz_diamond_gradient(const double x, const double y, const double z)
+{
+    return double_swartz_diamond_value_and_gradient(x, y, z).second;
+}
+
+inline Eigen::Vector3d double_schwarz_primitive_gradient(
+    const double x, const double y, const double z)
+{
+    return double_schwarz_primitive_value_and_gradient(x, y, z).second;
+}
+
+inline Eigen::Vector3d
+lipnoid_gradient(const double x, const double y, const double z)
+{
+    return lipnoid_value_and_gradient(x, y, z).second;
+}
+
+inline Eigen::Vector3d
+tubular_G_AB_gradient(const double x, const double y, const double z)
+{
+    return tubular_G_AB_value_and_gradient(x, y, z).second;
+}
+
+inline Eigen::Vector3d
+tubular_G_C_gradient(const double x, const double y, const double z)
+{
+    return tubular_G_C_value_and_gradient(x, y, z).second;
+}
+
+inline Eigen::Vector3d
+BCC_gradient(const double x, const double y, const double z)
+{
+    return BCC_value_and_gradient(x, y, z).second;
+}
+
+} // namespace tpms
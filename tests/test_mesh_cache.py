@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+import pytest
+
+from TPMeSh.mesh_tpms import MeshCache, cached
+
+
+def results():
+    V = np.random.default_rng(0).random((10, 3))
+    F = np.arange(12).reshape(4, 3) % 10
+    return V, F, None, [V[:2], F[:1]]
+
+
+def assert_same_results(a, b):
+    assert len(a) == len(b)
+    for x, y in zip(a, b):
+        if isinstance(x, list):
+            assert len(x) == len(y)
+            for u, v in zip(x, y):
+                np.testing.assert_array_equal(u, v)
+        elif x is None:
+            assert y is None
+        else:
+            np.testing.assert_array_equal(x, y)
+
+
+def test_put_get_round_trip(tmp_path):
+    cache = MeshCache(tmp_path)
+    key = cache.key("mesh", np.ones(8) / 8, 0.5, {"res": 10})
+    assert cache.get(key) is None
+    cache.put(key, results())
+    assert_same_results(cache.get(key), results())
+
+
+def test_key_depends_on_parameters(tmp_path):
+    x = np.ones(8) / 8
+    key = MeshCache.key("mesh", x, 0.5, {"res": 10})
+    assert key == MeshCache.key("mesh", x, 0.5, {"res": 10, "verbose": True})
+    assert key != MeshCache.key("mesh", x, 0.4, {"res": 10})
+    assert key != MeshCache.key("mesh", x, 0.5, {"res": 11})
+
+
+@pytest.mark.parametrize("size", [0, 10, -10])
+def test_corrupt_entry_is_a_miss_and_removed(tmp_path, size):
+    cache = MeshCache(tmp_path)
+    key = cache.key("mesh", np.ones(8) / 8, 0.5, {})
+    cache.put(key, results())
+    path = cache.path(key)
+    data = path.read_bytes()
+    path.write_bytes(data[:size] if size >= 0 else data[:size] + b"\0" * 10)
+
+    assert cache.get(key) is None
+    assert not path.exists()
+    cache.put(key, results())
+    assert_same_results(cache.get(key), results())
+
+
+def test_oversized_entry_is_not_stored(tmp_path):
+    cache = MeshCache(tmp_path, max_bytes=10)
+    key = cache.key("mesh", np.ones(8) / 8, 0.5, {})
+    with pytest.warns(UserWarning, match="Not caching"):
+        cache.put(key, results())
+    assert cache.get(key) is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = MeshCache(tmp_path)
+    keys = [cache.key("mesh", np.full(8, i), 0.5, {}) for i in range(3)]
+    for key in keys:
+        cache.put(key, results())
+    size = cache.path(keys[0]).stat().st_size
+    for i, key in enumerate(keys):  # Increasing access times
+        os.utime(cache.path(key), (1000 + i, 1000 + i))
+
+    cache.max_bytes = 2 * size
+    cache.evict()
+    assert not cache.path(keys[0]).exists()
+    assert cache.path(keys[1]).exists() and cache.path(keys[2]).exists()
+
+
+def test_cached_calls_function_once(tmp_path):
+    calls = []
+
+    @cached
+    def mesh(x, thickness, **kwargs):
+        calls.append(1)
+        return results()
+
+    for _ in range(2):
+        assert_same_results(mesh(np.ones(8) / 8, 0.5, cache=tmp_path), results())
+    assert len(calls) == 1
@@ -0,0 +1,149 @@
+import numpy as np
+import pytest
+
+from TPMeSh import ImplicitShell, InterpolatedTPMS
+from TPMeSh.mesh_implicit_surface import (
+    _grid_axes, _match_points, eval_grid, marching_cubes_octree,
+    mesh_implicit_surface, mesh_periodic_implicit_surface)
+
+
+def canonical(V, F):
+    """Sorted vertices and triangles (as sorted vertex indices) of a mesh."""
+    V, inverse = np.unique(np.round(V, 6), axis=0, return_inverse=True)
+    T = np.sort(inverse.ravel()[F], axis=1)
+    return V, T[np.lexsort(T.T[::-1])]
+
+
+def second_derivative_bound(f, domain, res_y, margin=1.5):
+    """Largest second difference of f on a grid twice as fine, with a margin."""
+    axes = _grid_axes(domain, 2 * res_y)
+    S = eval_grid(f, *axes)
+    return margin * np.array([
+        np.abs(np.diff(S, 2, axis=i)).max() / (v[1] - v[0])**2
+        for i, v in enumerate(axes)])
+
+
+def shells():
+    x = np.random.default_rng(0).random(8)
+    return {
+        "blend": ImplicitShell(InterpolatedTPMS(x / x.sum()), thickness=0.5),
+        # Schoen FRD has points where ∇S vanishes next to the shell
+        "frd": ImplicitShell(InterpolatedTPMS.TPMSs[6], thickness=0.3),
+    }
+
+
+@pytest.mark.parametrize("intersect_with_box", [False, True])
+@pytest.mark.parametrize("name", ["blend", "frd"])
+def test_adaptive_mesh_matches_uniform(name, intersect_with_box):
+    f = shells()[name]
+    domain = np.vstack([np.zeros(3), f.domain])
+    res_y = 40
+    M = second_derivative_bound(f, domain, res_y)
+
+    V, F = canonical(*mesh_implicit_surface(
+        f, domain, res_y, intersect_with_box=intersect_with_box))
+    V_adaptive, F_adaptive = canonical(*mesh_implicit_surface(
+        f, domain, res_y, intersect_with_box=intersect_with_box,
+        adaptive=True, gradient_lipschitz=M))
+
+    assert V_adaptive.shape == V.shape
+    np.testing.assert_allclose(V_adaptive, V)
+    np.testing.assert_array_equal(F_adaptive, F)
+
+
+@pytest.mark.parametrize("coarse_size", [4, 16])
+def test_octree_matches_marching_cubes(coarse_size):
+    import mcubes
+
+    f = shells()["blend"]
+    domain = np.vstack([np.zeros(3), f.domain])
+    res_y = 48
+    V, F = mcubes.marching_cubes(eval_grid(f, *_grid_axes(domain, res_y)), 0)
+    V_octree, F_octree, _ = marching_cubes_octree(
+        f, domain, res_y, coarse_size=coarse_size,
+        gradient_lipschitz=second_derivative_bound(f, domain, res_y))
+
+    V, F = canonical(V, F.astype(np.int64))
+    V_octree, F_octree = canonical(V_octree, F_octree)
+    assert V_octree.shape == V.shape
+    np.testing.assert_allclose(V_octree, V)
+    np.testing.assert_array_equal(F_octree, F)
+
+
+def test_octree_evaluates_less_than_uniform():
+    f = shells()["blend"]
+    domain = np.vstack([np.zeros(3), f.domain])
+    res_y = 64
+    _, _, evaluations = marching_cubes_octree(
+        f, domain, res_y, gradient_lipschitz=second_derivative_bound(f, domain, res_y))
+    n = np.prod([len(v) for v in _grid_axes(domain, res_y)])
+    assert evaluations < n
+
+
+def test_adaptive_requires_gradient_lipschitz():
+    f = shells()["blend"]
+    domain = np.vstack([np.zeros(3), f.domain])
+    with pytest.raises(ValueError, match="gradient_lipschitz"):
+        mesh_implicit_surface(f, domain, 20, adaptive=True)
+
+
+@pytest.mark.parametrize("kwargs", [dict(slab_size=8), dict(dtype=np.float32)])
+def test_adaptive_rejects_uniform_options(kwargs):
+    f = shells()["blend"]
+    domain = np.vstack([np.zeros(3), f.domain])
+    with pytest.raises(ValueError, match="adaptive"):
+        mesh_implicit_surface(
+            f, domain, 20, adaptive=True, gradient_lipschitz=100, **kwargs)
+
+
+@pytest.mark.parametrize("intersect_with_box", [False, True])
+@pytest.mark.parametrize("res_y", [30, 50])
+def test_periodic_mesh_matches_full_domain(res_y, intersect_with_box):
+    f = shells()["blend"]
+    repeats = np.array([2, 1, 3])
+    domain = np.vstack([np.zeros(3), repeats * f.domain])
+
+    V, F = canonical(*mesh_implicit_surface(
+        f, domain, res_y * repeats[1], intersect_with_box=intersect_with_box))
+    V_periodic, F_periodic = canonical(*mesh_periodic_implicit_surface(
+        f, repeats, res_y, intersect_with_box=intersect_with_box))
+
+    assert V_periodic.shape == V.shape
+    np.testing.assert_allclose(V_periodic, V, atol=1e-6)
+    np.testing.assert_array_equal(F_periodic, F)
+
+
+@pytest.mark.parametrize("slab_size", [1, 7, 64])
+def test_slab_mesh_matches_full_grid(slab_size):
+    f = shells()["blend"]
+    domain = np.vstack([np.zeros(3), f.domain])
+
+    V, F = mesh_implicit_surface(f, domain, 30)
+    V_slabs, F_slabs = mesh_implicit_surface(f, domain, 30, slab_size=slab_size)
+    assert len(V_slabs) == len(V)  # The shared layers are welded
+
+    V, F = canonical(V, F)
+    V_slabs, F_slabs = canonical(V_slabs, F_slabs)
+    assert V_slabs.shape == V.shape
+    np.testing.assert_allclose(V_slabs, V)
+    np.testing.assert_array_equal(F_slabs, F)
+
+
+def test_match_points_finds_close_pairs_across_cells():
+    # Close, but in different cells of both the unshifted and the
+    # diagonally shifted grid
+    A, B = np.array([[0.99, 0.49]]), np.array([[1.01, 0.51]])
+    np.testing.assert_array_equal(_match_points(A, B, tol=1), [0])
+
+    rng = np.random.default_rng(0)
+    for d in (2, 3):
+        A = rng.random((1000, d))
+        order = rng.permutation(len(A))
+        B = A[order] + rng.uniform(-0.49, 0.49, A.shape) * 1e-6
+        np.testing.assert_array_equal(_match_points(A, B, tol=1e-6), order)
+
+
+def test_match_points_pairs_one_to_one():
+    A = np.array([[0.0, 0], [0, 0], [1, 1]])
+    B = np.array([[0.0, 0], [2, 2], [0, 0], [0, 0]])
+    np.testing.assert_array_equal(_match_points(A, B), [0, -1, 1, -1])
@@ -0,0 +1,30 @@
+import multiprocessing
+
+import meshio
+import numpy as np
+import pytest
+
+from TPMeSh import mesh_tpms
+
+
+def fake_mesh(x, thickness, stats=None, **kwargs):
+    V = np.array([[1.0, 2, 3], [3, 2, 3], [1, 6, 3], [1, 2, 7]])
+    F = np.array([[0, 1, 2], [0, 1, 3], [0, 2, 3], [1, 2, 3]])
+    return V, F, []
+
+
+@pytest.mark.parametrize("mesh_type", ["full", "surface", "periodic"])
+def test_batch_job_scales_like_main(tmp_path, monkeypatch, mesh_type):
+    monkeypatch.setitem(mesh_tpms.MESH_FUNCTIONS, mesh_type, fake_mesh)
+    path = tmp_path / "mesh.ply"
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    mesh_tpms._batch_job(mesh_type, np.ones(8) / 8, 0.5, path, {}, sender)
+    status, _, n_vertices, n_elements, _, error = receiver.recv()
+    assert (status, n_vertices, n_elements, error) == ("done", 4, 4, "")
+
+    V, _ = fake_mesh(None, None)[:2]
+    if mesh_type != "periodic":
+        offset, scale = mesh_tpms._output_transform(V)
+        V = scale * (V - offset)
+        assert V.min() == 0 and 0 < V.max() <= 200
+    np.testing.assert_allclose(meshio.read(path).points, V)
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from TPMeSh import ImplicitShell, InterpolatedTPMS
+from TPMeSh.mesh_implicit_surface import _grid_axes
+from TPMeSh.sparse_grid import SparseGrid, narrow_band_grid
+
+
+def shell_and_domain(name):
+    if name == "frd":
+        # Schoen FRD has points where ∇S vanishes next to the shell
+        f = ImplicitShell(InterpolatedTPMS.TPMSs[6], thickness=0.3)
+        return f, np.vstack([np.zeros(3), 2 * f.domain])
+    x = np.random.default_rng(0).random(8)
+    f = ImplicitShell(InterpolatedTPMS(x / x.sum()), thickness=0.5)
+    return f, np.vstack([np.zeros(3), f.domain])
+
+
+def dense_distances(f, domain, res_y):
+    X = np.meshgrid(*_grid_axes(domain, res_y), indexing="ij")
+    return f.distance(*(v.ravel() for v in X)).reshape(X[0].shape)
+
+
+@pytest.mark.parametrize("res_y", [50, 80])
+@pytest.mark.parametrize("name", ["blend", "frd"])
+def test_narrow_band_matches_dense_in_band(name, res_y):
+    f, domain = shell_and_domain(name)
+    grid = narrow_band_grid(f, domain, res_y, dtype=np.float64)
+    D = dense_distances(f, domain, res_y)
+    band = grid.background
+
+    assert 0 < grid.active_fraction() < 1
+    in_band = np.abs(D) < band
+    np.testing.assert_allclose(
+        grid.to_dense()[in_band], np.clip(D, -band, band)[in_band])
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_save_load_round_trip(tmp_path, mmap):
+    f, domain = shell_and_domain("blend")
+    grid = narrow_band_grid(f, domain, 30)
+    path = tmp_path / "grid.tpmsgrid"
+    grid.save(path)
+
+    loaded = SparseGrid.load(path, mmap=mmap)
+    np.testing.assert_array_equal(loaded.origin, grid.origin)
+    np.testing.assert_array_equal(loaded.spacing, grid.spacing)
+    np.testing.assert_array_equal(loaded.shape, grid.shape)
+    assert loaded.background == grid.background
+    assert loaded.bricks.dtype == grid.bricks.dtype
+    np.testing.assert_array_equal(loaded.index, grid.index)
+    np.testing.assert_array_equal(loaded.bricks, grid.bricks)
+    np.testing.assert_array_equal(loaded.to_dense(), grid.to_dense())
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "grid.tpmsgrid"
+    path.write_bytes(b"not a grid")
+    with pytest.raises(ValueError):
+        SparseGrid.load(path)
+
+
+def test_call_interpolates_dense_grid():
+    f, domain = shell_and_domain("blend")
+    grid = narrow_band_grid(f, domain, 30, dtype=np.float64)
+    dense = grid.to_dense()
+    axes = _grid_axes(domain, 30)
+
+    # At the samples, the interpolation is the sample value
+    I = np.random.default_rng(0).integers(0, grid.shape, (200, 3))
+    P = np.column_stack([v[I[:, i]] for i, v in enumerate(axes)])
+    np.testing.assert_allclose(grid(P), dense[tuple(I.T)])
+
+    # Between them, it is trilinear in the dense samples
+    rng = np.random.default_rng(1)
+    P = domain[0] + rng.random((200, 3)) * (domain[1] - domain[0])
+    u = (P - grid.origin) / grid.spacing
+    cell = np.minimum(np.floor(u).astype(int), grid.shape - 2)
+    t = u - cell
+    expected = np.zeros(len(P))
+    for corner in np.ndindex(2, 2, 2):
+        weight = np.prod(np.where(corner, t, 1 - t), axis=1)
+        expected += weight * dense[tuple((cell + corner).T)]
+    np.testing.assert_allclose(grid(P), expected)
+
+    # Outside, it is clamped to the grid
+    np.testing.assert_allclose(
+        grid(domain[1] + 1), dense[tuple(grid.shape - 1)])